@@ -0,0 +1,59 @@
+"""Add persona_performance aggregates
+
+Revision ID: a4c1e9f27b10
+Revises: d32f6e15bf54
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a4c1e9f27b10"
+down_revision: Union[str, Sequence[str], None] = "d32f6e15bf54"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "persona_performance",
+        sa.Column("persona_id", sa.String(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("wins", sa.Integer(), nullable=False),
+        sa.Column("losses", sa.Integer(), nullable=False),
+        sa.Column("breakeven", sa.Integer(), nullable=False),
+        sa.Column("sum_pnl_r", sa.Float(), nullable=False),
+        sa.Column("sum_sq_pnl_r", sa.Float(), nullable=False),
+        sa.Column("last_eval_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("persona_id"),
+    )
+    # Backfill from the existing evaluation history (signals.strategy_id = persona_id)
+    op.execute(
+        """
+        INSERT INTO persona_performance
+            (persona_id, total, wins, losses, breakeven, sum_pnl_r, sum_sq_pnl_r, last_eval_at)
+        SELECT s.strategy_id,
+               COUNT(e.id),
+               SUM(CASE WHEN e.result = 'WIN' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN e.result = 'LOSS' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN e.result = 'BE' THEN 1 ELSE 0 END),
+               COALESCE(SUM(e.pnl_r), 0),
+               COALESCE(SUM(e.pnl_r * e.pnl_r), 0),
+               MAX(e.evaluated_at)
+        FROM signal_evaluations e
+        JOIN signals s ON s.id = e.signal_id
+        WHERE s.strategy_id IS NOT NULL
+        GROUP BY s.strategy_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("persona_performance")
@@ -0,0 +1,51 @@
+"""Add status to signals with a partial index on open rows
+
+Revision ID: b7d2f4a81c3e
+Revises: a4c1e9f27b10
+Create Date: 2026-10-18 11:03:17.462981
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d2f4a81c3e"
+down_revision: Union[str, Sequence[str], None] = "a4c1e9f27b10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "signals",
+        sa.Column("status", sa.String(), server_default="OPEN", nullable=False),
+    )
+    # Backfill: every signal that already has an evaluation is closed
+    op.execute(
+        """
+        UPDATE signals SET status = 'CLOSED'
+        WHERE EXISTS (
+            SELECT 1 FROM signal_evaluations e WHERE e.signal_id = signals.id
+        )
+        """
+    )
+    op.create_index(
+        "ix_signals_open",
+        "signals",
+        ["timestamp"],
+        unique=False,
+        sqlite_where=sa.text("status = 'OPEN'"),
+        postgresql_where=sa.text("status = 'OPEN'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_signals_open", table_name="signals")
+    with op.batch_alter_table("signals") as batch_op:
+        batch_op.drop_column("status")
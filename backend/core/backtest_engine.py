@@ -8,7 +8,7 @@ from typing import Dict, Any
 
 # Add root to path to find 'strategies'
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from core.market_data_api import get_ohlcv_data
+from core.market_data_api import get_ohlcv_arrays
 
 
 class BacktestEngine:
@@ -116,16 +116,17 @@ class BacktestEngine:
 
             print(f"[Backtest] Descargando {limit} velas para {symbol}...")
             try:
-                ohlcv = get_ohlcv_data(symbol, timeframe, limit=limit)
+                candles = get_ohlcv_arrays(symbol, timeframe, limit=limit)
             except Exception as e:
                 raise Exception(f"Error descargando datos: {str(e)}")
 
-            if not ohlcv or len(ohlcv) < 60:
+            if not candles or len(candles) < 60:
                 raise Exception("Datos históricos insuficientes para backtest")
 
-            df = pd.DataFrame(ohlcv)
-            if "timestamp" in df.columns:
-                df["timestamp_dt"] = pd.to_datetime(df["timestamp"], unit="ms")
+            # Columnar -> DataFrame (sin lista de dicts intermedia)
+            df = candles.to_dataframe(index=False)
+            df["time"] = candles.time_labels()
+            df["timestamp_dt"] = pd.to_datetime(df["timestamp"], unit="ms")
 
             trades = []
             equity_curve = []  # List of {time, strategy_equity, buy_hold_equity, price}
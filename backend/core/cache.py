@@ -1,21 +1,214 @@
+import heapq
+import sys
+import threading
 import time
 import os
-import json
-from typing import Any, Optional
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from core import cache_codec
+
+# Namespaces con métricas propias; el resto se agrupa por el primer segmento.
+NAMESPACES = ("ohlcv:", "market:summary:")
+
+
+def _namespace(key: str) -> str:
+    for ns in NAMESPACES:
+        if key.startswith(ns):
+            return ns[:-1]
+    return key.split(":", 1)[0]
+
+
+def approx_size(value: Any, _depth: int = 0) -> int:
+    """
+    Tamaño aproximado en bytes. Los arrays (CandleArray, numpy) aportan su
+    `nbytes`; las listas largas se estiman por muestreo para que el coste de
+    contabilizar no dependa del tamaño del valor.
+    """
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes + 128
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, dict):
+        items = list(value.items())
+        sample = items[:16]
+        if sample:
+            per_item = sum(
+                approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in sample
+            ) / len(sample)
+            size += int(per_item * len(items))
+    elif isinstance(value, (list, tuple)):
+        sample = value[:16]
+        if sample:
+            per_item = sum(approx_size(v, _depth + 1) for v in sample) / len(sample)
+            size += int(per_item * len(value))
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "stale_until", "size", "namespace")
+
+    def __init__(self, value: Any, expires_at: float, stale_until: float, size: int, namespace: str):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.size = size
+        self.namespace = namespace
+
+
+class MemoryTier:
+    """
+    Caché en memoria LRU, thread-safe, con presupuesto en bytes.
+
+    - LRU sobre OrderedDict (get/set O(1)).
+    - Expiración O(log n) con un heap de (stale_until, key); las entradas
+      sobrescritas quedan como lápidas y se descartan al salir del heap.
+    - Contadores hit / stale_hit / miss / eviction / expired por namespace.
+      Una lectura stale no cuenta por sí sola: `stale_hits` lo registra quien
+      de verdad sirve el valor viejo mientras revalida (`record`).
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._data: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._expiry_heap: list = []
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, namespace: str, event: str, n: int = 1):
+        ns_stats = self._stats.get(namespace)
+        if ns_stats is None:
+            ns_stats = self._stats[namespace] = {
+                "hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "expired": 0,
+            }
+        ns_stats[event] += n
+
+    def _remove(self, key: str, entry: _Entry):
+        del self._data[key]
+        self.total_bytes -= entry.size
+
+    def _purge_expired(self, now: float):
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            _, key = heapq.heappop(heap)
+            entry = self._data.get(key)
+            if entry is not None and entry.stale_until <= now:
+                self._remove(key, entry)
+                self._count(entry.namespace, "expired")
+        # Overwrites leave tombstones behind; rebuild if they dominate the heap
+        if len(heap) > 2 * len(self._data) + 64:
+            self._expiry_heap = [(e.stale_until, k) for k, e in self._data.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(valor, expires_at) si la entrada sigue dentro de su ventana stale."""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry.stale_until <= now:
+                if entry is not None:
+                    self._remove(key, entry)
+                    self._count(entry.namespace, "expired")
+                self._count(_namespace(key), "misses")
+                return None
+            self._data.move_to_end(key)
+            if now < entry.expires_at:
+                self._count(entry.namespace, "hits")
+            return entry.value, entry.expires_at
+
+    def record(self, key: str, event: str):
+        """Cuenta un evento decidido por el llamador (stale_hits / misses)."""
+        with self._lock:
+            self._count(_namespace(key), event)
+
+    def put(self, key: str, value: Any, expires_at: float, stale_until: float):
+        size = approx_size(value)
+        namespace = _namespace(key)
+        now = time.time()
+        with self._lock:
+            old = self._data.get(key)
+            if old is not None:
+                self._remove(key, old)
+            if size > self.max_bytes:
+                self._count(namespace, "evictions")  # Never fits: don't cache
+                return
+            self._data[key] = _Entry(value, expires_at, stale_until, size, namespace)
+            self.total_bytes += size
+            heapq.heappush(self._expiry_heap, (stale_until, key))
+
+            self._purge_expired(now)
+            while self.total_bytes > self.max_bytes:
+                lru_key, lru_entry = next(iter(self._data.items()))
+                self._remove(lru_key, lru_entry)
+                self._count(lru_entry.namespace, "evictions")
+
+    def delete(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._remove(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._expiry_heap.clear()
+            self.total_bytes = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            namespaces = {ns: dict(counters) for ns, counters in self._stats.items()}
+            for entry in self._data.values():
+                ns = namespaces.setdefault(entry.namespace, {})
+                ns["entries"] = ns.get("entries", 0) + 1
+                ns["bytes"] = ns.get("bytes", 0) + entry.size
+            return {
+                "entries": len(self._data),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "namespaces": namespaces,
+            }
 
 
 class CacheService:
     """
-    Servicio de caché híbrido (Memoria + Redis opcional).
-    Por defecto usa memoria para cero-configuración.
+    Servicio de caché de dos niveles.
+
+    - L1: `MemoryTier` por proceso (siempre activo). Los hits no salen del
+      proceso ni deserializan nada.
+    - L2: Redis opcional (REDIS_URL), compartido entre procesos, con valores
+      en el formato binario de `core.cache_codec`.
+
+    Coherencia: cada `set` publica la clave en `INVALIDATION_CHANNEL` y los
+    demás procesos la borran de su L1. Si la suscripción no está activa, las
+    entradas que L1 copia de Redis viven como máximo `L1_TTL_WITHOUT_PUBSUB`.
     """
 
     _instance = None
-    _memory_storage = {}
+    INVALIDATION_CHANNEL = "cache:invalidate"
+    L1_TTL_WITHOUT_PUBSUB = 2.0
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(CacheService, cls).__new__(cls)
+            cls._instance._memory_storage = MemoryTier(
+                max_bytes=int(os.getenv("CACHE_MEMORY_MAX_MB", "64")) * 1024 * 1024
+            )
+            cls._instance._node_id = uuid.uuid4().hex[:12]
+            cls._instance._l2_stats = {
+                "hits": 0, "misses": 0, "errors": 0, "bytes_in": 0, "bytes_out": 0,
+                "invalidations": 0,
+            }
+            cls._instance._pubsub_active = False
             cls._instance._init_redis()
         return cls._instance
 
@@ -27,8 +220,11 @@ class CacheService:
             try:
                 import redis
 
-                self.redis_client = redis.from_url(redis_url, decode_responses=True)
-                print(f"[CACHE] Connected to Redis at {redis_url}")
+                self.redis_client = redis.from_url(redis_url)
+                print(f"[CACHE] Connected to Redis at {redis_url} (L1 memory + L2 Redis)")
+                threading.Thread(
+                    target=self._invalidation_listener, name="cache-invalidation", daemon=True
+                ).start()
             except ImportError:
                 print(
                     "[CACHE] Redis URL found but 'redis' lib not installed. Using Memory."
@@ -38,48 +234,105 @@ class CacheService:
         else:
             print("[CACHE] runs in In-Memory mode (No REDIS_URL).")
 
-    def get(self, key: str) -> Optional[Any]:
-        # 1. Redis
-        if self.redis_client:
+    def _invalidation_listener(self):
+        """Borra de L1 las claves que otros procesos reescriben en Redis."""
+        while True:
             try:
-                val = self.redis_client.get(key)
-                if val:
-                    return json.loads(val)
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.INVALIDATION_CHANNEL)
+                self._pubsub_active = True
+                for message in pubsub.listen():
+                    self._on_invalidation(message.get("data"))
             except Exception as e:
-                print(f"[CACHE] Redis GET Error: {e}")
-
-        # 2. Memory
-        data = self._memory_storage.get(key)
-        if data:
-            val, expiry = data
-            if time.time() < expiry:
-                return val
-            else:
-                del self._memory_storage[key]  # Expired
+                print(f"[CACHE] ⚠️ Invalidation channel lost ({e}). Reconnecting...")
+            self._pubsub_active = False
+            time.sleep(5)
+
+    def _on_invalidation(self, data: Any):
+        if not isinstance(data, bytes):
+            return
+        origin, _, key = data.decode().partition("|")
+        if origin != self._node_id:
+            self._memory_storage.delete(key)
+            self._l2_stats["invalidations"] += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        """Valor fresco (dentro del TTL) o None."""
+        entry = self.peek(key)
+        if entry and time.time() < entry[1]:
+            return entry[0]
+        if entry:
+            self._memory_storage.record(key, "misses")  # Stale is a miss for a fresh read
         return None
 
-    def set(self, key: str, value: Any, ttl: int = 60):
-        # 1. Redis
+    def record_stale_hit(self, key: str):
+        """El llamador sirvió el valor stale de `key` mientras se revalida en segundo plano."""
+        self._memory_storage.record(key, "stale_hits")
+
+    def peek(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Stale-while-revalidate: devuelve (valor, expires_at) aunque el TTL
+        haya vencido, mientras siga dentro de su ventana `stale_ttl`.
+        El llamador decide si sirve el valor viejo y refresca en segundo plano.
+        """
+        # 1. L1 Memory
+        entry = self._memory_storage.get(key)
+        if entry is not None or not self.redis_client:
+            return entry
+
+        # 2. L2 Redis (read-through into L1)
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.ttl(key)
+            payload, ttl_left = pipe.execute()
+            if not payload:
+                self._l2_stats["misses"] += 1
+                return None
+            value, expiry = cache_codec.loads(payload)
+            self._l2_stats["hits"] += 1
+            self._l2_stats["bytes_in"] += len(payload)
+
+            stale_until = time.time() + max(ttl_left, 0)
+            if not self._pubsub_active:
+                stale_until = min(stale_until, time.time() + self.L1_TTL_WITHOUT_PUBSUB)
+            self._memory_storage.put(key, value, min(expiry, stale_until), stale_until)
+            return value, expiry
+        except Exception as e:
+            self._l2_stats["errors"] += 1
+            print(f"[CACHE] Redis GET Error: {e}")
+            return None
+
+    def set(self, key: str, value: Any, ttl: int = 60, stale_ttl: int = 0):
+        """
+        Args:
+            ttl: segundos en que el valor se considera fresco
+            stale_ttl: segundos extra en que `peek()` aún lo devuelve (stale)
+        """
+        expiry = time.time() + ttl
+
+        # 1. L1 Memory (always: the writer reads its own writes locally)
+        self._memory_storage.put(key, value, expiry, expiry + stale_ttl)
+
+        # 2. L2 Redis + invalidate other processes' L1
         if self.redis_client:
             try:
-                self.redis_client.setex(key, ttl, json.dumps(value))
-                return
+                payload = cache_codec.dumps(value, expiry)
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.setex(key, ttl + stale_ttl, payload)
+                pipe.publish(self.INVALIDATION_CHANNEL, f"{self._node_id}|{key}")
+                pipe.execute()
+                self._l2_stats["bytes_out"] += len(payload)
             except Exception as e:
+                self._l2_stats["errors"] += 1
                 print(f"[CACHE] Redis SET Error: {e}")
 
-        # 2. Memory
-        expiry = time.time() + ttl
-        self._memory_storage[key] = (value, expiry)
-
-        # Cleanup ocasional (muy simple)
-        if len(self._memory_storage) > 1000:
-            self._cleanup()
-
-    def _cleanup(self):
-        now = time.time()
-        keys_to_del = [k for k, v in self._memory_storage.items() if now > v[1]]
-        for k in keys_to_del:
-            del self._memory_storage[k]
+    def stats(self) -> Dict[str, Any]:
+        """Uso de memoria y hit/miss/evictions por namespace (L1) + tráfico L2."""
+        stats = self._memory_storage.stats()
+        if self.redis_client:
+            stats["l2"] = dict(self._l2_stats, pubsub=self._pubsub_active)
+        return stats
 
 
 # Global Instance
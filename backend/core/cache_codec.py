@@ -0,0 +1,126 @@
+# backend/core/cache_codec.py
+"""
+Compact Binary Codec for the Redis (L2) cache tier.
+
+JSON de una ventana de 1000 velas son ~100 KB de texto que hay que parsear
+entero en cada hit. Aquí el valor se separa en:
+
+- un esqueleto (dicts/listas/escalares) en msgpack si está instalado, o JSON
+  compacto si no;
+- buffers binarios crudos para cada `CandleArray` (int64 + float64 tal cual,
+  se reconstruyen con `np.frombuffer` sin parseo);
+- compresión zlib opcional si el payload supera `COMPRESS_MIN_BYTES`.
+
+Formato:
+    MAGIC(2) | flags(1) | expires_at(f64) | len(u32) esqueleto | [len(u32) buffer]*
+
+No usa pickle: un valor escrito en Redis por un tercero no puede ejecutar código.
+"""
+
+import json
+import struct
+import zlib
+from typing import Any, List, Tuple
+
+import numpy as np
+
+from core.candles import CandleArray
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency
+    msgpack = None
+
+MAGIC = b"TC"
+FLAG_ZLIB = 0x01
+FLAG_MSGPACK = 0x02
+COMPRESS_MIN_BYTES = 1024
+
+_HEADER = struct.Struct("<2sBd")
+_LEN = struct.Struct("<I")
+_CANDLES_TAG = "__candles__"
+
+
+def _extract(value: Any, buffers: List[bytes]) -> Any:
+    """Sustituye cada CandleArray por una referencia a su buffer binario."""
+    if isinstance(value, CandleArray):
+        buffers.append(value.timestamp.tobytes() + value._prices.tobytes())
+        return {_CANDLES_TAG: len(buffers) - 1}
+    if isinstance(value, dict):
+        return {k: _extract(v, buffers) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_extract(v, buffers) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _restore(value: Any, buffers: List[memoryview]) -> Any:
+    if isinstance(value, dict):
+        if len(value) == 1 and _CANDLES_TAG in value:
+            return _candles_from_buffer(buffers[value[_CANDLES_TAG]])
+        return {k: _restore(v, buffers) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_restore(v, buffers) for v in value]
+    return value
+
+
+def _candles_from_buffer(buf: memoryview) -> CandleArray:
+    n = len(buf) // 48  # 8 bytes timestamp + 5 x 8 bytes prices per candle
+    buf = bytes(buf)  # One memcpy: aligned, and detached from the full payload
+    timestamp = np.frombuffer(buf, dtype=np.int64, count=n)
+    prices = np.frombuffer(buf, dtype=np.float64, offset=8 * n).reshape(5, n)
+    return CandleArray(timestamp, prices)
+
+
+def dumps(value: Any, expires_at: float) -> bytes:
+    """Serializa (valor, expires_at) a bytes compactos."""
+    buffers: List[bytes] = []
+    skeleton = _extract(value, buffers)
+
+    flags = 0
+    if msgpack is not None:
+        skeleton_bytes = msgpack.packb(skeleton, use_bin_type=True)
+        flags |= FLAG_MSGPACK
+    else:
+        skeleton_bytes = json.dumps(skeleton, separators=(",", ":")).encode()
+
+    body = b"".join(
+        [_LEN.pack(len(skeleton_bytes)), skeleton_bytes]
+        + [part for buf in buffers for part in (_LEN.pack(len(buf)), buf)]
+    )
+    if len(body) >= COMPRESS_MIN_BYTES:
+        body = zlib.compress(body, 1)
+        flags |= FLAG_ZLIB
+    return _HEADER.pack(MAGIC, flags, expires_at) + body
+
+
+def loads(data: bytes) -> Tuple[Any, float]:
+    """Inverso de `dumps`. Lanza ValueError si el payload no es de este codec."""
+    magic, flags, expires_at = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Unknown cache payload")
+    body = data[_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    view = memoryview(body)
+
+    (skeleton_len,) = _LEN.unpack_from(view)
+    offset = _LEN.size
+    skeleton_bytes = view[offset:offset + skeleton_len]
+    offset += skeleton_len
+
+    buffers = []
+    while offset < len(view):
+        (buf_len,) = _LEN.unpack_from(view, offset)
+        offset += _LEN.size
+        buffers.append(view[offset:offset + buf_len])
+        offset += buf_len
+
+    if flags & FLAG_MSGPACK:
+        if msgpack is None:
+            raise ValueError("Payload requires msgpack")
+        skeleton = msgpack.unpackb(skeleton_bytes, raw=False)
+    else:
+        skeleton = json.loads(bytes(skeleton_bytes))
+    return _restore(skeleton, buffers), expires_at
@@ -0,0 +1,137 @@
+# backend/core/candle_store.py
+"""
+Persistent Local Candle Store (SQLite).
+
+Guarda las velas OHLCV crudas (formato CCXT: [ts, o, h, l, c, v]) por
+(symbol, timeframe) para que `get_ohlcv_data` solo descargue las velas
+nuevas desde el último cierre almacenado y sirva el resto de la ventana
+localmente. El tráfico con el exchange pasa de O(limit) a O(velas nuevas).
+
+Config (env):
+    CANDLE_STORE_ENABLED   -> "true" (default) | "false"
+    CANDLE_STORE_PATH      -> ruta del fichero SQLite (default backend/data/candles.db)
+    CANDLE_STORE_MAX_ROWS  -> velas máximas retenidas por (symbol, timeframe)
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_STORE_PATH = BACKEND_DIR / "data" / "candles.db"
+
+
+class CandleStore:
+    """
+    Almacén de velas por (symbol, timeframe) sobre SQLite en modo WAL.
+
+    Cada hilo usa su propia conexión (sqlite3 no comparte conexiones entre
+    hilos de forma segura); las escrituras se serializan con un lock.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_rows: int = 5000):
+        self.path = str(path or DEFAULT_STORE_PATH)
+        self.max_rows = max_rows
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS candles (
+                symbol TEXT NOT NULL,
+                timeframe TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume REAL,
+                PRIMARY KEY (symbol, timeframe, ts)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.commit()
+
+    def load(self, symbol: str, timeframe: str, limit: int) -> List[list]:
+        """Devuelve las últimas `limit` velas en orden ascendente."""
+        rows = self._conn().execute(
+            "SELECT ts, open, high, low, close, volume FROM candles "
+            "WHERE symbol = ? AND timeframe = ? ORDER BY ts DESC LIMIT ?",
+            (symbol, timeframe, int(limit)),
+        ).fetchall()
+        rows.reverse()
+        return [list(r) for r in rows]
+
+    def upsert(self, symbol: str, timeframe: str, candles: List[list], replace: bool = False):
+        """
+        Inserta/actualiza velas. La última vela (en formación) se sobrescribe.
+
+        Args:
+            replace: Si True, borra la serie previa. Se usa tras una descarga
+                completa para que la serie almacenada nunca tenga huecos.
+        """
+        if not candles:
+            return
+        params = [
+            (symbol, timeframe, int(c[0]), c[1], c[2], c[3], c[4], c[5])
+            for c in candles
+        ]
+        with self._write_lock:
+            conn = self._conn()
+            try:
+                if replace:
+                    conn.execute(
+                        "DELETE FROM candles WHERE symbol = ? AND timeframe = ?",
+                        (symbol, timeframe),
+                    )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO candles "
+                    "(symbol, timeframe, ts, open, high, low, close, volume) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    params,
+                )
+                # Retention: keep only the newest `max_rows` candles per series
+                conn.execute(
+                    "DELETE FROM candles WHERE symbol = ? AND timeframe = ? AND ts < ("
+                    "SELECT ts FROM candles WHERE symbol = ? AND timeframe = ? "
+                    "ORDER BY ts DESC LIMIT 1 OFFSET ?)",
+                    (symbol, timeframe, symbol, timeframe, self.max_rows - 1),
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+
+def _build_store() -> Optional[CandleStore]:
+    enabled = os.getenv("CANDLE_STORE_ENABLED", "true").lower() in ["true", "1", "yes"]
+    if not enabled:
+        print("[CANDLES] Local candle store disabled (CANDLE_STORE_ENABLED=false).")
+        return None
+    try:
+        return CandleStore(
+            path=os.getenv("CANDLE_STORE_PATH"),
+            max_rows=int(os.getenv("CANDLE_STORE_MAX_ROWS", "5000")),
+        )
+    except Exception as e:
+        print(f"[CANDLES] ⚠️ Candle store unavailable ({e}). Falling back to full fetches.")
+        return None
+
+
+# Global Instance (None si está deshabilitado)
+candle_store = _build_store()
@@ -0,0 +1,180 @@
+# backend/core/candles.py
+"""
+Columnar Candle Container.
+
+`CandleArray` guarda una ventana OHLCV como arrays NumPy contiguos
+(timestamp int64 en ms + open/high/low/close/volume float64) en lugar de
+una lista de dicts con 7 claves por vela. Las estrategias y el backtest
+obtienen un DataFrame o vistas NumPy sin el round-trip por dicts ni el
+`strftime` por vela.
+
+Los arrays son de solo lectura: la misma instancia se comparte desde la
+caché entre hilos/estrategias, así que cualquier mutación accidental falla
+en lugar de corromper datos compartidos.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+class CandleArray:
+    """Ventana OHLCV columnar (orden ascendente por timestamp)."""
+
+    # No memoised derived data: the instance sits in the L1 cache, whose byte
+    # budget only sees `nbytes`
+    __slots__ = ("timestamp", "_prices")
+
+    def __init__(self, timestamp: np.ndarray, prices: np.ndarray):
+        """
+        Args:
+            timestamp: int64[n], apertura de vela en ms
+            prices: float64[5, n], filas open/high/low/close/volume (C-contiguo)
+        """
+        self.timestamp = timestamp
+        self._prices = prices
+        self.timestamp.setflags(write=False)
+        self._prices.setflags(write=False)
+
+    # === Constructores ===
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[float]]) -> "CandleArray":
+        """Desde filas CCXT/candle store: [[ts, o, h, l, c, v], ...]."""
+        if not len(rows):
+            return cls.empty()
+        block = np.array(rows, dtype=np.float64).T  # (6, n)
+        timestamp = block[0].astype(np.int64)
+        prices = np.ascontiguousarray(block[1:6])
+        return cls(timestamp, prices)
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> "CandleArray":
+        """Desde el formato legacy (lista de dicts)."""
+        return cls.from_rows([[r[c] for c in COLUMNS] for r in records])
+
+    @classmethod
+    def empty(cls) -> "CandleArray":
+        return cls(np.empty(0, dtype=np.int64), np.empty((5, 0), dtype=np.float64))
+
+    # === Columnas (vistas zero-copy) ===
+
+    @property
+    def open(self) -> np.ndarray:
+        return self._prices[0]
+
+    @property
+    def high(self) -> np.ndarray:
+        return self._prices[1]
+
+    @property
+    def low(self) -> np.ndarray:
+        return self._prices[2]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self._prices[3]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self._prices[4]
+
+    def __reduce__(self):
+        # Pickle only the buffers; __init__ re-applies read-only
+        return CandleArray, (self.timestamp, self._prices)
+
+    def __len__(self) -> int:
+        return int(self.timestamp.shape[0])
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.timestamp.nbytes + self._prices.nbytes)
+
+    def tail(self, n: int) -> "CandleArray":
+        """Últimas `n` velas como vista (sin copiar)."""
+        if n >= len(self):
+            return self
+        return CandleArray(self.timestamp[-n:], self._prices[:, -n:])
+
+    def since(self, ts_ms: int) -> "CandleArray":
+        """Velas con apertura >= ts_ms (vista)."""
+        start = int(np.searchsorted(self.timestamp, ts_ms, side="left"))
+        return self.tail(len(self) - start) if start < len(self) else CandleArray.empty()
+
+    # === Conversión ===
+
+    def to_dataframe(self, index: bool = True) -> pd.DataFrame:
+        """
+        DataFrame sobre los mismos buffers (sin copia de precios).
+
+        Args:
+            index: True -> DatetimeIndex 'timestamp' (lo que hacen todas las
+                estrategias tras construir el DataFrame). False -> columna
+                'timestamp' en ms, igual que el formato legacy.
+        """
+        data = {
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "volume": self.volume,
+        }
+        if index:
+            idx = pd.DatetimeIndex(pd.to_datetime(self.timestamp, unit="ms"), name="timestamp")
+            return pd.DataFrame(data, index=idx, copy=False)
+        return pd.DataFrame({"timestamp": self.timestamp, **data}, copy=False)
+
+    def time_labels(self) -> np.ndarray:
+        """Etiquetas 'YYYY-MM-DD HH:MM' (hora local, como el campo legacy 'time'), vectorizado."""
+        local_tz = datetime.now().astimezone().tzinfo
+        stamps = pd.to_datetime(self.timestamp, unit="ms", utc=True).tz_convert(local_tz)
+        return stamps.strftime("%Y-%m-%d %H:%M").to_numpy()
+
+    def to_rows(self) -> List[list]:
+        """Filas [ts, o, h, l, c, v] (formato CCXT)."""
+        return [[int(ts), *vals] for ts, vals in zip(self.timestamp.tolist(), self._prices.T.tolist())]
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """
+        Formato legacy (lista de dicts con 'time' formateado).
+        Lista nueva en cada llamada: usar `tail(n)` antes para no construir
+        dicts de velas que no se van a devolver.
+        """
+        records = []
+        for ts, (o, h, lo, c, v) in zip(self.timestamp.tolist(), self._prices.T.tolist()):
+            records.append(
+                {
+                    "timestamp": ts,
+                    "time": datetime.fromtimestamp(ts / 1000).strftime("%Y-%m-%d %H:%M"),
+                    "open": o,
+                    "high": h,
+                    "low": lo,
+                    "close": c,
+                    "volume": v,
+                }
+            )
+        return records
+
+    def __repr__(self) -> str:
+        if not self:
+            return "<CandleArray empty>"
+        return f"<CandleArray n={len(self)} {int(self.timestamp[0])}..{int(self.timestamp[-1])}>"
+
+
+def candles_to_frame(raw: Any) -> pd.DataFrame:
+    """
+    Normaliza datos de mercado (CandleArray, lista de dicts o DataFrame)
+    a DataFrame. Útil para el canal `context={"data": ...}` de las estrategias.
+    """
+    if isinstance(raw, CandleArray):
+        return raw.to_dataframe()
+    if isinstance(raw, list):
+        return pd.DataFrame(raw)
+    return raw
@@ -0,0 +1,265 @@
+# backend/core/csv_journal.py
+"""
+Write-Behind CSV Journal.
+
+`_write_to_csv` abría `logs/<MODE>/<token>.csv`, comprobaba si existía,
+creaba un DictWriter, escribía una fila y cerraba el fichero, todo en el
+hilo del scheduler tras cada INSERT. Ahora las filas se encolan y un único
+hilo escritor:
+
+- Agrupa por fichero las filas de cada lote (`writerows` en vez de fila a fila).
+- Mantiene los ficheros abiertos (LRU de `max_open_files`), con `flush()` tras
+  cada lote (visible para quien lee los CSV) y `fsync` cada `fsync_interval`.
+- Rota por tamaño (`max_bytes`) o por cambio de día UTC: el fichero activo
+  se mueve a `<MODE>/archive/<token>.<YYYYMMDD>[.n].csv` y se empieza otro
+  con cabecera; el nombre activo no cambia para los lectores. Quien necesite
+  filas antiguas (señales aún abiertas) lee `journal_files(path)`.
+- Backpressure: la cola está acotada; si se llena, `append` bloquea hasta
+  `put_timeout` segundos y después descarta la fila (contada en `dropped`).
+
+Uso:
+    journal = CSVJournal()
+    journal.append(path, row, CSV_HEADERS)
+    journal.flush()  # Espera a que todo lo encolado esté en disco
+"""
+
+import atexit
+import csv
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+ARCHIVE_DIR = "archive"
+_STOP = object()
+
+
+def journal_files(path: Path) -> List[Path]:
+    """Segmentos rotados de `path` (archive/) seguidos del fichero activo, si existen."""
+    path = Path(path)
+    archive = path.parent / ARCHIVE_DIR
+    files = sorted(archive.glob(f"{path.stem}.*{path.suffix}")) if archive.exists() else []
+    if path.exists():
+        files.append(path)
+    return files
+
+
+class _OpenFile:
+    __slots__ = ("handle", "day", "headers")
+
+    def __init__(self, handle, day: str, headers: Sequence[str]):
+        self.handle = handle
+        self.day = day
+        self.headers = headers
+
+
+class CSVJournal:
+    """Cola + hilo escritor de filas CSV (append-only)."""
+
+    def __init__(
+        self,
+        max_queue: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        fsync_interval: float = 5.0,
+        max_bytes: int = 50 * 1024 * 1024,
+        max_open_files: int = 256,
+        put_timeout: float = 5.0,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.max_open_files = max_open_files
+        self.put_timeout = put_timeout
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._files: "OrderedDict[Path, _OpenFile]" = OrderedDict()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._last_fsync = time.monotonic()
+        self.written = 0
+        self.batches = 0
+        self.rotations = 0
+        self.dropped = 0
+        self.errors = 0
+
+    # --- Producer side ---
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            first_start = self._thread is None
+            self._thread = threading.Thread(target=self._run, name="csv-journal", daemon=True)
+            self._thread.start()
+            if first_start:
+                atexit.register(self.close)
+
+    def append(self, path: Path, row: Dict[str, Any], headers: Sequence[str]) -> bool:
+        """Encola una fila. False si se descartó por cola llena (disco bloqueado)."""
+        self._ensure_started()
+        try:
+            self._queue.put((Path(path), row, headers), timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                print(f"[CSV] ⚠️ Journal queue full, dropped {self.dropped} rows")
+            return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Bloquea hasta que lo encolado antes de esta llamada esté escrito."""
+        if self._thread is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = threading.Event()
+        self._ensure_started()
+        try:
+            # Full queue + stuck writer: give up at the deadline like append()
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        if deadline is not None:
+            timeout = max(0.0, deadline - time.monotonic())
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 10.0):
+        """Drena la cola, hace fsync y cierra los ficheros (parada ordenada)."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    # --- Writer thread ---
+
+    def _run(self):
+        while True:
+            try:
+                items = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                items = []
+            while items and len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            pending: Dict[Path, List[Dict[str, Any]]] = {}
+            headers: Dict[Path, Sequence[str]] = {}
+            for item in items:
+                if isinstance(item, tuple):
+                    path, row, row_headers = item
+                    pending.setdefault(path, []).append(row)
+                    headers[path] = row_headers
+                    continue
+                # Flush marker or stop: everything queued before it goes to disk first
+                self._write_batch(pending, headers)
+                pending, headers = {}, {}
+                if item is _STOP:
+                    self._close_files()
+                    return
+                self._sync_files(force=True)
+                item.set()
+
+            self._write_batch(pending, headers)
+            self._sync_files()
+
+    def _write_batch(self, pending: Dict[Path, List[Dict[str, Any]]], headers):
+        if not pending:
+            return
+        for path, rows in pending.items():
+            try:
+                entry = self._open(path, headers[path])
+                writer = csv.DictWriter(entry.handle, fieldnames=entry.headers)
+                writer.writerows(rows)
+                entry.handle.flush()
+                self.written += len(rows)
+            except Exception as e:
+                self.errors += 1
+                print(f"[CSV] ❌ Error writing {path.name}: {e}")
+        self.batches += 1
+
+    def _open(self, path: Path, headers: Sequence[str]) -> _OpenFile:
+        today = datetime.utcnow().strftime("%Y%m%d")
+        entry = self._files.get(path)
+        if entry is not None:
+            self._files.move_to_end(path)
+            # Removed/moved externally (cleanup, logrotate): reopen instead of writing to it
+            if not path.exists():
+                self._close(path)
+            # fstat, not tell(): other writers may append to the same file
+            elif entry.day == today and os.fstat(entry.handle.fileno()).st_size < self.max_bytes:
+                return entry
+            else:
+                self._close(path)
+                self._rotate(path, entry.day)
+        elif path.exists():
+            stat = path.stat()
+            day = datetime.utcfromtimestamp(stat.st_mtime).strftime("%Y%m%d")
+            if stat.st_size and (day != today or stat.st_size >= self.max_bytes):
+                self._rotate(path, day)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handle = open(path, mode="a", newline="", encoding="utf-8")
+        entry = _OpenFile(handle, today, headers)
+        if handle.tell() == 0:
+            csv.DictWriter(handle, fieldnames=headers).writeheader()
+        self._files[path] = entry
+        while len(self._files) > self.max_open_files:
+            self._close(next(iter(self._files)))
+        return entry
+
+    def _rotate(self, path: Path, day: str):
+        archive = path.parent / ARCHIVE_DIR
+        archive.mkdir(parents=True, exist_ok=True)
+        target = archive / f"{path.stem}.{day}{path.suffix}"
+        n = 1
+        while target.exists():
+            target = archive / f"{path.stem}.{day}.{n}{path.suffix}"
+            n += 1
+        path.rename(target)
+        self.rotations += 1
+
+    def _close(self, path: Path):
+        entry = self._files.pop(path)
+        try:
+            entry.handle.flush()
+            os.fsync(entry.handle.fileno())
+        finally:
+            entry.handle.close()
+
+    def _sync_files(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_fsync < self.fsync_interval:
+            return
+        self._last_fsync = now
+        for path, entry in list(self._files.items()):
+            try:
+                os.fsync(entry.handle.fileno())
+            except Exception as e:
+                print(f"[CSV] ⚠️ fsync failed for {path.name}: {e}")
+
+    def _close_files(self):
+        for path in list(self._files):
+            try:
+                self._close(path)
+            except Exception as e:
+                print(f"[CSV] ⚠️ Error closing {path.name}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "rotations": self.rotations,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "open_files": len(self._files),
+        }
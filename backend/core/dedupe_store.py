@@ -0,0 +1,150 @@
+# backend/core/dedupe_store.py
+"""
+Bounded TTL Stores for the Scheduler Dedupe State.
+
+Los dicts de dedupe del scheduler (señales procesadas, última dirección,
+coherencia por token, notificaciones) solo crecían: con personas scanner
+acumulaban millones de claves f-string tras semanas de uptime. Cada uno es
+ahora un `TTLStore`:
+
+- Claves tupla (`(persona_id, token, direction)`), sin formatear strings.
+- TTL único por store => el orden de inserción es el orden de expiración:
+  OrderedDict + purga desde el frente, O(1) amortizado.
+- Tope de entradas (se expulsa la más vieja) como red de seguridad.
+- Métricas de hits/misses/expiradas/expulsadas y memoria aproximada.
+- Opcional: write-through a Redis (`redis_client`) para que el dedupe
+  sobreviva reinicios y se comparta entre instancias sin consultar la DB.
+
+Interfaz tipo dict (`get`, `store[key] = value`, `in`, `len`) para que el
+código del scheduler no cambie si se sustituye por un dict en tests.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from core.cache import approx_size
+
+
+class TTLStore:
+    """Mapa acotado con expiración por tiempo y métricas."""
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        max_entries: int = 100_000,
+        redis_client: Any = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.redis_client = redis_client
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    # --- Redis (optional L2) ---
+
+    def _redis_key(self, key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return f"dedupe:{self.name}:" + "|".join(str(part) for part in parts)
+
+    def _redis_get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.get(self._redis_key(key))
+            pipe.ttl(self._redis_key(key))
+            raw, ttl = pipe.execute()
+        except Exception as e:
+            print(f"[DEDUPE] ⚠️ Redis read failed ({self.name}): {e}")
+            return None
+        if raw is None or ttl is None or ttl <= 0:
+            return None
+        return json.loads(raw), time.time() + ttl
+
+    def _redis_set(self, key: Hashable, value: Any):
+        try:
+            self.redis_client.setex(self._redis_key(key), max(1, int(self.ttl)), json.dumps(value))
+        except Exception as e:
+            print(f"[DEDUPE] ⚠️ Redis write failed ({self.name}): {e}")
+
+    # --- Local tier ---
+
+    def _purge(self, now: float):
+        data = self._data
+        while data:
+            key, (_, expires_at) = next(iter(data.items()))
+            if expires_at > now:
+                break
+            del data[key]
+            self.expired += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            entry = self._data.get(key)
+            # Entries read through from Redis may expire before newer ones
+            # and outlive the front purge: check them individually
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+        if self.redis_client is not None:
+            remote = self._redis_get(key)
+            if remote is not None:
+                with self._lock:
+                    self.hits += 1
+                    self._put(key, remote[0], remote[1])
+                return remote[0]
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def _put(self, key: Hashable, value: Any, expires_at: float):
+        data = self._data
+        data.pop(key, None)
+        data[key] = (value, expires_at)
+        while len(data) > self.max_entries:
+            data.popitem(last=False)
+            self.evictions += 1
+
+    def __setitem__(self, key: Hashable, value: Any):
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            self._put(key, value, now + self.ttl)
+        if self.redis_client is not None:
+            self._redis_set(key, value)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge(time.time())
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._purge(time.time())
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "approx_bytes": approx_size(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "ttl_s": self.ttl,
+            }
@@ -0,0 +1,266 @@
+# backend/core/exchange_health.py
+"""
+Exchange Rate Limiting & Health Scoring.
+
+Estado compartido por todo el proceso para la cadena de fallback de exchanges:
+
+- Token bucket por exchange con los límites públicos de cada venue. Los
+  clientes del pool son varios por exchange, así que el throttle de CCXT
+  (por instancia) no basta para respetar el límite global de la IP.
+- Circuit breaker: tras N fallos seguidos (o un 429 / geo-bloqueo) el venue
+  se salta durante un cooldown; luego se deja pasar una sola petición de
+  prueba (half-open).
+- Scoring EWMA de latencia y tasa de error: `ordered()` reordena la cadena
+  para probar primero el venue más sano.
+
+Uso:
+    for ex_id in exchange_health.ordered(["binance", "kraken"]):
+        if not exchange_health.acquire(ex_id):
+            continue  # circuito abierto o sin tokens: siguiente venue
+        start = time.monotonic()
+        ...
+        exchange_health.record_success(ex_id, time.monotonic() - start)
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+# Peticiones/seg sostenidas y ráfaga por venue (endpoints públicos de mercado).
+VENUE_LIMITS = {
+    "binance": {"rate": 10.0, "burst": 20},  # 1200 weight/min, klines weight 1-2
+    "kraken": {"rate": 1.0, "burst": 3},  # public: ~1 req/s
+    "kucoin": {"rate": 8.0, "burst": 16},  # public: 2000 / 30s por IP
+    "gateio": {"rate": 10.0, "burst": 20},  # public: 200 / 10s por endpoint
+    "bybit": {"rate": 10.0, "burst": 20},  # public: 600 / 5s por IP
+}
+DEFAULT_LIMIT = {"rate": 5.0, "burst": 10}
+
+
+class TokenBucket:
+    """Token bucket thread-safe (rellenado continuo)."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Toma un token si hay; si no, devuelve los segundos hasta el siguiente."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return 0.0
+            return (1.0 - self.tokens) / self.rate
+
+    def acquire(self, timeout: float = 0.0) -> bool:
+        """Espera como máximo `timeout` segundos por un token."""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return True
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, timeout: float = 0.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return True
+            if wait > deadline - time.monotonic():
+                return False
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """closed -> open (cooldown) -> half_open (una prueba) -> closed/open."""
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Consulta sin efectos: ¿dejaría pasar una petición ahora?"""
+        return self.state == "closed" or time.monotonic() - self.opened_at >= self.cooldown
+
+    def allow(self) -> bool:
+        """Gate antes de cada petición; en half_open deja pasar una sola prueba."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            # A half-open probe that never reported back is retried after a cooldown
+            if now - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                self.opened_at = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self, trip: bool = False):
+        """`trip=True` abre el circuito sin esperar al umbral (429, geo-bloqueo)."""
+        with self._lock:
+            self.failures += 1
+            if trip or self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class _VenueHealth:
+    __slots__ = ("bucket", "breaker", "latency", "error_rate", "requests", "errors", "throttled")
+
+    def __init__(self, bucket: TokenBucket, breaker: CircuitBreaker):
+        self.bucket = bucket
+        self.breaker = breaker
+        self.latency: Optional[float] = None  # EWMA (s)
+        self.error_rate = 0.0  # EWMA (0..1)
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+
+class ExchangeHealth:
+    """Registro de límites, breakers y scoring por exchange."""
+
+    def __init__(
+        self,
+        alpha: float = 0.2,
+        failure_threshold: int = 3,
+        cooldown: float = 60.0,
+        acquire_timeout: float = 1.0,
+    ):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.acquire_timeout = acquire_timeout
+        self._venues: Dict[str, _VenueHealth] = {}
+        self._lock = threading.Lock()
+
+    def _venue(self, exchange_id: str) -> _VenueHealth:
+        venue = self._venues.get(exchange_id)
+        if venue is None:
+            with self._lock:
+                venue = self._venues.get(exchange_id)
+                if venue is None:
+                    limits = VENUE_LIMITS.get(exchange_id, DEFAULT_LIMIT)
+                    venue = _VenueHealth(
+                        TokenBucket(limits["rate"], limits["burst"]),
+                        CircuitBreaker(self.failure_threshold, self.cooldown),
+                    )
+                    self._venues[exchange_id] = venue
+        return venue
+
+    def score(self, exchange_id: str) -> float:
+        """Menor es mejor: latencia EWMA penalizada por la tasa de error."""
+        venue = self._venue(exchange_id)
+        latency = venue.latency if venue.latency is not None else 0.5
+        return latency * (1.0 + 10.0 * venue.error_rate)
+
+    def ordered(self, exchange_ids: Iterable[str]) -> List[str]:
+        """
+        Cadena de fallback ordenada por score (el orden original desempata),
+        sin los venues con el circuito abierto: si todos lo están, la lista
+        queda vacía y el llamador falla rápido en vez de esperar timeouts.
+        """
+        exchange_ids = list(exchange_ids)
+        ranked = sorted(
+            exchange_ids, key=lambda ex_id: (self.score(ex_id), exchange_ids.index(ex_id))
+        )
+        return [ex_id for ex_id in ranked if self._venue(ex_id).breaker.available()]
+
+    def acquire(self, exchange_id: str, timeout: Optional[float] = None) -> bool:
+        """
+        Permiso para una petición: circuito cerrado (o prueba half-open) y un
+        token disponible en `timeout` segundos. False => pasar al siguiente venue.
+        """
+        venue = self._venue(exchange_id)
+        if not venue.breaker.allow():
+            return False
+        ok = venue.bucket.acquire(self.acquire_timeout if timeout is None else timeout)
+        if not ok:
+            venue.throttled += 1
+        return ok
+
+    async def acquire_async(self, exchange_id: str, timeout: Optional[float] = None) -> bool:
+        venue = self._venue(exchange_id)
+        if not venue.breaker.allow():
+            return False
+        ok = await venue.bucket.acquire_async(self.acquire_timeout if timeout is None else timeout)
+        if not ok:
+            venue.throttled += 1
+        return ok
+
+    def record_success(self, exchange_id: str, latency: float):
+        venue = self._venue(exchange_id)
+        with self._lock:
+            venue.requests += 1
+            venue.latency = (
+                latency
+                if venue.latency is None
+                else self.alpha * latency + (1 - self.alpha) * venue.latency
+            )
+            venue.error_rate = (1 - self.alpha) * venue.error_rate
+        venue.breaker.record_success()
+
+    def record_neutral(self, exchange_id: str):
+        """
+        El venue respondió pero sin dato útil (p.ej. par no listado): cierra
+        el circuito (una prueba half-open no queda colgada) sin puntuar
+        latencia ni errores.
+        """
+        self._venue(exchange_id).breaker.record_success()
+
+    def record_failure(self, exchange_id: str, trip: bool = False):
+        venue = self._venue(exchange_id)
+        with self._lock:
+            venue.requests += 1
+            venue.errors += 1
+            venue.error_rate = self.alpha + (1 - self.alpha) * venue.error_rate
+        venue.breaker.record_failure(trip=trip)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            venues = dict(self._venues)
+        return {
+            ex_id: {
+                "state": v.breaker.state,
+                "trips": v.breaker.trips,
+                "latency_ms": round(v.latency * 1000, 1) if v.latency is not None else None,
+                "error_rate": round(v.error_rate, 3),
+                "score": round(self.score(ex_id), 3),
+                "requests": v.requests,
+                "errors": v.errors,
+                "throttled": v.throttled,
+                "tokens": round(v.bucket.tokens, 2),
+            }
+            for ex_id, v in venues.items()
+        }
+
+
+# Global Instance
+exchange_health = ExchangeHealth(
+    failure_threshold=int(os.getenv("EXCHANGE_BREAKER_THRESHOLD", "3")),
+    cooldown=float(os.getenv("EXCHANGE_BREAKER_COOLDOWN", "60")),
+)
@@ -0,0 +1,221 @@
+# backend/core/exchange_pool.py
+"""
+Process-wide pool of CCXT exchange clients.
+
+Construir `ccxt.binance(...)` en cada llamada reconstruye la sesión HTTP,
+pierde las conexiones keep-alive y vuelve a parsear los metadatos de
+mercados. Este pool mantiene clientes de larga vida por exchange:
+
+- `load_markets()` se ejecuta una sola vez por exchange y el resultado se
+  comparte entre todas sus instancias (`set_markets`), síncronas o async
+  (`get_markets` / `store_markets`).
+- Cada cliente conserva su `requests.Session` (reutilización TLS/keep-alive).
+- Thread-safe: un cliente se presta en exclusiva a un hilo (checkout/checkin),
+  con un máximo de instancias por exchange.
+
+Uso:
+    with exchange_pool.client("binance", timeout=5000) as exchange:
+        exchange.fetch_ohlcv("BTC/USDT", "1h", limit=100)
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import ccxt
+import ccxt.async_support as ccxt_async
+
+
+class ExchangePool:
+    """Pool thread-safe de clientes CCXT por exchange id."""
+
+    def __init__(self, max_clients: int = 4, markets_ttl: int = 3600):
+        self.max_clients = max_clients
+        self.markets_ttl = markets_ttl
+        self._lock = threading.Lock()
+        self._idle: Dict[str, "queue.LifoQueue[Any]"] = {}
+        self._created: Dict[str, int] = {}
+        self._markets: Dict[str, Dict[str, Any]] = {}  # {ex_id: {markets, currencies, loaded_at}}
+        self._markets_locks: Dict[str, threading.Lock] = {}
+
+    def _new_client(self, exchange_id: str) -> Any:
+        exchange_class = getattr(ccxt, exchange_id)
+        return exchange_class({"enableRateLimit": True})
+
+    def get_markets(self, exchange_id: str) -> Optional[Tuple[Dict, Dict]]:
+        """(markets, currencies) compartidos del exchange, o None si faltan o caducaron."""
+        entry = self._markets.get(exchange_id)
+        if entry and time.time() - entry["loaded_at"] < self.markets_ttl:
+            return entry["markets"], entry["currencies"]
+        return None
+
+    def store_markets(self, exchange_id: str, markets: Dict, currencies: Dict):
+        """Publica mercados cargados por cualquier cliente (p.ej. uno async)."""
+        self._markets[exchange_id] = {
+            "markets": markets,
+            "currencies": currencies,
+            "loaded_at": time.time(),
+        }
+
+    def _ensure_markets(self, exchange_id: str, exchange: Any):
+        """Carga mercados una vez por exchange y los comparte entre clientes."""
+        shared = self.get_markets(exchange_id)
+        if shared:
+            if exchange.markets is not shared[0]:
+                exchange.set_markets(*shared)
+            return
+
+        with self._lock:
+            ex_lock = self._markets_locks.setdefault(exchange_id, threading.Lock())
+
+        with ex_lock:
+            shared = self.get_markets(exchange_id)
+            if shared:
+                exchange.set_markets(*shared)
+                return
+            exchange.load_markets(reload=exchange_id in self._markets)
+            self.store_markets(exchange_id, exchange.markets, exchange.currencies)
+
+    def _checkout(self, exchange_id: str, wait: float) -> Any:
+        with self._lock:
+            idle = self._idle.setdefault(exchange_id, queue.LifoQueue())
+            try:
+                return idle.get_nowait()
+            except queue.Empty:
+                pass
+            if self._created.get(exchange_id, 0) < self.max_clients:
+                self._created[exchange_id] = self._created.get(exchange_id, 0) + 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._new_client(exchange_id)
+            except Exception:
+                with self._lock:
+                    self._created[exchange_id] -= 1
+                raise
+
+        # Pool exhausted: wait for a client to be returned
+        return idle.get(timeout=wait)
+
+    def _checkin(self, exchange_id: str, exchange: Any):
+        self._idle[exchange_id].put(exchange)
+
+    @contextmanager
+    def client(
+        self, exchange_id: str, timeout: Optional[int] = None, wait: float = 10.0
+    ) -> Iterator[Any]:
+        """
+        Presta un cliente del pool en exclusiva.
+
+        Args:
+            exchange_id: id CCXT ("binance", "kraken", ...)
+            timeout: timeout HTTP en ms para esta operación
+            wait: segundos máximos esperando un cliente libre
+        """
+        exchange = self._checkout(exchange_id, wait)
+        try:
+            if timeout is not None:
+                exchange.timeout = timeout
+            self._ensure_markets(exchange_id, exchange)
+            yield exchange
+        finally:
+            self._checkin(exchange_id, exchange)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Clientes creados/libres y antigüedad de mercados por exchange."""
+        with self._lock:
+            return {
+                ex_id: {
+                    "clients": self._created.get(ex_id, 0),
+                    "idle": self._idle[ex_id].qsize() if ex_id in self._idle else 0,
+                    "markets_age_s": (
+                        round(time.time() - self._markets[ex_id]["loaded_at"], 1)
+                        if ex_id in self._markets
+                        else None
+                    ),
+                }
+                for ex_id in self._created
+            }
+
+
+class AsyncExchangePool:
+    """
+    Clientes `ccxt.async_support` compartidos por event loop.
+
+    Un cliente async (sesión aiohttp) sirve peticiones concurrentes, así que
+    basta uno por (loop, exchange). La concurrencia por exchange se limita con
+    un semáforo. Los mercados se comparten con el pool síncrono en ambos
+    sentidos. Llamar `close_loop()` antes de cerrar el event loop.
+    """
+
+    def __init__(self, sync_pool: ExchangePool, max_concurrency: int = 10):
+        self.sync_pool = sync_pool
+        self.max_concurrency = max_concurrency
+        self._clients: Dict[Any, Dict[str, Any]] = {}  # {loop: {ex_id: client}}
+        self._semaphores: Dict[Any, Dict[str, Any]] = {}
+        self._markets_locks: Dict[Any, Dict[str, Any]] = {}
+
+    def semaphore(self, exchange_id: str):
+        """Semáforo de concurrencia del exchange para el loop actual."""
+        loop = asyncio.get_running_loop()
+        sems = self._semaphores.setdefault(loop, {})
+        if exchange_id not in sems:
+            sems[exchange_id] = asyncio.Semaphore(self.max_concurrency)
+        return sems[exchange_id]
+
+    async def client(self, exchange_id: str, timeout: Optional[int] = None) -> Any:
+        """Cliente async del loop actual con mercados cargados."""
+        loop = asyncio.get_running_loop()
+        clients = self._clients.setdefault(loop, {})
+        exchange = clients.get(exchange_id)
+        if exchange is None:
+            exchange = getattr(ccxt_async, exchange_id)({"enableRateLimit": True})
+            clients[exchange_id] = exchange
+        if timeout is not None:
+            exchange.timeout = timeout
+
+        if not exchange.markets:
+            locks = self._markets_locks.setdefault(loop, {})
+            lock = locks.setdefault(exchange_id, asyncio.Lock())
+            async with lock:
+                if not exchange.markets:
+                    shared = self.sync_pool.get_markets(exchange_id)
+                    if shared:
+                        exchange.set_markets(*shared)
+                    else:
+                        await exchange.load_markets()
+                        # Other loops and the sync clients reuse them
+                        self.sync_pool.store_markets(
+                            exchange_id, exchange.markets, exchange.currencies
+                        )
+        return exchange
+
+    async def close_loop(self):
+        """Cierra las sesiones HTTP de los clientes del loop actual."""
+        loop = asyncio.get_running_loop()
+        clients = self._clients.pop(loop, {})
+        self._semaphores.pop(loop, None)
+        self._markets_locks.pop(loop, None)
+        for exchange in clients.values():
+            try:
+                await exchange.close()
+            except Exception as e:
+                print(f"[POOL] ⚠️ Error closing async client {exchange.id}: {e}")
+
+
+# Global Instance
+exchange_pool = ExchangePool(
+    max_clients=int(os.getenv("EXCHANGE_POOL_MAX_CLIENTS", "4")),
+    markets_ttl=int(os.getenv("EXCHANGE_MARKETS_TTL", "3600")),
+)
+async_exchange_pool = AsyncExchangePool(
+    exchange_pool,
+    max_concurrency=int(os.getenv("OHLCV_BATCH_CONCURRENCY", "10")),
+)
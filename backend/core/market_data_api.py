@@ -4,135 +4,672 @@ Módulo para obtener datos de mercado en tiempo real.
 Refactorizado para usar CCXT (Binance) para consistencia con Trading Lab.
 """
 
+import asyncio
+import atexit
 import ccxt
+import concurrent.futures
+import os
+import queue
+import threading
 import time
-from typing import List, Dict, Any, Optional, Tuple, Union
+from typing import List, Dict, Any, AsyncIterator, Callable, Iterable, Optional, Tuple, Union
 from datetime import datetime
 from core.cache import cache  # Importar Cache
+from core.candle_store import candle_store
+from core.candles import CandleArray
+from core.exchange_health import exchange_health
+from core.exchange_pool import async_exchange_pool, exchange_pool
+from core.single_flight import SingleFlight
 
 print("[DEBUG] LOADING MARKET_DATA_API (Scale-Ready Fix)")
 
+# Coalesces concurrent fetches for the same cache key (threads + asyncio)
+_inflight = SingleFlight()
+
+# OHLCV cache: one entry per (symbol, timeframe) holding the largest recent
+# window; smaller `limit` requests are answered by slicing its tail.
+OHLCV_CACHE_TTL = 20
+OHLCV_STALE_TTL = 60  # Seconds past TTL a window may still be served while refreshing
+SUMMARY_CACHE_TTL = 15
+SUMMARY_STALE_TTL = 60
+REFRESH_AHEAD = 3  # Hot keys are refreshed this many seconds before expiry
+HOT_KEY_IDLE = 120  # A hot key with no traffic for this long stops being refreshed
+HOT_KEY_MIN_HITS = 3  # Requests (each within HOT_KEY_IDLE of the last) before a key turns hot
+MAX_HOT_KEYS = 32
+MAX_HINTED_WINDOW = 1000
+WINDOW_HINT_TTL = 5 * OHLCV_CACHE_TTL  # A hint not renewed for this long stops widening fetches
+# Timeframes probed by get_current_price before touching the network
+CACHED_TIMEFRAMES = ["1m", "5m", "15m", "30m", "1h", "4h", "1d"]
+# Largest window recently requested per (symbol, timeframe), capped, with
+# the last time a request that large was seen
+_window_hints: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
+
+def _base_symbol(symbol: str) -> str:
+    return symbol.upper().replace("USDT", "").replace("-", "")
+
+
+def _ohlcv_cache_key(base_symbol: str, timeframe: str) -> str:
+    return f"ohlcv:{base_symbol}:{timeframe}"
+
+
+def _cached_window(
+    cache_key: str, limit: int, allow_stale: bool = False, min_last_open: int = 0
+) -> Optional[CandleArray]:
+    """
+    Ventana cacheada completa si cubre `limit` velas, si no None.
+    `min_last_open` (ms): exige que la última vela abra en o después de ese
+    instante (p.ej. la vela en curso tras un cierre).
+    """
+    if allow_stale:
+        peeked = cache.peek(cache_key)
+        entry = peeked[0] if peeked else None
+    else:
+        entry = cache.get(cache_key)
+    if entry and entry["limit"] >= limit and entry["candles"]:
+        if entry["candles"].timestamp[-1] >= min_last_open:
+            return entry["candles"]
+    return None
+
+
+# === STALE-WHILE-REVALIDATE ===
+# Una entrada vencida pero reciente se sirve al instante mientras un único
+# refresco corre en segundo plano (mismo Single-Flight que las peticiones).
+# Las claves calientes (watchlist de /market/summary) se refrescan antes de
+# vencer, así ninguna petición paga la latencia del exchange.
+
+_refresh_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="market-refresh"
+)
+_refresh_lock = threading.Lock()
+_refreshing: set = set()
+_hot_lock = threading.Lock()
+_hot_keys: Dict[str, Tuple[float, Callable[..., Any], tuple]] = {}
+_hot_hits: Dict[str, Tuple[int, float]] = {}  # Candidates: (hits, last access)
+_hot_refresher: Optional[threading.Thread] = None
+
+
+def _refresh_in_background(flight_key: str, fn: Callable[..., Any], *args) -> bool:
+    """Lanza `fn(*args)` en segundo plano salvo que ya haya un refresco de esa clave."""
+    with _refresh_lock:
+        if flight_key in _refreshing:
+            return False
+        _refreshing.add(flight_key)
+
+    def _run():
+        try:
+            _inflight.do(flight_key, fn, *args)
+        except Exception as e:
+            print(f"[CACHE] ⚠️ Background refresh failed for {flight_key}: {e}")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(flight_key)
+
+    _refresh_executor.submit(_run)
+    return True
+
+
+def _mark_hot(cache_key: str, fn: Callable[..., Any], *args):
+    """
+    Cuenta un acceso a `cache_key`. Tras `HOT_KEY_MIN_HITS` accesos seguidos
+    pasa a refresco proactivo mientras siga recibiendo tráfico; una petición
+    suelta (símbolos ad-hoc) no genera refrescos en segundo plano.
+    """
+    global _hot_refresher
+    now = time.time()
+    with _hot_lock:
+        if cache_key in _hot_keys:
+            _hot_keys[cache_key] = (now, fn, args)
+        else:
+            hits, last_access = _hot_hits.get(cache_key, (0, now))
+            hits = hits + 1 if now - last_access <= HOT_KEY_IDLE else 1
+            if hits >= HOT_KEY_MIN_HITS and len(_hot_keys) < MAX_HOT_KEYS:
+                _hot_hits.pop(cache_key, None)
+                _hot_keys[cache_key] = (now, fn, args)
+            else:
+                _hot_hits[cache_key] = (hits, now)
+    if _hot_refresher is None:
+        with _refresh_lock:
+            if _hot_refresher is None:
+                _hot_refresher = threading.Thread(
+                    target=_hot_refresh_loop, name="market-hot-refresh", daemon=True
+                )
+                _hot_refresher.start()
+
+
+def _hot_refresh_loop():
+    while True:
+        time.sleep(1)
+        try:
+            _refresh_hot_keys()
+        except Exception as e:
+            print(f"[CACHE] ⚠️ Hot key refresh error: {e}")
+
+
+def _refresh_hot_keys():
+    """Refresca las claves calientes a punto de vencer; olvida las inactivas."""
+    now = time.time()
+    with _hot_lock:
+        for cache_key, (_, last_access) in list(_hot_hits.items()):
+            if now - last_access > HOT_KEY_IDLE:
+                del _hot_hits[cache_key]
+        for cache_key, (last_access, _, _) in list(_hot_keys.items()):
+            if now - last_access > HOT_KEY_IDLE:
+                del _hot_keys[cache_key]
+        hot = list(_hot_keys.items())
+    for cache_key, (_, fn, args) in hot:
+        entry = cache.peek(cache_key)
+        if entry is None or entry[1] - now <= REFRESH_AHEAD:
+            _refresh_in_background(cache_key, fn, *args)
+
 
 def get_ohlcv_data(
     symbol: str, timeframe: str = "30m", limit: int = 100, return_source: bool = False
 ) -> Union[List[Dict[str, Any]], Tuple[List[Dict[str, Any]], str]]:
     """
-    Obtiene datos OHLCV con Caching + Fallback.
-    TTL: 60s para reducir latencia.
+    Obtiene datos OHLCV con Caching + Candle Store local + Fallback.
+    TTL: 20s para reducir latencia.
+
+    Formato legacy (lista de dicts). Para estrategias/backtest preferir
+    `get_ohlcv_arrays`, que evita construir un dict por vela.
+    """
+    window, source = _get_window(symbol, timeframe, limit)
+    # Dicts only for the requested tail (the cached window may be larger)
+    ohlcv = window.tail(limit).to_records() if window else []
+    if return_source:
+        return ohlcv, source
+    return ohlcv
+
+
+def get_ohlcv_arrays(
+    symbol: str, timeframe: str = "30m", limit: int = 100, return_source: bool = False
+) -> Union[CandleArray, Tuple[CandleArray, str]]:
+    """
+    Igual que `get_ohlcv_data` pero devuelve un `CandleArray` columnar
+    (vistas NumPy / DataFrame sin copia). Vacío si todos los exchanges fallan.
+    """
+    window, source = _get_window(symbol, timeframe, limit)
+    candles = window.tail(limit) if window else CandleArray.empty()
+    if return_source:
+        return candles, source
+    return candles
+
+
+def _get_window(symbol: str, timeframe: str, limit: int) -> Tuple[Optional[CandleArray], str]:
+    """
+    Resuelve la ventana (>= limit velas) desde caché o red.
+
+    La caché guarda la ventana más grande reciente por (symbol, timeframe):
+    un `limit` menor se sirve cortando su cola sin ir a red. Solo se descargan
+    las velas posteriores al último cierre almacenado en `core.candle_store`.
     """
-    # 1. Intentar Cache
-    cache_key = f"ohlcv:{symbol.upper()}:{timeframe}:{limit}"
-    cached_data = cache.get(cache_key)
-    if cached_data:
+    base_symbol = _base_symbol(symbol)
+    cache_key = _ohlcv_cache_key(base_symbol, timeframe)
+
+    # 1. Intentar Cache (any fresh window >= limit)
+    cached_window = _cached_window(cache_key, limit)
+    if cached_window:
         # print(f"[MARKET] ⚡ Cache Hit for {cache_key}")
-        if return_source:
-            return cached_data, "cache"
-        return cached_data
+        return cached_window, "cache"
 
-    # ... execution continues ...
+    fetch_limit = _fetch_limit_for(base_symbol, timeframe, limit)
+    flight_key = f"{cache_key}:{fetch_limit}"
+
+    # 2. Stale-While-Revalidate: serve the expired window, refresh behind it
+    stale_window = _cached_window(cache_key, limit, allow_stale=True)
+    if stale_window:
+        _refresh_in_background(
+            flight_key, _load_ohlcv, base_symbol, timeframe, fetch_limit, cache_key
+        )
+        cache.record_stale_hit(cache_key)
+        return stale_window, "cache"
+
+    # 3. Single-Flight: concurrent misses for the same window share one fetch
+    window, ex_id = _inflight.do(
+        flight_key,
+        _load_ohlcv, base_symbol, timeframe, fetch_limit, cache_key,
+    )
+    if window:
+        return window, ex_id
+
+    # 4. Last Resort: Fail gracefully (No Mocks allowed per User Request)
+    print("[MARKET DATA] 🚨 All exchanges failed. Returning EMPTY to avoid fake data.")
+    return None, "none"
 
-    base_symbol = symbol.upper().replace("USDT", "").replace("-", "")
-    ccxt_symbol = f"{base_symbol}/USDT"
 
-    # [HARDENING] Symbol Migration Handling (e.g., MATIC -> POL)
-    # If the exchange rejects "MATIC", we might need "POL".
-    # We will try the primary symbol first, and if it fails with specific errors, try aliases.
-    aliases = {
-        "MATIC": "POL",
-        # Add others if needed
+def _fetch_limit_for(base_symbol: str, timeframe: str, limit: int) -> int:
+    """
+    Fetch the largest window recently asked for, so that every consumer of
+    this (symbol, timeframe) is served by a single cache entry. Once nobody
+    has asked for that window in `WINDOW_HINT_TTL` seconds it stops counting.
+    """
+    hint_key = (base_symbol, timeframe)
+    now = time.time()
+    hint, seen_at = _window_hints.get(hint_key, (0, 0.0))
+    if now - seen_at > WINDOW_HINT_TTL:
+        hint = 0
+    if limit >= hint:
+        _window_hints[hint_key] = (min(limit, MAX_HINTED_WINDOW), now)
+    return max(limit, hint)
+
+
+def _load_ohlcv(
+    base_symbol: str, timeframe: str, limit: int, cache_key: str
+) -> Tuple[Optional[CandleArray], str]:
+    """
+    Cuerpo del vuelo único: Candle Store (incremental) -> Exchange -> Cache.
+    La caché se rellena dentro del vuelo, antes de liberar a los que esperan.
+    """
+    # Re-check: a flight that just finished may have filled the cache
+    cached_window = _cached_window(cache_key, limit)
+    if cached_window:
+        return cached_window, "cache"
+
+    data, ex_id = _fetch_ohlcv_incremental(base_symbol, timeframe, limit)
+    if not data:
+        return None, ex_id
+
+    window = CandleArray.from_rows(data)
+    _cache_window(cache_key, limit, window)
+    return window, ex_id
+
+
+def _cache_window(cache_key: str, limit: int, window: CandleArray):
+    # Cache Valid Data: 20s TTL (Balance between load and freshness)
+    # Never replace a larger fresh window with a smaller one.
+    current = cache.get(cache_key)
+    if not current or current["limit"] <= limit:
+        cache.set(
+            cache_key,
+            {"limit": limit, "candles": window},
+            ttl=OHLCV_CACHE_TTL,
+            stale_ttl=OHLCV_STALE_TTL,
+        )
+
+
+def get_fetch_stats() -> Dict[str, Any]:
+    """Métricas de observabilidad de la capa de datos de mercado."""
+    return {
+        "single_flight": _inflight.stats(),
+        "exchange_pool": exchange_pool.stats(),
+        "exchange_health": exchange_health.stats(),
+        "cache": cache.stats(),
+        "refresh": {"in_progress": len(_refreshing), "hot_keys": len(_hot_keys)},
     }
 
-    # 1. Fallback Order
-    exchanges_config = [
-        {"id": "binance", "class": ccxt.binance, "timeout": 5000},  # 5s timeout
-        {"id": "kraken", "class": ccxt.kraken, "timeout": 5000},    # Strong Regulatory Compliance (No 451/403 usually)
-        {"id": "kucoin", "class": ccxt.kucoin, "timeout": 5000},    # 5s timeout
-        {"id": "gateio", "class": ccxt.gateio, "timeout": 5000},    # Good Altcoin coverage
-        {"id": "bybit", "class": ccxt.bybit, "timeout": 5000},      # Strict Geo-Blocking (Last resort)
-    ]
 
-    for cfg in exchanges_config:
-        ex_id = cfg["id"]
+def _timeframe_ms(timeframe: str) -> int:
+    """Duración de una vela en milisegundos ('1h' -> 3600000)."""
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+
+def _fetch_ohlcv_incremental(
+    base_symbol: str, timeframe: str, limit: int
+) -> Tuple[List[list], str]:
+    """
+    Sirve la ventana desde el candle store descargando solo velas nuevas.
+
+    - Si el store cubre la ventana y su último cierre está dentro de ella,
+      se pide al exchange solo desde ese último timestamp (inclusive, para
+      refrescar la vela en formación).
+    - Si no hay datos suficientes o están demasiado viejos, descarga completa
+      y la serie almacenada se reemplaza (sin huecos).
+    """
+    stored, since, fetch_limit = _plan_incremental(base_symbol, timeframe, limit)
+    if since is not None:
+        fresh, ex_id = _fetch_from_exchanges(base_symbol, timeframe, fetch_limit, since=since)
+        if fresh:
+            return _save_fetched(base_symbol, timeframe, limit, stored, fresh), ex_id
+
+    data, ex_id = _fetch_from_exchanges(base_symbol, timeframe, limit)
+    return _save_fetched(base_symbol, timeframe, limit, None, data), ex_id
+
+
+def _plan_incremental(
+    base_symbol: str, timeframe: str, limit: int
+) -> Tuple[Optional[List[list]], Optional[int], int]:
+    """
+    Decide qué pedir al exchange según el candle store.
+    Retorna (stored, since, fetch_limit); since=None implica descarga completa.
+    """
+    if candle_store is None:
+        return None, None, limit
+
+    try:
+        tf_ms = _timeframe_ms(timeframe)
+        stored = candle_store.load(base_symbol, timeframe, limit)
+    except Exception as e:
+        print(f"[CANDLES] ⚠️ Store read failed for {base_symbol} {timeframe}: {e}")
+        return None, None, limit
+
+    now_ms = int(time.time() * 1000)
+    if len(stored) >= limit:
+        last_ts = stored[-1][0]
+        missing = (now_ms - last_ts) // tf_ms + 1
+        if missing < limit:
+            return stored, last_ts, int(missing) + 1
+    return None, None, limit
+
+
+def _save_fetched(
+    base_symbol: str, timeframe: str, limit: int, stored: Optional[List[list]], fresh: List[list]
+) -> List[list]:
+    """
+    Persiste lo descargado y devuelve la ventana final.
+    `stored` None => descarga completa (reemplaza la serie almacenada).
+    """
+    if not fresh or candle_store is None:
+        return fresh
+
+    try:
+        if stored is None:
+            candle_store.upsert(base_symbol, timeframe, fresh, replace=True)
+            return fresh
+        candle_store.upsert(base_symbol, timeframe, fresh)
+        return candle_store.load(base_symbol, timeframe, limit)
+    except Exception as e:
+        print(f"[CANDLES] ⚠️ Store write failed for {base_symbol} {timeframe}: {e}")
+        if stored is None:
+            return fresh
+        merged = [c for c in stored if c[0] < fresh[0][0]] + fresh
+        return merged[-limit:]
+
+
+# [HARDENING] Symbol Migration Handling (e.g., MATIC -> POL)
+# If the exchange rejects "MATIC", we might need "POL".
+# We will try the primary symbol first, and if it fails with specific errors, try aliases.
+SYMBOL_ALIASES = {
+    "MATIC": "POL",
+    # Add others if needed
+}
+
+# Fallback Chain (OHLCV). Base order only: `exchange_health.ordered()`
+# re-ranks it per call by latency/error score and skips open circuits.
+OHLCV_EXCHANGES = [
+    {"id": "binance", "timeout": 5000},  # 5s timeout
+    {"id": "kraken", "timeout": 5000},   # Strong Regulatory Compliance (No 451/403 usually)
+    {"id": "kucoin", "timeout": 5000},   # 5s timeout
+    {"id": "gateio", "timeout": 5000},   # Good Altcoin coverage
+    {"id": "bybit", "timeout": 5000},    # Strict Geo-Blocking (Last resort)
+]
+
+# Errores que abren el circuito del venue al instante (429/418, geo-bloqueo 451/403)
+VENUE_TRIP_ERRORS = (ccxt.RateLimitExceeded, ccxt.DDoSProtection, ccxt.ExchangeNotAvailable)
+
+
+def _record_venue_error(ex_id: str, error: BaseException):
+    """
+    Un par no listado (BadSymbol) no dice nada de la salud del venue, pero sí
+    que respondió. Un pool sin clientes libres (`queue.Empty` del checkout)
+    es presión local, no un fallo del venue.
+    """
+    if isinstance(error, queue.Empty):
+        return
+    if isinstance(error, ccxt.BadSymbol):
+        exchange_health.record_neutral(ex_id)
+        return
+    exchange_health.record_failure(ex_id, trip=isinstance(error, VENUE_TRIP_ERRORS))
+
+
+def _fetch_from_exchanges(
+    base_symbol: str, timeframe: str, limit: int, since: Optional[int] = None
+) -> Tuple[List[list], str]:
+    """
+    Descarga velas crudas (formato CCXT) recorriendo la cadena de fallback.
+    Los clientes salen del pool compartido (`core.exchange_pool`); el orden,
+    los límites de tasa y los circuit breakers vienen de `core.exchange_health`.
+    Sin sleeps de backoff: un venue que falla cede el turno al siguiente.
+    Retorna (filas, exchange_id) o ([], "none") si todos fallan.
+    """
+    ccxt_symbol = f"{base_symbol}/USDT"
+    timeouts = {cfg["id"]: cfg["timeout"] for cfg in OHLCV_EXCHANGES}
+
+    for ex_id in exchange_health.ordered(timeouts):
+        if not exchange_health.acquire(ex_id):
+            print(f"[MARKET DATA] ⏭️ Skipping {ex_id} (circuit open / rate limited).")
+            continue
+        start = time.monotonic()
         try:
             print(f"[MARKET DATA] Attempting fetch {ccxt_symbol} from {ex_id}...")
-            exchange = cfg["class"](
-                {"enableRateLimit": True, "timeout": cfg["timeout"]}
-            )
-
-            # [HARDENING] Retry with Exponential Backoff
-            # Handles 429 Rate Limits gracefully prevents stampedes.
-            max_retries = 3
-            backoff = 1  # Start 1s
-            
-            for attempt in range(max_retries):
-                try:
-                    # Try Primary Symbol
-                    data = exchange.fetch_ohlcv(ccxt_symbol, timeframe, limit=limit)
-                    break # Success
-                except Exception as e:
-                    # Check for Alias (Migration fallback)
-                    alias = aliases.get(base_symbol)
-                    if alias:
-                        try:
-                            alias_symbol = f"{alias}/USDT"
-                            # print(f"[MARKET] ⚠️ Primary {ccxt_symbol} failed. Trying {alias_symbol}...")
-                            data = exchange.fetch_ohlcv(alias_symbol, timeframe, limit=limit)
-                            # If successful, print and break
-                            print(f"[MARKET] ✅ Recovered using alias {alias_symbol} on {ex_id}")
-                            break
-                        except Exception:
-                            pass # Alias failed too, proceed to standard retry logic
-
-                    # Standard Retry Logic
-                    is_network_error = isinstance(e, (ccxt.NetworkError, ccxt.RateLimitExceeded))
-                    if attempt == max_retries - 1:
-                         # Last attempt failed, raise to skip to next exchange
-                         # print(f"[MARKET] Drop {ex_id}: {e}")
-                         raise e 
-                     
-                    if is_network_error:
-                        sleep_time = backoff * (2 ** attempt)
-                        print(f"[MARKET] ⚠️ {ex_id} Network/Rate Error. Retrying in {sleep_time}s...")
-                        time.sleep(sleep_time)
-                    else:
-                        # If it's a Logic Error (Bad Symbol) and alias failed, strictly break to next exchange
-                        # Don't retry BadSymbol 3 times
-                        raise e
-
-            if data and len(data) > 0:
-                print(f"[MARKET DATA] Success: {len(data)} candles from {ex_id}.")
-
-                # Format
-                ohlcv = []
-                for candle in data:
-                    ts = candle[0]
-                    dt = datetime.fromtimestamp(ts / 1000)
-                    ohlcv.append(
-                        {
-                            "timestamp": ts,
-                            "time": dt.strftime("%Y-%m-%d %H:%M"),
-                            "open": float(candle[1]),
-                            "high": float(candle[2]),
-                            "low": float(candle[3]),
-                            "close": float(candle[4]),
-                            "volume": float(candle[5]),
-                        }
-                    )
-
-                # Cache Valid Data: 20s TTL (Balance between load and freshness)
-                cache.set(cache_key, ohlcv, ttl=20)
-                if return_source:
-                    return ohlcv, ex_id
-                return ohlcv
+            with exchange_pool.client(ex_id, timeout=timeouts[ex_id]) as exchange:
+                data = _fetch_ohlcv_symbol(exchange, ex_id, base_symbol, timeframe, limit, since)
         except BaseException as e:
+            _record_venue_error(ex_id, e)
             print(f"[MARKET DATA] ⚠️ Failed fetch from {ex_id}: {e}")
             continue  # Try next exchange
 
-    # 2. Last Resort: Fail gracefully (No Mocks allowed per User Request)
-    print("[MARKET DATA] 🚨 All exchanges failed. Returning EMPTY to avoid fake data.")
-    if return_source:
-        return [], "none"
-    return []
+        exchange_health.record_success(ex_id, time.monotonic() - start)
+        if data and len(data) > 0:
+            print(f"[MARKET DATA] Success: {len(data)} candles from {ex_id}.")
+            return data, ex_id
+
+    return [], "none"
+
+
+def _fetch_ohlcv_symbol(
+    exchange, ex_id: str, base_symbol: str, timeframe: str, limit: int, since: Optional[int]
+) -> List[list]:
+    """fetch_ohlcv con fallback al alias del símbolo (migraciones tipo MATIC -> POL)."""
+    try:
+        # Try Primary Symbol
+        return exchange.fetch_ohlcv(f"{base_symbol}/USDT", timeframe, since=since, limit=limit)
+    except Exception:
+        alias = SYMBOL_ALIASES.get(base_symbol)
+        if not alias:
+            raise
+        # Alias failure propagates: the caller scores the venue and moves on
+        alias_symbol = f"{alias}/USDT"
+        data = exchange.fetch_ohlcv(alias_symbol, timeframe, since=since, limit=limit)
+        print(f"[MARKET] ✅ Recovered using alias {alias_symbol} on {ex_id}")
+        return data
+
+# === ASYNC BATCH API (Scanner Personas) ===
+# Un escáner de 50 tokens hacía 50 descargas en serie (peor caso ~50 x 5s
+# de timeout). Aquí se lanzan en paralelo sobre `ccxt.async_support`, con un
+# semáforo por exchange y el mismo Single-Flight / Cache / Candle Store.
+
+
+async def iter_ohlcv_batch(
+    symbols: Iterable[str], timeframe: str = "30m", limit: int = 100, min_last_open: int = 0
+) -> AsyncIterator[Tuple[str, CandleArray]]:
+    """
+    Descarga OHLCV de varios símbolos en paralelo y los entrega según llegan.
+    `min_last_open` (ms): ventanas cacheadas más viejas se descargan de nuevo.
+
+    Yields:
+        (symbol, CandleArray). Los símbolos cuya descarga falla se omiten.
+    """
+    tasks = []
+    for symbol in dict.fromkeys(symbols):  # dedupe, keep order
+        cache_key = _ohlcv_cache_key(_base_symbol(symbol), timeframe)
+        cached_window = _cached_window(cache_key, limit, min_last_open=min_last_open)
+        if cached_window:
+            yield symbol, cached_window.tail(limit)
+            continue
+        tasks.append(
+            asyncio.ensure_future(_get_window_async(symbol, timeframe, limit, min_last_open))
+        )
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            symbol, window = await next_done
+            if window:
+                yield symbol, window.tail(limit)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def get_ohlcv_batch(
+    symbols: Iterable[str], timeframe: str = "30m", limit: int = 100, min_last_open: int = 0
+) -> Dict[str, CandleArray]:
+    """Versión agregada de `iter_ohlcv_batch`: {symbol: CandleArray}."""
+    return {
+        symbol: window
+        async for symbol, window in iter_ohlcv_batch(symbols, timeframe, limit, min_last_open)
+    }
+
+
+# Event loop de fondo del puente síncrono: sus clientes async (sesiones
+# aiohttp, mercados) sobreviven entre ciclos del scheduler en vez de crearse
+# y cerrarse en cada `asyncio.run`.
+_batch_loop: Optional[asyncio.AbstractEventLoop] = None
+_batch_loop_pid: Optional[int] = None
+_batch_loop_lock = threading.Lock()
+
+
+def _get_batch_loop() -> asyncio.AbstractEventLoop:
+    global _batch_loop, _batch_loop_pid
+    with _batch_loop_lock:
+        # A forked worker inherits the loop object but not its thread
+        if _batch_loop is None or _batch_loop.is_closed() or _batch_loop_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+
+            def _run():
+                loop.run_forever()
+                loop.close()
+
+            threading.Thread(target=_run, name="ohlcv-batch-loop", daemon=True).start()
+            if _batch_loop is None:
+                atexit.register(close_batch_loop)
+            _batch_loop, _batch_loop_pid = loop, os.getpid()
+        return _batch_loop
+
+
+def close_batch_loop(timeout: float = 10.0):
+    """Cierra los clientes async del puente síncrono y detiene su loop."""
+    global _batch_loop
+    with _batch_loop_lock:
+        loop, _batch_loop = _batch_loop, None
+    if loop is None or loop.is_closed() or _batch_loop_pid != os.getpid():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(async_exchange_pool.close_loop(), loop).result(timeout)
+    except Exception as e:
+        print(f"[POOL] ⚠️ Error closing batch loop clients: {e}")
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def get_ohlcv_batch_sync(
+    symbols: Iterable[str], timeframe: str = "30m", limit: int = 100, min_last_open: int = 0
+) -> Dict[str, CandleArray]:
+    """
+    Puente síncrono para hilos del scheduler: ejecuta el batch en el event
+    loop de fondo (`_get_batch_loop`), reutilizando sus clientes entre
+    llamadas. Si ya hay un loop corriendo en este hilo, cae a descargas
+    secuenciales (mismo resultado, sin paralelismo).
+    """
+    symbols = list(symbols)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        result = {}
+        for symbol in dict.fromkeys(symbols):
+            window = get_ohlcv_arrays(symbol, timeframe, limit)
+            if window:
+                result[symbol] = window
+        return result
+
+    return asyncio.run_coroutine_threadsafe(
+        get_ohlcv_batch(symbols, timeframe, limit, min_last_open), _get_batch_loop()
+    ).result()
+
+
+async def _get_window_async(
+    symbol: str, timeframe: str, limit: int, min_last_open: int = 0
+) -> Tuple[str, Optional[CandleArray]]:
+    base_symbol = _base_symbol(symbol)
+    cache_key = _ohlcv_cache_key(base_symbol, timeframe)
+    fetch_limit = _fetch_limit_for(base_symbol, timeframe, limit)
+
+    try:
+        window, _ = await _inflight.do_async(
+            f"{cache_key}:{fetch_limit}",
+            _load_ohlcv_async,
+            base_symbol,
+            timeframe,
+            fetch_limit,
+            cache_key,
+            min_last_open,
+        )
+    except Exception as e:
+        print(f"[MARKET DATA] ❌ Batch fetch failed for {symbol}: {e}")
+        return symbol, None
+
+    if not window:
+        print(f"[MARKET DATA] ❌ All exchanges failed for {symbol} {timeframe}.")
+    return symbol, window
+
+
+async def _load_ohlcv_async(
+    base_symbol: str, timeframe: str, limit: int, cache_key: str, min_last_open: int = 0
+) -> Tuple[Optional[CandleArray], str]:
+    """Equivalente async de `_load_ohlcv` (el candle store corre en un hilo)."""
+    cached_window = _cached_window(cache_key, limit, min_last_open=min_last_open)
+    if cached_window:
+        return cached_window, "cache"
+
+    stored, since, fetch_limit = await asyncio.to_thread(
+        _plan_incremental, base_symbol, timeframe, limit
+    )
+    data, ex_id = [], "none"
+    if since is not None:
+        data, ex_id = await _fetch_from_exchanges_async(
+            base_symbol, timeframe, fetch_limit, since=since
+        )
+    if not data:
+        stored = None
+        data, ex_id = await _fetch_from_exchanges_async(base_symbol, timeframe, limit)
+    data = await asyncio.to_thread(_save_fetched, base_symbol, timeframe, limit, stored, data)
+    if not data:
+        return None, ex_id
+
+    window = CandleArray.from_rows(data)
+    _cache_window(cache_key, limit, window)
+    return window, ex_id
+
+
+async def _fetch_from_exchanges_async(
+    base_symbol: str, timeframe: str, limit: int, since: Optional[int] = None
+) -> Tuple[List[list], str]:
+    """Cadena de fallback async; concurrencia limitada por semáforo de exchange."""
+    timeouts = {cfg["id"]: cfg["timeout"] for cfg in OHLCV_EXCHANGES}
+
+    for ex_id in exchange_health.ordered(timeouts):
+        try:
+            async with async_exchange_pool.semaphore(ex_id):
+                if not await exchange_health.acquire_async(ex_id):
+                    continue
+                start = time.monotonic()
+                exchange = await async_exchange_pool.client(ex_id, timeout=timeouts[ex_id])
+                data = await _fetch_ohlcv_symbol_async(
+                    exchange, ex_id, base_symbol, timeframe, limit, since
+                )
+        except Exception as e:
+            _record_venue_error(ex_id, e)
+            print(f"[MARKET DATA] ⚠️ Failed async fetch {base_symbol} from {ex_id}: {e}")
+            continue
+
+        exchange_health.record_success(ex_id, time.monotonic() - start)
+        if data:
+            return data, ex_id
+
+    return [], "none"
+
+
+async def _fetch_ohlcv_symbol_async(
+    exchange, ex_id: str, base_symbol: str, timeframe: str, limit: int, since: Optional[int]
+) -> List[list]:
+    """Igual que `_fetch_ohlcv_symbol` sobre un cliente async."""
+    try:
+        return await exchange.fetch_ohlcv(f"{base_symbol}/USDT", timeframe, since=since, limit=limit)
+    except Exception:
+        alias = SYMBOL_ALIASES.get(base_symbol)
+        if not alias:
+            raise
+        return await exchange.fetch_ohlcv(f"{alias}/USDT", timeframe, since=since, limit=limit)
 
 
 def generate_mock_ohlcv(symbol: str, limit: int = 100) -> List[Dict[str, Any]]:
@@ -181,17 +718,41 @@ def get_market_summary(symbols: List[str]) -> List[Dict[str, Any]]:
     """
     # 1. Cache Check (Strict)
     s_key = "-".join(sorted(symbols))
-    cache_key = f"market:summary:{hash(s_key)}"
-    cached = cache.get(cache_key)
-    if cached:
+    cache_key = f"market:summary:{s_key}"  # Stable across processes (shared L2)
+    # Dashboards poll the same watchlist: once it proves hot, keep it warm ahead of expiry
+    _mark_hot(cache_key, _load_market_summary, symbols, cache_key, True)
+
+    entry = cache.peek(cache_key)
+    if entry:
+        cached, expires_at = entry
+        if time.time() >= expires_at:
+            # Stale-While-Revalidate
+            _refresh_in_background(cache_key, _load_market_summary, symbols, cache_key)
+            cache.record_stale_hit(cache_key)
         return cached
 
-    # 2. Try Fetch with Fallbacks
+    # 2. Single-Flight fetch (concurrent requests share one ticker call)
+    return _inflight.do(cache_key, _load_market_summary, symbols, cache_key)
+
+
+def _load_market_summary(
+    symbols: List[str], cache_key: str, force: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Descarga tickers con fallback y rellena la caché (cuerpo del vuelo único).
+    `force` salta el re-check de caché (refresco anticipado de claves calientes).
+    """
+    if not force:
+        cached = cache.get(cache_key)
+        if cached:
+            return cached
+
+    # Try Fetch with Fallbacks
     exchanges_config = [
-        {"id": "binance", "class": ccxt.binance},
-        {"id": "kucoin", "class": ccxt.kucoin},
-        {"id": "bybit", "class": ccxt.bybit},
-        {"id": "kraken", "class": ccxt.kraken}, # Kraken often reliable in US/EU
+        {"id": "binance"},
+        {"id": "kucoin"},
+        {"id": "bybit"},
+        {"id": "kraken"}, # Kraken often reliable in US/EU
     ]
 
     unique_syms = list(set([s.upper().replace("USDT", "").replace("-", "") for s in symbols]))
@@ -199,20 +760,18 @@ def get_market_summary(symbols: List[str]) -> List[Dict[str, Any]]:
     # Some exchanges need specific handling if strictly needed, but CCXT handles most "/"
     pairs = [f"{s}/USDT" for s in unique_syms]
 
-    for cfg in exchanges_config:
-        ex_id = cfg["id"]
+    for ex_id in exchange_health.ordered(cfg["id"] for cfg in exchanges_config):
+        if not exchange_health.acquire(ex_id):
+            continue
+        start = time.monotonic()
         try:
-            exchange = cfg["class"]({
-                "enableRateLimit": True,
-                "timeout": 4000
-            })
-            
             # Special handling for Kraken pairs if needed (often XBT/USD or similar), 
             # but let's stick to standard USDT pairs for crypto-to-crypto exchanges.
             # If Kraken fails on USDT pairs, loop continues.
-            
-            tickers = exchange.fetch_tickers(pairs)
-            
+            with exchange_pool.client(ex_id, timeout=4000) as exchange:
+                tickers = exchange.fetch_tickers(pairs)
+            exchange_health.record_success(ex_id, time.monotonic() - start)
+
             summary = []
             for p in pairs:
                 t = tickers.get(p)
@@ -229,12 +788,13 @@ def get_market_summary(symbols: List[str]) -> List[Dict[str, Any]]:
                     })
             
             if summary:
-                # 3. Set Cache: 15s TTL
-                cache.set(cache_key, summary, ttl=15)
+                # 3. Set Cache: 15s TTL (+ stale window)
+                cache.set(cache_key, summary, ttl=SUMMARY_CACHE_TTL, stale_ttl=SUMMARY_STALE_TTL)
                 # print(f"[MARKET] Got summary from {ex_id}")
                 return summary
 
         except Exception as e:
+            _record_venue_error(ex_id, e)
             print(f"[MARKET] Failed to fetch summary from {ex_id}: {e}")
             continue
 
@@ -245,6 +805,13 @@ def get_current_price(symbol: str) -> Optional[float]:
     """
     Obtiene el precio actual de un símbolo.
     """
+    base_symbol = _base_symbol(symbol)
+    # Any fresh cached window (any timeframe) already holds the latest close
+    for tf in CACHED_TIMEFRAMES:
+        window = _cached_window(_ohlcv_cache_key(base_symbol, tf), 1)
+        if window:
+            return float(window.close[-1])
+
     try:
         data = get_ohlcv_data(symbol, limit=1)
         if data:
@@ -0,0 +1,236 @@
+# backend/core/notification_dispatcher.py
+"""
+Non-Blocking Notification Dispatch (Telegram + Web Push).
+
+`log_signal` enviaba el push en línea (cargando todas las `PushSubscription`
+y llamando a `webpush` en serie) y el scheduler mandaba el Telegram de forma
+síncrona: con miles de suscriptores una señal paraba el ciclo minutos.
+Ahora las entregas se encolan y el llamador vuelve al instante:
+
+- Un pool de hilos por canal (`telegram`, `push`): su tamaño es el límite de
+  concurrencia del canal.
+- Reintentos con backoff exponencial + jitter para errores transitorios
+  (red, 429, 5xx); los definitivos se cuentan como fallidos.
+- El fan-out de un push (leer suscriptores, una entrega por suscriptor) corre
+  en su propio hilo; las suscripciones caducadas (404/410) se borran en un
+  solo DELETE al terminar el fan-out.
+- Cota de entregas pendientes: por encima se descartan (nunca se bloquea
+  la generación de señales) y se cuentan en `dropped`.
+- Métricas por canal en `stats()`.
+
+Uso:
+    notification_dispatcher.submit("telegram", send_telegram, msg, chat_id=chat_id)
+    notification_dispatcher.push(title, body, data={"token": "BTC"})
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+OK, GONE, FAILED = "ok", "gone", "failed"
+
+
+class NotificationDispatcher:
+    """Colas por canal con límite de concurrencia, reintentos y métricas."""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        max_pending: int = 10_000,
+        max_attempts: int = 3,
+        base_delay: float = 1.0,
+        session_factory: Optional[Callable] = None,
+    ):
+        self.limits = {"telegram": 4, "push": 16, **(limits or {})}
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self._session_factory = session_factory
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._metrics: Dict[str, Dict[str, int]] = {}
+
+    def _session(self):
+        if self._session_factory is None:
+            from database import SessionLocal
+
+            return SessionLocal()
+        return self._session_factory()
+
+    def _pool(self, name: str) -> ThreadPoolExecutor:
+        with self._idle:
+            pool = self._pools.get(name)
+            if pool is None:
+                pool = ThreadPoolExecutor(
+                    max_workers=self.limits.get(name, 1), thread_name_prefix=f"notify-{name}"
+                )
+                self._pools[name] = pool
+            return pool
+
+    def _count(self, channel: str, metric: str, n: int = 1):
+        channel_metrics = self._metrics.setdefault(
+            channel,
+            {"submitted": 0, "delivered": 0, "failed": 0, "retries": 0, "dropped": 0, "removed": 0},
+        )
+        channel_metrics[metric] += n
+
+    # --- Pending accounting (backpressure without blocking the caller) ---
+
+    def _admit(self, channel: str) -> bool:
+        with self._idle:
+            if self._pending >= self.max_pending:
+                self._count(channel, "dropped")
+                dropped = self._metrics[channel]["dropped"]
+                if dropped == 1 or dropped % 1000 == 0:
+                    print(f"[NOTIFY] ⚠️ {channel} queue full, dropped {dropped} deliveries")
+                return False
+            self._pending += 1
+            self._count(channel, "submitted")
+            return True
+
+    def _done(self):
+        with self._idle:
+            self._pending -= 1
+            if not self._pending:
+                self._idle.notify_all()
+
+    # --- Delivery ---
+
+    def _backoff(self, attempt: int) -> float:
+        # Exponential with jitter: retries from many workers don't line up
+        return self.base_delay * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+
+    def _deliver(self, channel: str, fn: Callable[..., Any], args, kwargs) -> str:
+        """
+        Ejecuta `fn` (que retorna un dict `ok`/`retryable`/`gone`) con reintentos.
+        Las excepciones se tratan como errores transitorios.
+        """
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    res = fn(*args, **kwargs) or {}
+                except Exception as e:
+                    res = {"ok": False, "error": str(e), "retryable": True}
+
+                if res.get("ok"):
+                    with self._idle:
+                        self._count(channel, "delivered")
+                    return OK
+                if res.get("gone"):
+                    return GONE
+                if not res.get("retryable") or attempt == self.max_attempts:
+                    with self._idle:
+                        self._count(channel, "failed")
+                    print(f"[NOTIFY] ❌ {channel} delivery failed: {res.get('error') or res.get('status')}")
+                    return FAILED
+                with self._idle:
+                    self._count(channel, "retries")
+                time.sleep(self._backoff(attempt))
+            return FAILED
+        finally:
+            self._done()
+
+    def submit(self, channel: str, fn: Callable[..., Any], *args, **kwargs) -> bool:
+        """Encola una entrega en `channel`. False si se descartó (cola llena)."""
+        if not self._admit(channel):
+            return False
+        try:
+            self._pool(channel).submit(self._deliver, channel, fn, args, kwargs)
+        except RuntimeError:  # Pool shut down
+            self._done()
+            return False
+        return True
+
+    def push(self, title: str, body: str, data: Optional[dict] = None) -> bool:
+        """Web Push a todos los suscriptores, sin esperar a ninguno."""
+        if not os.getenv("VAPID_PRIVATE_KEY"):
+            return False
+        with self._idle:
+            self._pending += 1  # The fan-out itself counts until it finishes
+        try:
+            self._pool("fanout").submit(self._fan_out_push, title, body, data)
+        except RuntimeError:
+            self._done()
+            return False
+        return True
+
+    def _fan_out_push(self, title: str, body: str, data: Optional[dict]):
+        from models_db import PushSubscription
+        from notify import push_payload, remove_push_subscriptions, send_webpush, vapid_claims
+
+        try:
+            db = self._session()
+            try:
+                subs = db.query(
+                    PushSubscription.endpoint, PushSubscription.p256dh, PushSubscription.auth
+                ).all()
+            finally:
+                db.close()
+
+            payload = push_payload(title, body, data)
+            private_key, claims = os.getenv("VAPID_PRIVATE_KEY"), vapid_claims()
+            deliveries = []
+            pool = self._pool("push")
+            for endpoint, p256dh, auth in subs:
+                if not self._admit("push"):
+                    continue
+                info = {"endpoint": endpoint, "keys": {"p256dh": p256dh, "auth": auth}}
+                args = (info, payload, private_key, claims)
+                try:
+                    future = pool.submit(self._deliver, "push", send_webpush, args, {})
+                except RuntimeError:  # Shutting down
+                    self._done()
+                    break
+                deliveries.append((endpoint, future))
+
+            # Batched cleanup of expired subscriptions
+            gone = [endpoint for endpoint, future in deliveries if future.result() == GONE]
+            if gone:
+                db = self._session()
+                try:
+                    removed = remove_push_subscriptions(db, gone)
+                finally:
+                    db.close()
+                with self._idle:
+                    self._count("push", "removed", removed)
+        except Exception as e:
+            print(f"[NOTIFY] ❌ Push fan-out failed: {e}")
+        finally:
+            self._done()
+
+    # --- Lifecycle ---
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que no quede ninguna entrega pendiente (tests / parada)."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def close(self, timeout: float = 10.0):
+        """Da `timeout` segundos a lo pendiente y cancela el resto."""
+        self.flush(timeout)
+        with self._idle:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._idle:
+            return {
+                "pending": self._pending,
+                "channels": {name: dict(metrics) for name, metrics in self._metrics.items()},
+            }
+
+
+# Global Instance
+notification_dispatcher = NotificationDispatcher(
+    limits={
+        "telegram": int(os.getenv("NOTIFY_TELEGRAM_CONCURRENCY", "4")),
+        "push": int(os.getenv("NOTIFY_PUSH_CONCURRENCY", "16")),
+    },
+    max_pending=int(os.getenv("NOTIFY_MAX_PENDING", "10000")),
+    max_attempts=int(os.getenv("NOTIFY_MAX_ATTEMPTS", "3")),
+)
@@ -0,0 +1,190 @@
+# backend/core/persona_catalog.py
+"""
+In-Memory Persona Catalog with Incremental Sync.
+
+El scheduler recargaba en cada ciclo todas las `StrategyConfig` activas
+(join con `User`), re-parseando el JSON de tokens/timeframes y rehaciendo
+cada dict de persona. Con miles de personas por usuario es un coste fijo
+que crece. El catálogo mantiene los dicts en memoria y en cada `sync()`:
+
+1. Lee solo los ids activos (sin JSON): altas sin cambios de `updated_at`
+   y bajas/borrados se detectan por diferencia de conjuntos.
+2. Recarga las filas con `updated_at` >= la marca de la última sincronización
+   (con un pequeño solape por relojes desalineados entre instancias).
+3. Recarga las personas/usuarios invalidados explícitamente desde la API
+   (`/strategies/marketplace/*`, cambio de chat de Telegram).
+
+Uso:
+    personas = persona_catalog.sync()
+    persona_catalog.invalidate(persona_id="trend_king_sol")
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import or_
+
+from data.supported_tokens import VALID_TOKENS_FULL
+
+DEFAULT_INTERVAL_SECONDS = 300  # Same as StrategyConfig.interval_seconds default
+# Rows written by other instances may carry a slightly older updated_at
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def persona_from_config(c, chat_id: Optional[str]) -> Dict[str, Any]:
+    """Dict de persona del scheduler a partir de una fila StrategyConfig."""
+    # Parse JSON fields safely
+    try:
+        tokens_list = json.loads(c.tokens) if c.tokens else []
+    except Exception:
+        tokens_list = []
+
+    try:
+        tf_list = json.loads(c.timeframes) if c.timeframes else []
+    except Exception:
+        tf_list = []
+
+    # --- TOKEN LIST LOGIC ---
+    # If the strategy is configured with "ALL" or "SCANNER" as the symbol,
+    # or if the tokens list is empty, we treat it as a SCANNER strategy
+    # that runs on the full list.
+
+    primary_symbol = tokens_list[0] if tokens_list else "BTC"
+
+    # Special 'Marker' logic for System Scanners
+    if primary_symbol in ["ALL", "SCANNER", "*"]:
+        target_tokens = VALID_TOKENS_FULL
+    else:
+        target_tokens = tokens_list if tokens_list else ["BTC"]
+
+    target_tf = tf_list[0] if tf_list else "1h"
+
+    return {
+        "id": c.persona_id,  # "trend_king_sol"
+        "config_id": c.id,
+        "strategy_id": c.strategy_id,  # "donchian_v2"
+        "tokens": target_tokens,  # Pass LIST of tokens
+        "timeframe": target_tf,
+        "interval_seconds": c.interval_seconds or DEFAULT_INTERVAL_SECONDS,
+        "last_execution": c.last_execution,
+        "name": c.name,
+        "telegram_chat_id": chat_id,
+        "user_id": c.user_id,  # [FIX] Isolation: Pass owner ID
+        "config_json": c.config_json,  # Part of the execution fingerprint
+    }
+
+
+class PersonaCatalog:
+    """Personas activas en memoria, sincronizadas por `updated_at`."""
+
+    def __init__(self, session_factory: Optional[Callable] = None):
+        self._session_factory = session_factory
+        self._personas: Dict[int, Dict[str, Any]] = {}  # {config_id: persona}
+        self._watermark: Optional[datetime] = None
+        self._invalid_personas: Set[str] = set()
+        self._invalid_users: Set[int] = set()
+        self._full_reload = True
+        self._lock = threading.Lock()
+        self.full_syncs = 0
+        self.rows_loaded = 0
+
+    def _session(self):
+        if self._session_factory is None:
+            from database import SessionLocal
+
+            return SessionLocal()
+        return self._session_factory()
+
+    @property
+    def dirty(self) -> bool:
+        """Hay invalidaciones pendientes: el scheduler debería sincronizar ya."""
+        return bool(self._full_reload or self._invalid_personas or self._invalid_users)
+
+    def invalidate(self, persona_id: Optional[str] = None, user_id: Optional[int] = None):
+        """
+        Señal explícita de cambio. Sin argumentos fuerza una recarga completa.
+        """
+        with self._lock:
+            if persona_id is None and user_id is None:
+                self._full_reload = True
+            if persona_id is not None:
+                self._invalid_personas.add(persona_id)
+            if user_id is not None:
+                self._invalid_users.add(user_id)
+
+    def _load(self, db, *criteria) -> List[Dict[str, Any]]:
+        from models_db import StrategyConfig, User
+
+        rows = (
+            db.query(StrategyConfig, User.telegram_chat_id)
+            .outerjoin(User, StrategyConfig.user_id == User.id)
+            .filter(StrategyConfig.enabled == 1, *criteria)
+            .all()
+        )
+        self.rows_loaded += len(rows)
+        return [persona_from_config(c, chat_id) for c, chat_id in rows]
+
+    def sync(self) -> List[Dict[str, Any]]:
+        """Aplica los cambios desde la última sincronización y devuelve las personas activas."""
+        from models_db import StrategyConfig
+
+        with self._lock:
+            invalid_personas, self._invalid_personas = self._invalid_personas, set()
+            invalid_users, self._invalid_users = self._invalid_users, set()
+            full_reload, self._full_reload = self._full_reload or self._watermark is None, False
+            watermark = self._watermark
+
+        db = self._session()
+        try:
+            started = datetime.utcnow()
+            if full_reload:
+                personas = {p["config_id"]: p for p in self._load(db)}
+                self.full_syncs += 1
+            else:
+                personas = dict(self._personas)
+                active_ids = {
+                    row[0] for row in db.query(StrategyConfig.id).filter(StrategyConfig.enabled == 1)
+                }
+                # Disabled or deleted
+                for config_id in set(personas) - active_ids:
+                    del personas[config_id]
+
+                changed = [StrategyConfig.updated_at >= watermark - SYNC_OVERLAP]
+                missing = active_ids - set(personas)
+                if missing:
+                    changed.append(StrategyConfig.id.in_(missing))
+                if invalid_personas:
+                    changed.append(StrategyConfig.persona_id.in_(invalid_personas))
+                if invalid_users:
+                    changed.append(StrategyConfig.user_id.in_(invalid_users))
+                for p in self._load(db, or_(*changed)):
+                    personas[p["config_id"]] = p
+
+            with self._lock:
+                self._personas = personas
+                self._watermark = started
+            return list(personas.values())
+        except Exception as e:
+            print(f"[CATALOG] ❌ Error syncing personas: {e}")
+            # Retry the pending invalidations next time; serve the last catalog
+            with self._lock:
+                self._full_reload |= full_reload
+                self._invalid_personas |= invalid_personas
+                self._invalid_users |= invalid_users
+            return list(self._personas.values())
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "personas": len(self._personas),
+            "full_syncs": self.full_syncs,
+            "rows_loaded": self.rows_loaded,
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+        }
+
+
+# Global Instance
+persona_catalog = PersonaCatalog()
@@ -0,0 +1,95 @@
+# backend/core/schedule_queue.py
+"""
+Priority Queue of Next-Due Times for the Strategy Scheduler.
+
+Cada persona tiene un instante de próxima ejecución; el scheduler duerme
+hasta el más próximo y ejecuta solo las personas vencidas, en lugar de
+recorrer todas en cada vuelta del loop.
+
+Heap con borrado perezoso: reprogramar una clave deja su entrada anterior
+en el heap y se descarta cuando llega arriba (push/pop O(log n)).
+
+Incluye el cálculo de cierres de vela por timeframe para alinear las
+ejecuciones al cierre (las estrategias evalúan la última vela cerrada).
+"""
+
+import heapq
+from typing import Any, Dict, List, Optional, Tuple
+
+import ccxt
+
+# Weekly candles open on Monday 00:00 UTC; the Unix epoch was a Thursday
+WEEK_OFFSET = 4 * 86400
+
+
+def candle_seconds(timeframe: str) -> Optional[int]:
+    """Duración de la vela en segundos, o None si no es un periodo fijo (1M)."""
+    if timeframe.endswith("M"):
+        return None
+    try:
+        return int(ccxt.Exchange.parse_timeframe(timeframe))
+    except Exception:
+        return None
+
+
+def last_candle_close(ts: float, timeframe: str) -> Optional[float]:
+    """Último cierre de vela <= ts (= apertura de la vela en curso)."""
+    period = candle_seconds(timeframe)
+    if not period:
+        return None
+    offset = WEEK_OFFSET if timeframe.endswith("w") else 0
+    return ts - ((ts - offset) % period)
+
+
+def next_candle_close(ts: float, timeframe: str) -> Optional[float]:
+    """Primer cierre de vela >= ts."""
+    boundary = last_candle_close(ts, timeframe)
+    if boundary is None or boundary == ts:
+        return boundary
+    return boundary + candle_seconds(timeframe)
+
+
+class DueQueue:
+    """Cola de prioridad clave -> próximo vencimiento (epoch segundos)."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, Any]] = []
+        self._due: Dict[Any, float] = {}
+
+    def schedule(self, key: Any, due_at: float):
+        """Programa (o reprograma) `key` para `due_at`."""
+        self._due[key] = due_at
+        heapq.heappush(self._heap, (due_at, key))
+
+    def discard(self, key: Any):
+        self._due.pop(key, None)
+
+    def due_at(self, key: Any) -> Optional[float]:
+        return self._due.get(key)
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap and self._due.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+
+    def next_due(self) -> Optional[float]:
+        """Vencimiento más próximo, o None si la cola está vacía."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[Any]:
+        """Saca todas las claves vencidas a `now` (en orden de vencimiento)."""
+        due = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return due
+            _, key = heapq.heappop(self._heap)
+            del self._due[key]
+            due.append(key)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._due
+
+    def __len__(self) -> int:
+        return len(self._due)
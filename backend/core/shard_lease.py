@@ -0,0 +1,193 @@
+# backend/core/shard_lease.py
+"""
+Shard Leasing for Horizontally Scaled Schedulers.
+
+Con un solo `SchedulerLock` global una instancia ejecuta todas las personas
+y el resto espera. Aquí las personas se reparten por hash en N shards y cada
+instancia reclama shards como leases (filas de la tabla `scheduler_lock`):
+
+- `shard:{i}`        -> dueño del shard i y vencimiento del lease.
+- `member:{owner}`   -> latido de cada instancia viva (para calcular su cuota).
+
+En cada latido (`heartbeat`) una instancia renueva sus leases, calcula su
+cuota justa `ceil(N / instancias vivas)`, libera los shards que le sobran
+(cuando entra una instancia nueva) y reclama shards libres o vencidos
+(cuando una instancia muere su lease expira tras `lease_ttl`). Toda toma de
+un shard es un UPDATE/INSERT condicional: dos instancias nunca ganan el mismo.
+
+Uso:
+    leases = ShardLeaseManager(SessionLocal, owner_id, num_shards=16)
+    owned = leases.heartbeat()
+    mine = [p for p in personas if leases.owns(p["id"])]
+"""
+
+import math
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Callable, List, Set
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from models_db import SchedulerLock
+
+SHARD_PREFIX = "shard:"
+MEMBER_PREFIX = "member:"
+
+
+def shard_for(key: Any, num_shards: int) -> int:
+    """Shard estable de una clave (igual en todos los procesos, a diferencia de hash())."""
+    return zlib.crc32(str(key).encode()) % num_shards
+
+
+class ShardLeaseManager:
+    """Leases de shards de una instancia del scheduler sobre `scheduler_lock`."""
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        owner_id: str,
+        num_shards: int,
+        lease_ttl: int = 300,
+    ):
+        self.session_factory = session_factory
+        self.owner_id = owner_id
+        self.num_shards = num_shards
+        self.lease_ttl = lease_ttl
+        self.owned: Set[int] = set()
+
+    def owns(self, key: Any) -> bool:
+        return shard_for(key, self.num_shards) in self.owned
+
+    def _shard_name(self, shard: int) -> str:
+        return f"{SHARD_PREFIX}{shard}"
+
+    def _live_members(self, db, now: datetime) -> List[str]:
+        rows = (
+            db.query(SchedulerLock.owner_id)
+            .filter(
+                SchedulerLock.lock_name.like(f"{MEMBER_PREFIX}%"),
+                SchedulerLock.expires_at >= now,
+            )
+            .all()
+        )
+        return sorted(row[0] for row in rows)
+
+    def _touch_member(self, db, now: datetime, expires: datetime):
+        name = f"{MEMBER_PREFIX}{self.owner_id}"
+        updated = (
+            db.query(SchedulerLock)
+            .filter(SchedulerLock.lock_name == name)
+            .update({SchedulerLock.expires_at: expires}, synchronize_session=False)
+        )
+        if not updated:
+            db.add(SchedulerLock(lock_name=name, owner_id=self.owner_id, expires_at=expires))
+        # Forget members that have been dead for a whole extra TTL
+        db.query(SchedulerLock).filter(
+            SchedulerLock.lock_name.like(f"{MEMBER_PREFIX}%"),
+            SchedulerLock.expires_at < now - timedelta(seconds=self.lease_ttl),
+        ).delete(synchronize_session=False)
+        db.commit()
+
+    def _claim(self, db, shard: int, now: datetime, expires: datetime) -> bool:
+        """Toma el shard si es nuestro, está libre o su lease venció (atómico)."""
+        name = self._shard_name(shard)
+        taken = (
+            db.query(SchedulerLock)
+            .filter(
+                SchedulerLock.lock_name == name,
+                or_(SchedulerLock.owner_id == self.owner_id, SchedulerLock.expires_at < now),
+            )
+            .update(
+                {SchedulerLock.owner_id: self.owner_id, SchedulerLock.expires_at: expires},
+                synchronize_session=False,
+            )
+        )
+        if taken:
+            db.commit()
+            return True
+        if db.query(SchedulerLock.lock_name).filter(SchedulerLock.lock_name == name).first():
+            db.rollback()
+            return False
+        try:
+            db.add(SchedulerLock(lock_name=name, owner_id=self.owner_id, expires_at=expires))
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()  # Another instance inserted it first
+            return False
+
+    def _release(self, db, shards: Set[int], now: datetime):
+        if not shards:
+            return
+        db.query(SchedulerLock).filter(
+            SchedulerLock.lock_name.in_([self._shard_name(s) for s in shards]),
+            SchedulerLock.owner_id == self.owner_id,
+        ).update({SchedulerLock.expires_at: now - timedelta(seconds=1)}, synchronize_session=False)
+        db.commit()
+
+    def heartbeat(self) -> Set[int]:
+        """
+        Renueva, reequilibra y reclama. Retorna los shards propios; si la DB
+        falla la excepción se propaga y `owned` queda como estaba.
+        """
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            expires = now + timedelta(seconds=self.lease_ttl)
+            self._touch_member(db, now, expires)
+
+            members = self._live_members(db, now) or [self.owner_id]
+            quota = math.ceil(self.num_shards / len(members))
+
+            # Renew what we still hold (a lease lost to expiry is dropped)
+            owned = {s for s in sorted(self.owned) if self._claim(db, s, now, expires)}
+
+            # A new member joined: hand back the surplus for it to claim
+            if len(owned) > quota:
+                surplus = set(sorted(owned)[quota:])
+                self._release(db, surplus, now)
+                owned -= surplus
+
+            if len(owned) < quota:
+                # Start at a per-member offset so instances don't race for shard 0
+                index = members.index(self.owner_id) if self.owner_id in members else 0
+                start = index * quota
+                for i in range(self.num_shards):
+                    shard = (start + i) % self.num_shards
+                    if shard in owned:
+                        continue
+                    if self._claim(db, shard, now, expires):
+                        owned.add(shard)
+                        if len(owned) >= quota:
+                            break
+
+            if owned != self.owned:
+                print(
+                    f"[SHARDS] {self.owner_id[:8]} owns {len(owned)}/{self.num_shards} shards"
+                    f" ({len(members)} live instances)"
+                )
+            self.owned = owned
+            return set(owned)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def release_all(self):
+        """Suelta shards y membresía (parada ordenada: otros los toman ya)."""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            self._release(db, set(self.owned), now)
+            db.query(SchedulerLock).filter(
+                SchedulerLock.lock_name == f"{MEMBER_PREFIX}{self.owner_id}"
+            ).delete(synchronize_session=False)
+            db.commit()
+            self.owned = set()
+        except Exception as e:
+            db.rollback()
+            print(f"[SHARDS] ⚠️ Failed to release leases: {e}")
+        finally:
+            db.close()
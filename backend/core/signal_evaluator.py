@@ -1,182 +1,360 @@
-
-from datetime import datetime, timedelta
+"""
+Signal Evaluator: resuelve TP / SL / timeout de las señales pendientes.
+
+En vez de comparar contra un único precio spot por ciclo (y perder las
+mechas que tocaron TP o SL entre ciclos), recorre el camino OHLC desde la
+entrada de cada señal (el cierre de su vela): por token, una descarga de velas por grupo de
+señales (cada una cae en el timeframe más fino que cubre su propia
+antigüedad) y una pasada NumPy vectorizada por grupo, con orden de primer
+toque.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
-from typing import List, Dict
-
+from typing import List, Dict, Tuple
 
+import numpy as np
 
-from models_db import Signal, SignalEvaluation, StrategyConfig
-from core.market_data_api import get_current_price
+from models_db import PersonaPerformance, Signal, SignalEvaluation, StrategyConfig
+from core.candles import CandleArray
+from core.market_data_api import get_current_price, get_ohlcv_arrays
+from core.schedule_queue import candle_seconds
 
 # Minimum age to evaluate (avoid instant evaluation on creation)
 MIN_SIGNAL_AGE_MINUTES = 5
 # Timeout for signals (e.g., 24h)
 SIGNAL_TIMEOUT_HOURS = 24
 
+# Candle path: finest timeframe whose window reaches the signal
+PATH_TIMEFRAMES = ("5m", "15m", "1h", "4h")
+MAX_PATH_CANDLES = 1000
+
+# _resolve_paths outcome codes
+PENDING, TP_HIT, SL_HIT, TIMED_OUT = 0, 1, 2, 3
+
 
 def evaluate_pending_signals(db: Session) -> int:
     """
-    Evaluates pending signals against current market data.
+    Evaluates pending signals against the candle path since each signal.
     Returns the number of newly evaluated signals.
     """
     # 1. Find Pending Signals
-    # Signals active (no evaluation) and older than MIN_SIGNAL_AGE
-    cutoff_time = datetime.utcnow() - timedelta(minutes=MIN_SIGNAL_AGE_MINUTES)
+    # Signals still OPEN and older than MIN_SIGNAL_AGE
+    now = datetime.utcnow()
+    cutoff_time = now - timedelta(minutes=MIN_SIGNAL_AGE_MINUTES)
 
-    # We want Signals where NO SignalEvaluation exists
-    # Using specific query pattern for efficiency
+    # Open signals only: served by the partial index ix_signals_open
     pending_signals = (
         db.query(Signal)
-        .outerjoin(SignalEvaluation, Signal.id == SignalEvaluation.signal_id)
-        .filter(SignalEvaluation.id.is_(None), Signal.timestamp < cutoff_time)
+        .filter(Signal.status == "OPEN", Signal.timestamp < cutoff_time)
         .all()
     )
 
     if not pending_signals:
         return 0
 
-    # 2. Group by Token to optimize API calls
+    # 2. Group by Token: one candle pull per token
     signals_by_token: Dict[str, List[Signal]] = {}
     for sig in pending_signals:
-        if sig.token not in signals_by_token:
-            signals_by_token[sig.token] = []
-        signals_by_token[sig.token].append(sig)
+        signals_by_token.setdefault(sig.token, []).append(sig)
 
     new_evaluations_count = 0
+    deltas: Dict[str, Dict] = {}  # {persona_id: aggregate increments}
+    now_ms = _epoch_ms(now)
 
     # 3. Evaluate by Token
     for token, signals in signals_by_token.items():
-        current_price = get_current_price(token)
-        if not current_price or current_price <= 0:
-            continue
-
+        valid = [sig for sig in signals if sig.entry and sig.entry > 0]
+        paths = _fetch_paths(token, _path_buckets(valid, now_ms))
+
+        # Finest path first: its last close is the most recent
+        last_close = next((float(candles.close[-1]) for _, candles in paths if candles), None)
+        if last_close is None:
+            # No path: fall back to the spot price (timeouts / invalid entries only)
+            last_close = get_current_price(token)
+            if not last_close or last_close <= 0:
+                continue
+
+        # Basic Validation
         for sig in signals:
-            result = None
-            exit_price = current_price
-
-            # Basic Validation
-            if not sig.entry or sig.entry <= 0:
-                result = "neutral"  # Invalid entry
+            if not (sig.entry and sig.entry > 0):
+                record_evaluation(db, deltas, sig, "neutral", last_close, now)  # Invalid entry
+                new_evaluations_count += 1
 
-            # --- Check TP/SL ---
-            elif sig.direction.lower() == "long":
-                if sig.tp and current_price >= sig.tp:
-                    result = "WIN"
-                    exit_price = sig.tp
-                elif sig.sl and current_price <= sig.sl:
-                    result = "LOSS"
-                    exit_price = sig.sl
+        for bucket, candles in paths:
+            outcome, exit_price = _resolve_paths(
+                candles,
+                np.array([_entry_ms(sig) for sig in bucket], dtype=np.int64),
+                is_long=np.array([sig.direction.lower() == "long" for sig in bucket]),
+                tp=np.array([sig.tp or np.nan for sig in bucket], dtype=np.float64),
+                sl=np.array([sig.sl or np.nan for sig in bucket], dtype=np.float64),
+                now_ms=now_ms,
+                timeout_ms=SIGNAL_TIMEOUT_HOURS * 3600 * 1000,
+                fallback_close=last_close,
+            )
 
-            elif sig.direction.lower() == "short":
-                if sig.tp and current_price <= sig.tp:
+            for sig, code, price in zip(bucket, outcome.tolist(), exit_price.tolist()):
+                if code == PENDING:
+                    continue
+                if code == TP_HIT:
                     result = "WIN"
-                    exit_price = sig.tp
-                elif sig.sl and current_price >= sig.sl:
+                elif code == SL_HIT:
                     result = "LOSS"
-                    exit_price = sig.sl
-
-            # --- Check Timeout ---
-            if not result:
-                age = datetime.utcnow() - sig.timestamp
-                if age > timedelta(hours=SIGNAL_TIMEOUT_HOURS):
-                    # Timeout - Calculate result at current price
-                    pnl_pct = 0.0
-                    if sig.direction.lower() == "long":
-                        pnl_pct = (current_price - sig.entry) / sig.entry
-                    else:
-                        pnl_pct = (sig.entry - current_price) / sig.entry
-
-                    if pnl_pct > 0.005:
-                        result = "WIN"  # > 0.5% profit
-                    elif pnl_pct < -0.005:
-                        result = "LOSS"  # < -0.5% loss
-                    else:
-                        result = "BE"  # Break Even / Stagnant
-
-            # --- Save Evaluation if Result Found ---
-            if result:
-                # Calculate R-Multiple (PnL / Risk)
-                # Risk = |Entry - SL|
-                risk = abs(sig.entry - (sig.sl if sig.sl else sig.entry * 0.99))
-                if risk == 0:
-                    risk = sig.entry * 0.01  # Prevent div/0
-
-                raw_pnl = 0.0
-                if sig.direction.lower() == "long":
-                    raw_pnl = exit_price - sig.entry
                 else:
-                    raw_pnl = sig.entry - exit_price
+                    result = _timeout_result(sig, price)
 
-                pnl_r = raw_pnl / risk
-
-                eval_obj = SignalEvaluation(
-                    signal_id=sig.id,
-                    evaluated_at=datetime.utcnow(),
-                    result=result,
-                    pnl_r=round(pnl_r, 2),
-                    exit_price=exit_price,
-                )
-
-                db.add(eval_obj)
+                # --- Save Evaluation ---
+                record_evaluation(db, deltas, sig, result, price, now)
                 new_evaluations_count += 1
 
-                # Update Strategy Stats
-                if sig.strategy_id:
-                    # sig.strategy_id NOW holds the PERSONA ID (e.g. "1234"), thanks to scheduler fix.
-                    _update_strategy_stats(db, sig.strategy_id)
+    # Update Strategy Stats (once per persona, same transaction as the evaluations)
+    apply_persona_deltas(db, deltas)
 
     db.commit()
     return new_evaluations_count
 
 
-def _update_strategy_stats(db: Session, persona_id: str):
+def _epoch_ms(ts: datetime) -> int:
+    return int(ts.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _entry_ms(sig: Signal) -> int:
     """
-    Recalculates Win Rate for the Persona (StrategyConfig).
+    Instante de entrada: `timestamp` es la apertura de la vela de la señal y
+    la entrada es su cierre, así que las mechas de esa vela no cuentan.
+    """
+    period = candle_seconds(sig.timeframe or "") or 0
+    return _epoch_ms(sig.timestamp) + period * 1000
+
+
+def _path_timeframe(span_ms: int) -> Tuple[str, int]:
+    """(timeframe, limit) más fino cuyo window de MAX_PATH_CANDLES cubre `span_ms`."""
+    for timeframe in PATH_TIMEFRAMES:
+        period_ms = candle_seconds(timeframe) * 1000
+        needed = math.ceil(span_ms / period_ms) + 1
+        if needed <= MAX_PATH_CANDLES:
+            return timeframe, needed
+    return PATH_TIMEFRAMES[-1], MAX_PATH_CANDLES
+
+
+def _path_buckets(signals: List[Signal], now_ms: int) -> Dict[str, Tuple[List[Signal], int]]:
+    """
+    Agrupa las señales por el timeframe de path que pide su propia antigüedad:
+    una señal vieja no obliga a resolver las recientes con velas de 4h.
+    Returns {timeframe: (señales, limit que cubre la más antigua del grupo)}.
+    """
+    buckets: Dict[str, Tuple[List[Signal], int]] = {}
+    for sig in signals:
+        timeframe, limit = _path_timeframe(max(0, now_ms - _entry_ms(sig)))
+        bucket, bucket_limit = buckets.get(timeframe, ([], 0))
+        bucket.append(sig)
+        buckets[timeframe] = (bucket, max(bucket_limit, limit))
+    return buckets
+
+
+def _fetch_paths(
+    token: str, buckets: Dict[str, Tuple[List[Signal], int]]
+) -> List[Tuple[List[Signal], CandleArray]]:
+    """Una descarga por grupo, del timeframe más fino al más grueso."""
+    paths = []
+    for timeframe in PATH_TIMEFRAMES:
+        if timeframe not in buckets:
+            continue
+        bucket, limit = buckets[timeframe]
+        try:
+            candles = get_ohlcv_arrays(token, timeframe, limit=limit)
+        except Exception as e:
+            print(f"[EVAL] ⚠️ Candle path unavailable for {token} ({timeframe}): {e}")
+            candles = CandleArray.empty()
+        paths.append((bucket, candles))
+    return paths
+
+
+def _resolve_paths(
+    candles: CandleArray,
+    start_ms: np.ndarray,
+    is_long: np.ndarray,
+    tp: np.ndarray,
+    sl: np.ndarray,
+    now_ms: int,
+    timeout_ms: int,
+    fallback_close: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resuelve M señales contra N velas en una pasada (matrices M x N).
+
+    Cada señal ve las velas con apertura en [start, start + timeout). Gana el
+    primer toque de TP o SL; si ambos caen en la misma vela no se puede saber
+    el orden intravela y se resuelve como SL (conservador). Sin toques y con
+    el timeout vencido -> TIMED_OUT con el cierre de la última vela de su
+    ventana (o `fallback_close` si el path no llega a cubrirla). TP/SL NaN
+    nunca se tocan.
+
+    Returns:
+        (outcome codes, exit prices), ambos de longitud M.
+    """
+    m = len(start_ms)
+    outcome = np.full(m, PENDING, dtype=np.int8)
+    exit_price = np.full(m, np.nan)
+    end_ms = start_ms + timeout_ms
+
+    if len(candles):
+        ts = candles.timestamp
+        high, low, close = candles.high, candles.low, candles.close
+        in_window = (ts[None, :] >= start_ms[:, None]) & (ts[None, :] < end_ms[:, None])
+
+        with np.errstate(invalid="ignore"):  # NaN TP/SL compare False
+            long_tp, long_sl = high[None, :] >= tp[:, None], low[None, :] <= sl[:, None]
+            short_tp, short_sl = low[None, :] <= tp[:, None], high[None, :] >= sl[:, None]
+        tp_hit = np.where(is_long[:, None], long_tp, short_tp) & in_window
+        sl_hit = np.where(is_long[:, None], long_sl, short_sl) & in_window
+
+        n = len(ts)
+        first_tp = np.where(tp_hit.any(axis=1), tp_hit.argmax(axis=1), n)
+        first_sl = np.where(sl_hit.any(axis=1), sl_hit.argmax(axis=1), n)
+
+        won = first_tp < first_sl
+        lost = (first_sl <= first_tp) & (first_sl < n)
+        outcome[won], exit_price[won] = TP_HIT, tp[won]
+        outcome[lost], exit_price[lost] = SL_HIT, sl[lost]
+
+        # Close of the last candle inside each window
+        has_path = in_window.any(axis=1)
+        last_idx = n - 1 - np.argmax(in_window[:, ::-1], axis=1)
+        window_close = np.where(has_path, close[last_idx], fallback_close)
+    else:
+        window_close = np.full(m, fallback_close)
+
+    timed_out = (outcome == PENDING) & (end_ms <= now_ms)
+    outcome[timed_out] = TIMED_OUT
+    exit_price[timed_out] = window_close[timed_out]
+    return outcome, exit_price
+
+
+def _timeout_result(sig: Signal, exit_price: float) -> str:
+    """Timeout - result at the window's last close."""
+    if sig.direction.lower() == "long":
+        pnl_pct = (exit_price - sig.entry) / sig.entry
+    else:
+        pnl_pct = (sig.entry - exit_price) / sig.entry
+
+    if pnl_pct > 0.005:
+        return "WIN"  # > 0.5% profit
+    if pnl_pct < -0.005:
+        return "LOSS"  # < -0.5% loss
+    return "BE"  # Break Even / Stagnant
+
+
+def _evaluation(sig: Signal, result: str, exit_price: float, now: datetime) -> SignalEvaluation:
+    # Calculate R-Multiple (PnL / Risk)
+    # Risk = |Entry - SL|
+    risk = abs(sig.entry - (sig.sl if sig.sl else sig.entry * 0.99)) if sig.entry else 0
+    if risk == 0:
+        risk = (sig.entry or 1.0) * 0.01  # Prevent div/0
+
+    if not sig.entry:
+        raw_pnl = 0.0
+    elif sig.direction.lower() == "long":
+        raw_pnl = exit_price - sig.entry
+    else:
+        raw_pnl = sig.entry - exit_price
+
+    return SignalEvaluation(
+        signal_id=sig.id,
+        evaluated_at=now,
+        result=result,
+        pnl_r=round(raw_pnl / risk, 2),
+        exit_price=exit_price,
+    )
+
+
+def record_evaluation(
+    db: Session, deltas: Dict[str, Dict], sig: Signal, result: str, exit_price: float, now: datetime
+):
+    """
+    Guarda la evaluación de `sig`, la cierra y acumula su aporte en `deltas`.
+    Punto de entrada común para cualquier evaluador (también `evaluated_logger`).
+    """
+    _record(db, deltas, sig, _evaluation(sig, result, exit_price, now))
+
+
+def apply_persona_deltas(db: Session, deltas: Dict[str, Dict]):
+    """Aplica los agregados acumulados (un UPSERT por persona), en la transacción de `db`."""
+    for persona_id, delta in deltas.items():
+        _update_strategy_stats(db, persona_id, delta)
+
+
+def _record(db: Session, deltas: Dict[str, Dict], sig: Signal, evaluation: SignalEvaluation):
+    """Añade la evaluación, cierra la señal y acumula su aporte a los agregados de la persona."""
+    db.add(evaluation)
+    sig.status = "CLOSED"
+    # sig.strategy_id NOW holds the PERSONA ID (e.g. "1234"), thanks to scheduler fix.
+    if not sig.strategy_id:
+        return
+    delta = deltas.setdefault(
+        sig.strategy_id,
+        {"total": 0, "wins": 0, "losses": 0, "breakeven": 0,
+         "sum_pnl_r": 0.0, "sum_sq_pnl_r": 0.0, "last_eval_at": evaluation.evaluated_at},
+    )
+    pnl_r = evaluation.pnl_r or 0.0
+    delta["total"] += 1
+    delta["wins"] += evaluation.result == "WIN"
+    delta["losses"] += evaluation.result == "LOSS"
+    delta["breakeven"] += evaluation.result == "BE"
+    delta["sum_pnl_r"] += pnl_r
+    delta["sum_sq_pnl_r"] += pnl_r * pnl_r
+    delta["last_eval_at"] = max(delta["last_eval_at"], evaluation.evaluated_at)
+
+
+def _update_strategy_stats(db: Session, persona_id: str, delta: Dict):
+    """
+    Suma `delta` a los agregados de la persona (UPSERT atómico, sin releer su
+    historial) y refleja win rate / total en su StrategyConfig.
     """
     try:
-        # Match signals by strategy_id which now stores persona_id
-        total = (
-            db.query(Signal)
-            .join(SignalEvaluation)
-            .filter(Signal.strategy_id == persona_id)
-            .count()
-        )
-        wins = (
-            db.query(Signal)
-            .join(SignalEvaluation)
-            .filter(Signal.strategy_id == persona_id, SignalEvaluation.result == "WIN")
-            .count()
-        )
-
-        # Calculate Total PnL (Sum of R-Multiples)
-        pnl_r_sum = 0.0
-        evals = (
-            db.query(SignalEvaluation)
-            .join(Signal)
-            .filter(Signal.strategy_id == persona_id)
-            .all()
-        )
-        for e in evals:
-            if e.pnl_r:
-                pnl_r_sum += e.pnl_r
-
-        if total > 0:
-            win_rate = (wins / total) * 100  # Store as 0-100
-
-            # Upsert config
+        # Savepoint: a failed stats update must not roll back the evaluations
+        with db.begin_nested():
+            counters = ("total", "wins", "losses", "breakeven", "sum_pnl_r", "sum_sq_pnl_r")
+            dialect = db.get_bind().dialect.name
+            if dialect in ("postgresql", "sqlite"):
+                if dialect == "postgresql":
+                    from sqlalchemy.dialects.postgresql import insert
+                else:
+                    from sqlalchemy.dialects.sqlite import insert
+
+                table = PersonaPerformance.__table__
+                stmt = insert(table).values(persona_id=persona_id, **delta)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.persona_id],
+                    set_={
+                        **{name: table.c[name] + stmt.excluded[name] for name in counters},
+                        "last_eval_at": stmt.excluded.last_eval_at,
+                    },
+                )
+                db.execute(stmt)
+                perf = db.get(PersonaPerformance, persona_id, populate_existing=True)
+            else:
+                perf = db.get(PersonaPerformance, persona_id, with_for_update=True)
+                if perf is None:
+                    perf = PersonaPerformance(persona_id=persona_id, **{name: 0 for name in counters})
+                    db.add(perf)
+                for name in counters:
+                    setattr(perf, name, getattr(perf, name) + delta[name])
+                perf.last_eval_at = delta["last_eval_at"]
+
             # We look for the StrategyConfig where persona_id matches
-            config = (
-                db.query(StrategyConfig)
-                .filter(StrategyConfig.persona_id == persona_id)
-                .first()
+            db.query(StrategyConfig).filter(StrategyConfig.persona_id == persona_id).update(
+                {
+                    StrategyConfig.win_rate: perf.win_rate,
+                    StrategyConfig.total_signals: perf.total,
+                    # Stats are not a config change (keeps the persona catalog sync incremental)
+                    StrategyConfig.updated_at: StrategyConfig.updated_at,
+                },
+                synchronize_session=False,
             )
-            if config:
-                config.win_rate = win_rate
-                config.total_signals = total
-                # Do NOT overwrite expected_roi with realized PnL.
-                # Expected ROI is a static backtest metric.
-                # Realized PnL should be calculated on the fly or stored in a new column.
+            # Do NOT overwrite expected_roi with realized PnL.
+            # Expected ROI is a static backtest metric.
 
     except Exception as e:
         print(f"[EVAL] Error updating stats for {persona_id}: {e}")
-
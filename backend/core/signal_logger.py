@@ -10,12 +10,13 @@ en el formato adecuado para logs CSV y base de datos.
 """
 
 from __future__ import annotations
-import csv
+import os
 import re
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
+from .csv_journal import CSVJournal
 from .schemas import Signal
 
 
@@ -38,6 +39,13 @@ CSV_HEADERS = [
     "source",
 ]
 
+# Write-behind: CSV rows are journaled by a background writer, off the caller's thread
+csv_journal = CSVJournal(
+    max_queue=int(os.getenv("CSV_JOURNAL_MAX_QUEUE", "10000")),
+    fsync_interval=float(os.getenv("CSV_JOURNAL_FSYNC_SECONDS", "5")),
+    max_bytes=int(os.getenv("CSV_JOURNAL_MAX_MB", "50")) * 1024 * 1024,
+)
+
 
 def log_signal(signal: Signal) -> Optional[int]:
     """
@@ -70,6 +78,74 @@ def log_signal(signal: Signal) -> Optional[int]:
     return saved_id
 
 
+def log_signals(signals: List[Signal]) -> List[Optional[int]]:
+    """
+    Versión por lotes de `log_signal`: una sola transacción con un INSERT
+    multi-fila ... ON CONFLICT DO NOTHING RETURNING (SQLite >= 3.35 / Postgres).
+
+    Returns:
+        Una entrada por señal, en el mismo orden: ID si era nueva, None si
+        duplicada o si falló. CSV y push solo se emiten para las nuevas.
+    """
+    if not signals:
+        return []
+
+    rows = [_signal_row(signal, signal.mode.upper()) for signal in signals]
+    inserted = _bulk_write_to_db(rows)
+    if inserted is None:
+        # Dialect without ON CONFLICT/RETURNING, or the batch failed: per-row
+        # path (idempotent), so one bad row doesn't drop the whole cycle
+        return [log_signal(signal) for signal in signals]
+
+    results: List[Optional[int]] = []
+    for signal, row in zip(signals, rows):
+        # pop(): an intra-batch duplicate key only counts as new once
+        saved_id = inserted.pop(row["idempotency_key"], None)
+        results.append(saved_id)
+        if saved_id:
+            _write_to_csv(signal, row["mode"], signal.token.lower())
+            _send_push_notification(signal)
+    return results
+
+
+def _bulk_write_to_db(rows: List[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+    """
+    {idempotency_key: id} de las filas insertadas (las que chocan con una
+    constraint única se omiten). None si el dialecto no soporta el INSERT o
+    si el lote falla: el llamador reintenta fila a fila.
+    """
+    from database import SessionLocal
+    from models_db import Signal as SignalDB
+
+    db = SessionLocal()
+    try:
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            return None
+
+        # Untargeted DO NOTHING also covers uq_signal_dedup, not only idempotency_key
+        stmt = (
+            insert(SignalDB)
+            .values(rows)
+            .on_conflict_do_nothing()
+            .returning(SignalDB.id, SignalDB.idempotency_key)
+        )
+        inserted = {key: signal_id for signal_id, key in db.execute(stmt)}
+        db.commit()
+        print(f"[DB] ✅ BULK INSERT: {len(inserted)}/{len(rows)} new signals")
+        return inserted
+    except Exception as db_err:
+        print(f"[DB] ❌ Error Bulk Insert: {db_err}")
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+
 def _snap_to_grid(dt: datetime, tf_str: str) -> datetime:
     """
     Normaliza el timestamp al inicio de la vela correspondiente.
@@ -100,6 +176,43 @@ def _snap_to_grid(dt: datetime, tf_str: str) -> datetime:
     return dt
 
 
+def _signal_row(signal: Signal, mode: str) -> Dict[str, Any]:
+    """Columnas DB de una señal: timestamp normalizado + idempotency key."""
+    # 1. Normalize Timestamp (Canonical)
+    ts_normalized = _snap_to_grid(signal.timestamp, signal.timeframe)
+    ts_iso = ts_normalized.isoformat()
+
+    # 2. Compute Idempotency Key
+    # Includes DIRECTION to allow hedging (Long+Short in same candle if logic permits)
+    idem_key = (
+        f"{signal.strategy_id}|{signal.token.upper()}|{signal.timeframe}|"
+        f"{ts_iso}|{signal.direction.lower()}|{signal.user_id}|{signal.mode}"
+    )
+
+    # 3. Preparar datos para el modelo DB
+    row = dict(
+        timestamp=ts_normalized,  # STORE NORMALIZED TS
+        token=signal.token.upper(),
+        timeframe=signal.timeframe,
+        direction=signal.direction.lower(),  # Normalize direction
+        entry=signal.entry,
+        tp=signal.tp if signal.tp else 0.0,
+        sl=signal.sl if signal.sl else 0.0,
+        confidence=signal.confidence if signal.confidence is not None else 0.0,
+        rationale=signal.rationale if signal.rationale else "",
+        source=signal.source,
+        mode=mode,
+        raw_response=str(signal.extra) if signal.extra else None,
+        strategy_id=signal.strategy_id,
+        idempotency_key=idem_key,
+        user_id=signal.user_id,
+    )
+
+    # Dynamic attr from scheduler (always set: multi-row INSERTs need uniform keys)
+    row["is_saved"] = getattr(signal, "is_saved", 0)
+    return row
+
+
 def _write_to_db(signal: Signal, mode: str) -> Optional[int]:
     """
     Escritura exclusiva de DB para una señal.
@@ -110,39 +223,9 @@ def _write_to_db(signal: Signal, mode: str) -> Optional[int]:
         from models_db import Signal as SignalDB  # Explicit import from backend package
         from sqlalchemy.exc import IntegrityError 
 
-        # 1. Normalize Timestamp (Canonical)
-        ts_normalized = _snap_to_grid(signal.timestamp, signal.timeframe)
-        ts_iso = ts_normalized.isoformat()
-        
-        # 2. Compute Idempotency Key
-        # Includes DIRECTION to allow hedging (Long+Short in same candle if logic permits)
-        idem_key = (
-            f"{signal.strategy_id}|{signal.token.upper()}|{signal.timeframe}|"
-            f"{ts_iso}|{signal.direction.lower()}|{signal.user_id}|{signal.mode}"
-        )
-
-        # 3. Preparar datos para el modelo DB
-        db_signal = SignalDB(
-            timestamp=ts_normalized, # STORE NORMALIZED TS
-            token=signal.token.upper(),
-            timeframe=signal.timeframe,
-            direction=signal.direction.lower(), # Normalize direction
-            entry=signal.entry,
-            tp=signal.tp if signal.tp else 0.0,
-            sl=signal.sl if signal.sl else 0.0,
-            confidence=signal.confidence if signal.confidence is not None else 0.0,
-            rationale=signal.rationale if signal.rationale else "",
-            source=signal.source,
-            mode=mode,
-            raw_response=str(signal.extra) if signal.extra else None,
-            strategy_id=signal.strategy_id,
-            idempotency_key=idem_key,
-            user_id=signal.user_id,
-        )
-        
-        # Check dynamic attr from scheduler
-        if hasattr(signal, "is_saved"):
-            db_signal.is_saved = getattr(signal, "is_saved")
+        row = _signal_row(signal, mode)
+        db_signal = SignalDB(**row)
+        ts_normalized = row["timestamp"]
 
         db = SessionLocal()
         try:
@@ -176,10 +259,9 @@ def _write_to_db(signal: Signal, mode: str) -> Optional[int]:
 
 def _write_to_csv(signal: Signal, mode: str, token_lower: str) -> None:
     """
-    Escritura CSV (Solo si DB tuvo éxito).
+    Escritura CSV (Solo si DB tuvo éxito). Encola la fila en `csv_journal`.
     """
     mode_dir = LOGS_DIR / mode
-    mode_dir.mkdir(parents=True, exist_ok=True)
 
     if mode == "EVALUATED":
         filename = f"{token_lower}.evaluated.csv"
@@ -187,7 +269,6 @@ def _write_to_csv(signal: Signal, mode: str, token_lower: str) -> None:
         filename = f"{token_lower}.csv"
 
     filepath = mode_dir / filename
-    file_exists = filepath.exists()
 
     # Convertir Signal a dict para CSV
     # NOTE: Use original timestamp for display, or normalized?
@@ -207,33 +288,22 @@ def _write_to_csv(signal: Signal, mode: str, token_lower: str) -> None:
         "source": signal.source,
     }
 
-    try:
-        with open(filepath, mode="a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(row_data)
-        # print(f"[CSV] ✅ Saved: {filepath}")
-    except Exception as e:
-        print(f"[CSV] ❌ Error: {e}")
+    csv_journal.append(filepath, row_data, CSV_HEADERS)
 
 
 def _send_push_notification(signal: Signal):
-    """Encapsulated Push Logic."""
+    """Encapsulated Push Logic. Encola el push: la entrega es asíncrona."""
     try:
-        from notify import send_push_notification
+        from .notification_dispatcher import notification_dispatcher
 
         title = f"New Signal: {signal.direction.upper()} {signal.token}"
         body = (
             f"Entry: {signal.entry} | TP: {signal.tp} | SL: {signal.sl}\n"
             f"Strategy: {signal.strategy_id or 'Unknown'}"
         )
-        res = send_push_notification(
+        notification_dispatcher.push(
             title, body, data={"token": signal.token, "type": "signal"}
         )
-        if res.get("success", 0) > 0:
-            print(f"[PUSH] 🔔 Sent ({res['success']} devices).")
-        # Fail silently if 0
     except Exception as push_err:
         print(f"[PUSH] ❌ Error: {push_err}")
 
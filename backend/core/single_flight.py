@@ -0,0 +1,110 @@
+# backend/core/single_flight.py
+"""
+Single-Flight Request Coalescing.
+
+Cuando varios llamadores piden la misma clave a la vez (p.ej. cinco workers
+del scheduler + la API pidiendo `ohlcv:BTC:1h`), solo el primero ejecuta la
+descarga; el resto espera ese mismo vuelo y comparte su resultado (o su
+excepción). Evita estampidas 429 contra los exchanges cuando la caché
+todavía no se ha rellenado.
+
+Soporta hilos (`do`) y asyncio (`do_async`).
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, _Call] = {}
+        self._async_calls: Dict[Tuple[int, Any], "asyncio.Future[Any]"] = {}
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def do(self, key: Any, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Ejecuta `fn(*args, **kwargs)` una sola vez por clave en vuelo.
+        Los hilos concurrentes con la misma clave reciben el mismo resultado.
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["executions"] += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    async def do_async(
+        self, key: Any, fn: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> Any:
+        """
+        Variante asyncio: las corrutinas del mismo event loop con la misma
+        clave esperan una única tarea compartida.
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+
+        with self._lock:
+            self._stats["calls"] += 1
+            fut = self._async_calls.get(loop_key)
+            if fut is not None:
+                self._stats["coalesced"] += 1
+            else:
+                fut = loop.create_task(fn(*args, **kwargs))
+                self._async_calls[loop_key] = fut
+                self._stats["executions"] += 1
+
+                def _done(_f, _key=loop_key):
+                    with self._lock:
+                        if self._async_calls.get(_key) is _f:
+                            del self._async_calls[_key]
+
+                fut.add_done_callback(_done)
+
+        # shield: cancelling one waiter must not cancel the shared flight
+        return await asyncio.shield(fut)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._async_calls)
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores: llamadas totales, ejecuciones reales y llamadas coalescidas."""
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._calls) + len(self._async_calls))
@@ -0,0 +1,50 @@
+# backend/core/strategy_worker.py
+"""
+Process-Pool Worker for Strategy Evaluation.
+
+El cálculo de indicadores (pandas/pandas_ta) y los bucles Python de las
+estrategias retienen el GIL: con hilos, un escáner de 150 tokens usa un solo
+núcleo. En modo proceso el scheduler descarga los datos en el padre y cada
+worker solo evalúa: recibe `context={"data": {token: CandleArray}}` (los
+buffers NumPy viajan picklados, sin dicts por vela) y devuelve las señales.
+
+Módulo ligero a propósito: con el start method "spawn" el hijo importa esto,
+no el scheduler completo.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+
+def init_worker():
+    """Registra las estrategias en el proceso hijo (el registry es por proceso)."""
+    from strategies.registry import get_registry, load_default_strategies
+
+    if not get_registry()._strategies:
+        load_default_strategies()
+
+
+def run_strategy(
+    strategy_id: str, tokens: List[str], timeframe: str, context: Optional[Dict[str, Any]]
+) -> list:
+    """Evalúa una persona en el worker. Retorna la lista de Signal."""
+    from strategies.registry import get_registry
+
+    strategy = get_registry().get(strategy_id)
+    if strategy is None:
+        return []
+    return strategy.generate_signals(tokens=tokens, timeframe=timeframe, context=context)
+
+
+def create_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Pool de procesos con "spawn": el padre tiene hilos vivos (refresco de
+    caché, pool de exchanges), y hacer fork con locks tomados puede colgar
+    al hijo.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+    )
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Set, Tuple
 
+from core.csv_journal import journal_files
 from indicators.market import get_market_data, EXCHANGE_ID
 
 
@@ -21,6 +22,9 @@ EVAL_DELAY_MIN = 0
 # Umbral para considerar un movimiento como "neutral" aunque no haya tocado TP/SL (en %)
 NEUTRAL_THRESHOLD_PCT = 0.20
 
+# Resultado CSV -> resultado en DB (vocabulario de core.signal_evaluator)
+DB_RESULTS = {"hit-tp": "WIN", "hit-sl": "LOSS", "neutral": "BE"}
+
 EVAL_HEADERS = [
     "signal_ts",
     "evaluated_at",
@@ -92,17 +96,17 @@ def _append_evaluations(token: str, rows: List[Dict[str, str]]) -> int:
         for row in rows:
             writer.writerow(row)
 
-    # 2. DB
+    # 2. DB: mismo camino incremental que core.signal_evaluator (evaluación,
+    # CLOSED y agregados de la persona en la misma transacción)
     try:
-        from backend.database import SessionLocal
-        from backend.models_db import (
-            Signal,
-            SignalEvaluation,
-        )
+        from database import SessionLocal
+        from models_db import Signal
         from sqlalchemy import select
+        from core.signal_evaluator import apply_persona_deltas, record_evaluation
 
         db = SessionLocal()
-        strategies_to_update = set()
+        deltas: Dict[str, Dict] = {}
+        now = datetime.utcnow()
 
         try:
             for row in rows:
@@ -132,31 +136,20 @@ def _append_evaluations(token: str, rows: List[Dict[str, str]]) -> int:
                     )
                     signal_obj = db.execute(stmt).scalars().first()
 
-                if signal_obj:
-                    # Verificar si ya tiene evaluación
-                    if signal_obj.evaluation:
-                        continue
-
-                    # Crear evaluación
-                    eval_obj = SignalEvaluation(
-                        signal_id=signal_obj.id,
-                        evaluated_at=datetime.utcnow(),
-                        result=row.get("result"),
-                        pnl_r=0.0,
-                        exit_price=float(row.get("price_at_eval", 0)),
-                    )
-                    db.add(eval_obj)
+                # Ya evaluada (por aquí o por el evaluador de velas)
+                if not signal_obj or signal_obj.status == "CLOSED" or signal_obj.evaluation:
+                    continue
 
-                    # Mark strategy for stats update if present
-                    if signal_obj.strategy_id:
-                        strategies_to_update.add(signal_obj.strategy_id)
+                result = DB_RESULTS.get(row.get("result"), "BE")
+                if not (signal_obj.entry and signal_obj.entry > 0):
+                    result = "neutral"  # Invalid entry, as in core.signal_evaluator
+                exit_price = float(row.get("price_at_eval") or signal_obj.entry or 0)
+                record_evaluation(db, deltas, signal_obj, result, exit_price, now)
 
+            # 3. Persona aggregates: incremental deltas, no history recount
+            apply_persona_deltas(db, deltas)
             db.commit()
 
-            # 3. Update Strategy Stats
-            for strat_id in strategies_to_update:
-                _update_strategy_stats(strat_id, db)
-
         except Exception as e:
             print(f"[DB ERROR] Error guardando evaluaciones en DB: {e}")
             db.rollback()
@@ -171,47 +164,6 @@ def _append_evaluations(token: str, rows: List[Dict[str, str]]) -> int:
     return len(rows)
 
 
-def _update_strategy_stats(strategy_id: str, db) -> None:
-    """Recalculate and update stats for a given strategy."""
-    from models_db import Signal, SignalEvaluation, StrategyConfig
-    from sqlalchemy import func
-
-    # Count total evaluated for this strategy
-    total_eval = (
-        db.query(func.count(SignalEvaluation.id))
-        .join(Signal, Signal.id == SignalEvaluation.signal_id)
-        .filter(Signal.strategy_id == strategy_id)
-        .scalar()
-        or 0
-    )
-
-    # Count wins (hit-tp)
-    total_wins = (
-        db.query(func.count(SignalEvaluation.id))
-        .join(Signal, Signal.id == SignalEvaluation.signal_id)
-        .filter(Signal.strategy_id == strategy_id)
-        .filter(SignalEvaluation.result == "hit-tp")
-        .scalar()
-        or 0
-    )
-
-    # Calculate Rate
-    win_rate = (total_wins / total_eval) if total_eval > 0 else 0.0
-
-    # Update Config
-    strat_config = (
-        db.query(StrategyConfig)
-        .filter(StrategyConfig.strategy_id == strategy_id)
-        .first()
-    )
-    if strat_config:
-        strat_config.win_rate = win_rate
-        db.commit()
-        print(
-            f"[STATS] Updated {strategy_id}: WinRate={win_rate:.2%} ({total_wins}/{total_eval})"
-        )
-
-
 def _evaluate_signal_row(row: Dict[str, str]) -> Dict[str, str]:
     """
     Dada una fila de logs LITE, calcula la evaluación:
@@ -310,13 +262,14 @@ def _evaluate_signal_row(row: Dict[str, str]) -> Dict[str, str]:
 
 def _eligible_signals_for_token(token: str) -> List[Dict[str, str]]:
     """
-    Carga las señales LITE de logs/LITE/{token}.csv que:
+    Carga las señales LITE de logs/LITE/{token}.csv (y de sus segmentos
+    rotados en logs/LITE/archive/, donde quedan señales aún abiertas) que:
 
     - tengan al menos EVAL_DELAY_MIN minutos de antigüedad
     - aún no estén en logs/EVALUATED/{token}.evaluated.csv
     """
-    lite_path = LITE_DIR / f"{token}.csv"
-    if not lite_path.exists():
+    lite_files = journal_files(LITE_DIR / f"{token}.csv")
+    if not lite_files:
         return []
 
     already_eval = _load_evaluated_signal_ts(token)
@@ -326,19 +279,20 @@ def _eligible_signals_for_token(token: str) -> List[Dict[str, str]]:
 
     candidates: List[Dict[str, str]] = []
 
-    with lite_path.open("r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            ts_str = row.get("timestamp", "")
-            if not ts_str:
-                continue
+    for lite_path in lite_files:
+        with lite_path.open("r", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                ts_str = row.get("timestamp", "")
+                if not ts_str:
+                    continue
 
-            if ts_str in already_eval:
-                continue
+                if ts_str in already_eval:
+                    continue
 
-            ts = _parse_iso_ts(ts_str)
-            if now - ts >= min_age:
-                candidates.append(row)
+                ts = _parse_iso_ts(ts_str)
+                if now - ts >= min_age:
+                    candidates.append(row)
 
     return candidates
 
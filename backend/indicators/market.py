@@ -2,7 +2,7 @@ import pandas as pd
 import ta
 
 # Importar desde el módulo core
-from core.market_data_api import get_ohlcv_data
+from core.market_data_api import get_ohlcv_arrays
 
 # Exchange ID for data source (used by evaluator)
 EXCHANGE_ID = "binance"
@@ -14,24 +14,17 @@ def get_market_data(symbol: str, timeframe: str = "1h", limit: int = 1000):
     Retorna: (dataframe, dict_resumen_actual)
     """
     try:
-        # Usar la API robusta con fallback
-        import inspect
-        from core import market_data_api
-
-        print(
-            f"[DEBUG MARKET] Signature: {inspect.signature(market_data_api.get_ohlcv_data)}"
-        )
-
-        ohlcv_data, source_id = get_ohlcv_data(
+        # Usar la API robusta con fallback (formato columnar)
+        candles, source_id = get_ohlcv_arrays(
             symbol, timeframe, limit, return_source=True
         )
 
-        if not ohlcv_data:
+        if not candles:
             return None, None
 
-        # Convertir lista de dicts a DataFrame
-        # market_data_api devuelve: {'timestamp': ms, 'open': float, ...}
-        df = pd.DataFrame(ohlcv_data)
+        # DataFrame sobre los arrays NumPy (sin lista de dicts intermedia)
+        # Columnas: timestamp (ms), open, high, low, close, volume
+        df = candles.to_dataframe(index=False)
 
         # Asegurar columnas correctas y tipos
         required_cols = ["timestamp", "open", "high", "low", "close", "volume"]
@@ -647,16 +647,16 @@ async def telegram_webhook(request: Request):
 
 # ==== SCHEDULER AUTO-START ====
 import threading  # noqa: E402
-from scheduler import scheduler_instance  # noqa: E402
+from scheduler import SCHEDULER_ENGINE, scheduler_instance  # noqa: E402
 from strategies.registry import load_default_strategies  # noqa: E402
 
 
 @app.on_event("startup")
-def start_scheduler_thread():
+async def start_scheduler_thread():
     """
-    Arranca el Scheduler en un hilo secundario (Daemon).
-    Esto asegura que las estrategias se ejecuten automÃ¡ticamente
-    sin bloquear el servidor principal y sin necesitar 'python scheduler.py'.
+    Arranca el Scheduler sin bloquear el servidor principal y sin necesitar
+    'python scheduler.py': por defecto como tarea asyncio en el event loop
+    de la app (SCHEDULER_ENGINE=async), o en un hilo daemon (=thread).
     """
     # 1. Load Strategies into Registry (Shared Memory)
     load_default_strategies()
@@ -667,12 +667,31 @@ def start_scheduler_thread():
     # User Request: "Always running" implies default should be True.
     run_scheduler = os.getenv("RUN_SCHEDULER", "true").lower() in ["true", "1", "yes"]
     
-    if run_scheduler:
+    if not run_scheduler:
+        print("ℹ️ [STARTUP] Scheduler skipped (RUN_SCHEDULER not set).")
+    elif SCHEDULER_ENGINE == "thread":
         print("🚀 [STARTUP] Launching Strategy Scheduler Thread...")
         t = threading.Thread(target=scheduler_instance.run, daemon=True)
         t.start()
     else:
-        print("ℹ️ [STARTUP] Scheduler skipped (RUN_SCHEDULER not set).")
+        print("🚀 [STARTUP] Launching Strategy Scheduler (asyncio task)...")
+        scheduler_instance.start_async()
+
+
+@app.on_event("shutdown")
+async def stop_scheduler():
+    # Graceful: let the running cycle finish, then cancel (no-op in thread mode)
+    await scheduler_instance.stop_async(
+        timeout=float(os.getenv("SCHEDULER_SHUTDOWN_TIMEOUT", "30"))
+    )
+    # No more signals once the scheduler is down: drain queued CSV rows to disk
+    from core.signal_logger import csv_journal
+
+    await asyncio.to_thread(csv_journal.close)
+    # Give queued notifications a bounded chance to go out
+    from core.notification_dispatcher import notification_dispatcher
+
+    await asyncio.to_thread(notification_dispatcher.close)
 
 
 if __name__ == "__main__":
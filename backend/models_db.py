@@ -6,7 +6,9 @@ from sqlalchemy import (
     DateTime,
     Text,
     ForeignKey,
+    Index,
     UniqueConstraint,
+    text,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -50,11 +52,22 @@ class Signal(Base):
     is_saved = Column(Integer, default=0)  # 0=Transient, 1=Saved/Tracked by user
     extra = Column(Text, nullable=True)  # JSON Metadata encoded as string
 
+    # OPEN until its SignalEvaluation is written (then CLOSED), so the evaluator
+    # and the logs don't need an anti-join against signal_evaluations
+    status = Column(String, default="OPEN", server_default="OPEN", nullable=False)
+
     # [HARDENING] Persistent Deduplication
     __table_args__ = (
         UniqueConstraint(
             "strategy_id", "token", "timestamp", "direction", name="uq_signal_dedup"
         ),
+        # Partial index: only the (small) open set is indexed
+        Index(
+            "ix_signals_open",
+            "timestamp",
+            sqlite_where=text("status = 'OPEN'"),
+            postgresql_where=text("status = 'OPEN'"),
+        ),
         {"extend_existing": True},
     )
 
@@ -97,6 +110,43 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class PersonaPerformance(Base):
+    """
+    Agregados acumulados por persona (Signal.strategy_id = persona_id).
+
+    Se actualizan de forma incremental en la misma transacción que cada
+    nueva SignalEvaluation, así win rate / R total son lecturas O(1).
+    """
+
+    __tablename__ = "persona_performance"
+    __table_args__ = {"extend_existing": True}
+
+    persona_id = Column(String, primary_key=True)
+    total = Column(Integer, default=0, nullable=False)  # All evaluations (incl. neutral)
+    wins = Column(Integer, default=0, nullable=False)
+    losses = Column(Integer, default=0, nullable=False)
+    breakeven = Column(Integer, default=0, nullable=False)
+    sum_pnl_r = Column(Float, default=0.0, nullable=False)
+    sum_sq_pnl_r = Column(Float, default=0.0, nullable=False)
+    last_eval_at = Column(DateTime, nullable=True)
+
+    @property
+    def win_rate(self) -> float:
+        """0-100, como StrategyConfig.win_rate."""
+        return (self.wins / self.total) * 100 if self.total else 0.0
+
+    @property
+    def avg_pnl_r(self) -> float:
+        return self.sum_pnl_r / self.total if self.total else 0.0
+
+    @property
+    def std_pnl_r(self) -> float:
+        if not self.total:
+            return 0.0
+        variance = self.sum_sq_pnl_r / self.total - self.avg_pnl_r**2
+        return max(variance, 0.0) ** 0.5
+
+
 class StrategyConfig(Base):
     """
     Configuración de estrategias 24/7 para el scheduler.
@@ -28,9 +28,65 @@ def send_telegram(text: str, chat_id: str = None) -> dict:
     try:
         r = requests.post(url, json=payload, timeout=8)
         ok = r.status_code == 200
-        return {"ok": ok, "status": r.status_code, "data": r.json() if ok else r.text}
+        return {
+            "ok": ok,
+            "status": r.status_code,
+            "data": r.json() if ok else r.text,
+            # Rate limited / Telegram side error: worth another attempt
+            "retryable": r.status_code == 429 or r.status_code >= 500,
+        }
     except Exception as e:
-        return {"ok": False, "error": str(e)}
+        return {"ok": False, "error": str(e), "retryable": True}
+
+
+def push_payload(title: str, body: str, data: dict = None) -> str:
+    return json.dumps(
+        {"title": title, "body": body, "icon": "/icon-192.png", "data": data or {}}
+    )
+
+
+def vapid_claims() -> dict:
+    # Claims for VAPID
+    return {"sub": os.getenv("VAPID_MAIL", "mailto:admin@tradercopilot.com")}
+
+
+def send_webpush(subscription_info: dict, payload: str, private_key: str, claims: dict) -> dict:
+    """
+    Un solo envío Web Push. `gone` = la suscripción ya no existe (404/410) y
+    debe borrarse; `retryable` = rate limit / error del push service.
+    """
+    try:
+        webpush(
+            subscription_info=subscription_info,
+            data=payload,
+            vapid_private_key=private_key,
+            vapid_claims=claims,
+        )
+        return {"ok": True}
+    except WebPushException as ex:
+        # NOTE: a requests.Response is falsy for 4xx/5xx, compare against None
+        status = ex.response.status_code if ex.response is not None else None
+        return {
+            "ok": False,
+            "status": status,
+            "error": str(ex),
+            "gone": status in (404, 410),
+            "retryable": status is None or status == 429 or status >= 500,
+        }
+
+
+def remove_push_subscriptions(db, endpoints) -> int:
+    """Borra en bloque las suscripciones caducadas (410 Gone)."""
+    endpoints = list(endpoints)
+    removed = 0
+    for i in range(0, len(endpoints), 500):
+        removed += (
+            db.query(PushSubscription)
+            .filter(PushSubscription.endpoint.in_(endpoints[i : i + 500]))
+            .delete(synchronize_session=False)
+        )
+    db.commit()
+    return removed
 
 
 def send_push_notification(title: str, body: str, data: dict = None) -> dict:
@@ -41,42 +97,37 @@ def send_push_notification(title: str, body: str, data: dict = None) -> dict:
     if not private_key:
         return {"ok": False, "error": "Missing VAPID_PRIVATE_KEY"}
 
-    # Claims for VAPID
-    claims = {"sub": os.getenv("VAPID_MAIL", "mailto:admin@tradercopilot.com")}
+    claims = vapid_claims()
 
     db = SessionLocal()
     subs = db.query(PushSubscription).all()
 
     results = {"success": 0, "failed": 0, "removed": 0}
-
-    payload = json.dumps(
-        {"title": title, "body": body, "icon": "/icon-192.png", "data": data or {}}
-    )
+    payload = push_payload(title, body, data)
+    gone = []
 
     for sub in subs:
         try:
-            webpush(
-                subscription_info={
-                    "endpoint": sub.endpoint,
-                    "keys": {"p256dh": sub.p256dh, "auth": sub.auth},
-                },
-                data=payload,
-                vapid_private_key=private_key,
-                vapid_claims=claims,
+            res = send_webpush(
+                {"endpoint": sub.endpoint, "keys": {"p256dh": sub.p256dh, "auth": sub.auth}},
+                payload,
+                private_key,
+                claims,
             )
-            results["success"] += 1
-        except WebPushException as ex:
-            # If 410 Gone, remove subscription
-            if ex.response and ex.response.status_code == 410:
-                db.delete(sub)
-                results["removed"] += 1
+            if res["ok"]:
+                results["success"] += 1
+            elif res.get("gone"):
+                # If 410 Gone, remove subscription
+                gone.append(sub.endpoint)
             else:
                 results["failed"] += 1
-                print(f"WebPush Error: {ex}")
+                print(f"WebPush Error: {res.get('error')}")
         except Exception as e:
             results["failed"] += 1
             print(f"General Push Error: {e}")
 
+    if gone:
+        results["removed"] = remove_push_subscriptions(db, gone)
     db.commit()
     db.close()
     return results
@@ -21,6 +21,7 @@ from core.security import (
     ALGORITHM,
 )
 from core.limiter import limiter
+from core.persona_catalog import persona_catalog
 
 # Entitlements Endpoint
 from database import SessionLocal
@@ -258,6 +259,7 @@ def seed_default_strategies(db: Session, user: User):
             db.add(new_conf)
         
         db.commit()
+        persona_catalog.invalidate(user_id=user.id)
         print(f"[AUTH] Seeded {len(SYSTEM_PERSONAS)} system strategies for user {user.id}")
     except Exception as e:
         db.rollback()
@@ -351,6 +353,7 @@ async def update_telegram_id(
     """
     current_user.telegram_chat_id = payload.chat_id
     db.commit()
+    persona_catalog.invalidate(user_id=current_user.id)
     return {"status": "ok", "telegram_chat_id": current_user.telegram_chat_id}
 
 
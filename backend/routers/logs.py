@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from database import get_db
@@ -34,7 +34,15 @@ class LogEntry(BaseModel):
         from_attributes = True
 
 
-
+def _closed_evaluations(db: Session, signals: List[Signal]) -> Dict[int, SignalEvaluation]:
+    """Evaluaciones de las señales CLOSED de la página, en una sola consulta."""
+    closed_ids = [sig.id for sig in signals if sig.status == "CLOSED"]
+    if not closed_ids:
+        return {}
+    return {
+        ev.signal_id: ev
+        for ev in db.query(SignalEvaluation).filter(SignalEvaluation.signal_id.in_(closed_ids))
+    }
 
 
 @router.get("/recent", response_model=List[LogEntry])
@@ -107,6 +115,7 @@ def get_recent_logs(
         # But for 'Stability', DB pagination is safer than fetching limit*3.
         # We accept minor dedup artifacts in exchange for 100% predictable load.
         signals = query.offset(pagination.offset).limit(pagination.limit).all()
+        evaluations = _closed_evaluations(db, signals)
 
         # Enriquecer con evaluación si existe + DEDUPLICACIÓN
         results = []
@@ -123,15 +132,10 @@ def get_recent_logs(
                 continue
             seen_keys.add(dedup_key)
 
-            # Buscar vacantes (evaluación)
-            # OPTIMIZATION: Could be eager loaded, but for now loop is fine for small limits
-            eval_entry = (
-                db.query(SignalEvaluation)
-                .filter(SignalEvaluation.signal_id == sig.id)
-                .first()
-            )
+            # Evaluación (solo existe para señales CLOSED)
+            eval_entry = evaluations.get(sig.id)
 
-            status = "OPEN"
+            status = sig.status or "OPEN"
             pnl = None
             closed_at = None
             exit_price = None
@@ -194,15 +198,12 @@ def get_logs_by_token(
             query = query.filter(Signal.token == token.upper())
 
         signals = query.order_by(desc(Signal.timestamp)).limit(limit).all()
+        evaluations = _closed_evaluations(db, signals)
 
         # Mapear a formato simple
         results = []
         for s in signals:
-            eval_entry = (
-                db.query(SignalEvaluation)
-                .filter(SignalEvaluation.signal_id == s.id)
-                .first()
-            )
+            eval_entry = evaluations.get(s.id)
             results.append(
                 {
                     "timestamp": s.timestamp.isoformat() if s.timestamp else None,
@@ -214,6 +215,7 @@ def get_logs_by_token(
                     "sl": s.sl,
                     "confidence": s.confidence,
                     "source": s.source,
+                    "status": s.status,
                     "closed_at": (
                         eval_entry.evaluated_at.isoformat()
                         if eval_entry and eval_entry.evaluated_at
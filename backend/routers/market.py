@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Query
 from typing import List, Optional
-from core.market_data_api import get_market_summary, get_ohlcv_data
+from core.market_data_api import get_fetch_stats, get_market_summary, get_ohlcv_data
 
 router = APIRouter()
 
@@ -38,3 +38,12 @@ def get_market_ohlcv(token: str, timeframe: str = "30m", limit: int = 100):
         # 404? Or just empty list? Front needs list.
         return []
     return data
+
+
+@router.get("/health")
+def market_data_health():
+    """
+    Observabilidad de la capa de datos: estado por exchange (circuit breaker,
+    latencia/error EWMA, throttling), pool de clientes y single-flight.
+    """
+    return get_fetch_stats()
@@ -4,7 +4,7 @@ from sqlalchemy import func
 from datetime import datetime, timedelta
 from database import get_db
 from routers.auth_new import get_current_user
-from models_db import User, Signal, SignalEvaluation
+from models_db import PersonaPerformance, StrategyConfig, User, Signal, SignalEvaluation
 
 router = APIRouter(tags=["Stats"], dependencies=[Depends(get_current_user)])
 
@@ -24,7 +24,10 @@ def get_dashboard_stats(
         # 2. Calculate Chart Data (7 Days Performance)
         chart_data = get_performance_chart(db, current_user)
 
-        return {"summary": summary, "chart": chart_data}
+        # 3. Per-Persona Performance (running aggregates, O(1) per persona)
+        personas = get_persona_performance(db, current_user)
+
+        return {"summary": summary, "chart": chart_data, "personas": personas}
     except Exception as e:
         print(f"[STATS] Error calculating dashboard stats: {e}")
         # Return safe defaults in case of error to prevent frontend crash
@@ -37,6 +40,7 @@ def get_dashboard_stats(
                 "pnl_7d": 0.0,
             },
             "chart": [],
+            "personas": [],
         }
 
 
@@ -102,11 +106,8 @@ def compute_stats_summary(db: Session, user: User):
     # Win Rate Calculation
     win_rate_24h = (wins_24h / eval_24h_count * 100) if eval_24h_count > 0 else 0
 
-    # 4. Open Signals (Estimated: Created 24h - Evaluated 24h)
-    # Count LITE/PRO signals created in last 24h
-    q_created_24 = get_base_signal_query().filter(Signal.timestamp >= day_ago)
-    created_24h = q_created_24.count()
-    open_signals_est = max(0, created_24h - eval_24h_count)  # Simplistic estimation
+    # 4. Open Signals (status column, no join against evaluations)
+    open_signals = get_base_signal_query().filter(Signal.status == "OPEN").count()
 
     # 5. PnL Last 7 Days
     q_pnl = (
@@ -127,7 +128,7 @@ def compute_stats_summary(db: Session, user: User):
         "win_rate_24h": round(win_rate_24h, 1),
         "signals_evaluated_24h": eval_24h_count,
         "signals_total_evaluated": total_eval,
-        "open_signals": open_signals_est,
+        "open_signals": open_signals,
         "pnl_7d": round(pnl_7d, 2),
     }
 
@@ -197,3 +198,31 @@ def get_performance_chart(db: Session, user: User):
         )
 
     return final_chart
+
+
+def get_persona_performance(db: Session, user: User):
+    """
+    Win rate / R totals of the user's personas, read from `persona_performance`
+    instead of re-aggregating their evaluation history.
+    """
+    rows = (
+        db.query(StrategyConfig.persona_id, StrategyConfig.name, PersonaPerformance)
+        .join(PersonaPerformance, PersonaPerformance.persona_id == StrategyConfig.persona_id)
+        .filter(StrategyConfig.user_id == user.id)
+        .all()
+    )
+    return [
+        {
+            "persona_id": persona_id,
+            "name": name,
+            "total": perf.total,
+            "wins": perf.wins,
+            "losses": perf.losses,
+            "win_rate": round(perf.win_rate, 1),
+            "total_r": round(perf.sum_pnl_r, 2),
+            "avg_r": round(perf.avg_pnl_r, 2),
+            "std_r": round(perf.std_pnl_r, 2),
+            "last_eval_at": perf.last_eval_at.isoformat() if perf.last_eval_at else None,
+        }
+        for persona_id, name, perf in rows
+    ]
@@ -12,10 +12,11 @@ import re
 
 
 from database import get_db
-from models_db import StrategyConfig, User, Signal, SignalEvaluation
+from models_db import PersonaPerformance, StrategyConfig, User, Signal, SignalEvaluation
 from pydantic import BaseModel
 from routers.auth_new import get_current_user
 from dependencies import require_plan
+from core.persona_catalog import persona_catalog
 
 
 # === Dependency ===
@@ -90,6 +91,14 @@ async def get_marketplace(
         # Re-fetch after seeding
         configs = db.query(StrategyConfig).filter(StrategyConfig.user_id == current_user.id).all()
 
+    # Running aggregates: one O(1) row per persona instead of recounting evaluations
+    performance = {
+        perf.persona_id: perf
+        for perf in db.query(PersonaPerformance).filter(
+            PersonaPerformance.persona_id.in_([c.persona_id for c in configs])
+        )
+    }
+
     personas = []
     for c in configs:
         # Determine strict "is_custom" bool based on user_id presence
@@ -107,37 +116,8 @@ async def get_marketplace(
             tf = c.timeframes
 
         # Stats Real (if signals exist)
-        # Fix: Calculate Win Rate dynamically to ensure accuracy
-        target_source = f"Marketplace:{c.persona_id}"
-        real_wr = 0.0
-        try:
-            # Count evaluated wins
-            wins = (
-                db.query(SignalEvaluation)
-                .join(Signal)
-                .filter(
-                    Signal.source == target_source, SignalEvaluation.result == "WIN"
-                )
-                .count()
-            )
-
-            # Count total evaluations
-            total_evals = (
-                db.query(SignalEvaluation)
-                .join(Signal)
-                .filter(Signal.source == target_source)
-                .count()
-            )
-
-            if total_evals > 0:
-                real_wr = (wins / total_evals) * 100
-
-            # Valid commit happens outside loop if we want, or transient update
-            c.win_rate = real_wr
-            c.total_signals = total_evals
-        except Exception as e:
-            print(f"[STATS] Error calculating stats for {c.persona_id}: {e}")
-            real_wr = c.win_rate or 0.0
+        perf = performance.get(c.persona_id)
+        real_wr = perf.win_rate if perf else 0.0
 
         # Frequency (Static if in config, else inferred)
         freq_label = "Medium"
@@ -166,7 +146,9 @@ async def get_marketplace(
                 "description": c.description,
                 "risk_level": c.risk_profile,
                 "expected_roi": c.expected_roi or "N/A",
-                "win_rate": f"{int(real_wr)}%",  # Calculated Live
+                "win_rate": f"{int(real_wr)}%",  # From running aggregates
+                "total_signals": perf.total if perf else 0,
+                "total_r": round(perf.sum_pnl_r, 2) if perf else 0.0,
                 "frequency": freq_label,
                 "color": c.color,
                 "is_active": c.enabled == 1,
@@ -222,6 +204,7 @@ async def create_persona(
     db.add(new_strat)
     db.commit()
     db.refresh(new_strat)
+    persona_catalog.invalidate(persona_id=new_id)
 
     return {"status": "ok", "id": new_id, "msg": "Strategy created successfully"}
 
@@ -248,6 +231,7 @@ async def toggle_strategy(
     # Toggle (0 -> 1, 1 -> 0)
     strat.enabled = 0 if strat.enabled == 1 else 1
     db.commit()
+    persona_catalog.invalidate(persona_id=persona_id)
 
     return {"status": "ok", "enabled": strat.enabled == 1}
 
@@ -309,8 +293,12 @@ async def delete_persona(
         f"{deleted_signals} Signals + {deleted_evals} Evaluations."
     )
 
+    db.query(PersonaPerformance).filter(PersonaPerformance.persona_id == persona_id).delete(
+        synchronize_session=False
+    )
     db.delete(strat)
     db.commit()
+    persona_catalog.invalidate(persona_id=persona_id)
     return {
         "status": "ok",
         "msg": f"Strategy deleted. Cleared {deleted_signals} signals.",
@@ -7,11 +7,14 @@ NO requiere Docker ni cron, solo:
     python scheduler.py
 """
 
+import asyncio
+import concurrent.futures
+import os
 import sys
 import time
-import json
 import logging
-from datetime import datetime, timedelta
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import uuid
 from sqlalchemy.orm import Session
@@ -24,10 +27,18 @@ sys.path.insert(0, str(current_dir))
 from database import SessionLocal  # noqa: E402
 from strategies.registry import get_registry  # noqa: E402
 from core.signal_evaluator import evaluate_pending_signals  # noqa: E402
-from core.signal_logger import log_signal  # noqa: E402
-from models_db import StrategyConfig, User  # noqa: E402
+from core.signal_logger import log_signal, log_signals  # noqa: E402
+from core.market_data_api import close_batch_loop, get_ohlcv_batch, get_ohlcv_batch_sync  # noqa: E402
+from core.exchange_pool import async_exchange_pool  # noqa: E402
+from core.strategy_worker import create_pool, run_strategy  # noqa: E402
+from core.schedule_queue import DueQueue, last_candle_close, next_candle_close  # noqa: E402
+from core.shard_lease import ShardLeaseManager  # noqa: E402
+from core.dedupe_store import TTLStore  # noqa: E402
+from core.cache import cache  # noqa: E402
+from core.persona_catalog import persona_catalog  # noqa: E402
+from core.notification_dispatcher import notification_dispatcher  # noqa: E402
+from models_db import StrategyConfig  # noqa: E402
 from notify import send_telegram  # noqa: E402
-from data.supported_tokens import VALID_TOKENS_FULL  # noqa: E402
 
 # Configuración de Logging
 logging.basicConfig(
@@ -38,73 +49,28 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def get_active_strategies_from_db():
-    """
-    Recupera las estrategias activas directamente de PostgreSQL (StrategyConfig).
-    Retorna una lista de diccionarios compatibles con el formato esperado por el scheduler.
-    """
-    db = SessionLocal()
-    try:
-        # Join with User to get Telegram preferences
-        results = (
-            db.query(StrategyConfig, User.telegram_chat_id)
-            .outerjoin(User, StrategyConfig.user_id == User.id)
-            .filter(StrategyConfig.enabled == 1)
-            .all()
-        )
+MIN_INTERVAL_SECONDS = 10
+# Wait after a candle close before fetching, so exchanges have published it
+CANDLE_SETTLE_SECONDS = float(os.getenv("SCHEDULER_SETTLE_SECONDS", "2"))
+# "async": asyncio engine (run_async) | "thread": blocking loop (run) in a thread
+SCHEDULER_ENGINE = os.getenv("SCHEDULER_ENGINE", "async").lower()
 
-        strategies = []
-        for c, chat_id in results:
-            # Parse JSON fields safely
-            try:
-                tokens_list = json.loads(c.tokens) if c.tokens else []
-            except Exception:
-                tokens_list = []
-
-            try:
-                tf_list = json.loads(c.timeframes) if c.timeframes else []
-            except Exception:
-                tf_list = []
+# Dedupe windows (seconds)
+SPAM_WINDOW = 60  # Same persona/token/direction
+COHERENCE_WINDOW = 30 * 60  # Opposite direction on the same token
+NOTIFY_WINDOW = 45 * 60  # Telegram per persona/token/direction
+# A strategy re-emits the last closed candle's signal until the next one (up to 1d)
+PROCESSED_TTL = 2 * 86400
+DEDUPE_MAX_ENTRIES = int(os.getenv("SCHEDULER_DEDUPE_MAX_ENTRIES", "100000"))
 
-            # --- TOKEN LIST LOGIC ---
-            # If the strategy is configured with "ALL" or "SCANNER" as the symbol,
-            # or if the tokens list is empty, we treat it as a SCANNER strategy
-            # that runs on the full list.
-
-            primary_symbol = tokens_list[0] if tokens_list else "BTC"
-
-            # Special 'Marker' logic for System Scanners
-            if primary_symbol in ["ALL", "SCANNER", "*"]:
-                logger.info(
-                    f"  ✨ Detected Scanner Strategy: {c.name} -> Expanding to {len(VALID_TOKENS_FULL)} tokens"
-                )
-                target_tokens = VALID_TOKENS_FULL
-            else:
-                # Default: Use the specific tokens configured (or just the first one for now)
-                # Ideally, we should iterate all tokens in tokens_list
-                # For now, let's just make target_tokens a list
-                target_tokens = tokens_list if tokens_list else ["BTC"]
-
-            target_tf = tf_list[0] if tf_list else "1h"
-
-            strategies.append(
-                {
-                    "id": c.persona_id,  # "trend_king_sol"
-                    "strategy_id": c.strategy_id,  # "donchian_v2"
-                    "tokens": target_tokens,  # Pass LIST of tokens
-                    "timeframe": target_tf,
-                    "name": c.name,
-                    "telegram_chat_id": chat_id,
-                    "user_id": c.user_id, # [FIX] Isolation: Pass owner ID
-                }
-            )
 
-        return strategies
-    except Exception as e:
-        logger.error(f"Error fetching strategies from DB: {e}")
-        return []
-    finally:
-        db.close()
+def get_active_strategies_from_db():
+    """
+    Personas activas (StrategyConfig) en el formato que espera el scheduler.
+    Vía `persona_catalog`: solo se recargan las filas cambiadas desde la
+    última sincronización o invalidadas desde la API.
+    """
+    return persona_catalog.sync()
 
 
 class StrategyScheduler:
@@ -144,27 +110,64 @@ class StrategyScheduler:
 
         # State tracking for intervals
         self.last_run = {}  # {persona_id: timestamp}
-        self.processed_signals = {}  # {signal_key: timestamp}
-        self.last_signal_direction = {}  # {persona_id_token: direction} (For alternation enforcement)
+        self.schedule = DueQueue()  # persona_id -> next due (epoch s)
+        self.personas = {}  # {persona_id: persona} (last DB refresh)
+        # Dedupe state: bounded TTL stores with tuple keys, optionally shared
+        # through Redis (SCHEDULER_DEDUPE_REDIS) so it survives restarts
+        dedupe_redis = (
+            cache.redis_client
+            if os.getenv("SCHEDULER_DEDUPE_REDIS", "false").lower() in ["true", "1", "yes"]
+            else None
+        )
+        self.processed_signals = TTLStore(
+            "processed", PROCESSED_TTL, DEDUPE_MAX_ENTRIES, dedupe_redis
+        )  # {(persona_id, token, direction, ts): True}
+        self.last_signal_direction = TTLStore(
+            "direction", SPAM_WINDOW, DEDUPE_MAX_ENTRIES, dedupe_redis
+        )  # {(persona_id, token): (direction, ts)} (For alternation enforcement)
 
         # Lock Config
         self.lock_id = str(uuid.uuid4())
         self.lock_ttl = 300  # 5 mins (Safe buffer > loop_interval)
         self.lock_name = "global_scheduler_lock"
 
-        # Deduplication Cache for Notifications
-        self.dedupe_cache = {}
+        # Sharding (SCHEDULER_SHARDS > 0): personas are hashed into N shards
+        # leased per instance instead of one global lock; 0 = single instance
+        self.num_shards = int(os.getenv("SCHEDULER_SHARDS", "0"))
+        self.shard_leases = None
+        if self.num_shards > 0:
+            self.shard_leases = ShardLeaseManager(
+                SessionLocal,
+                self.lock_id,
+                self.num_shards,
+                lease_ttl=int(os.getenv("SCHEDULER_LEASE_TTL", str(self.lock_ttl))),
+            )
+        self._force_refresh = False  # Shard set changed -> reload personas now
+
+        # Deduplication Cache for Notifications {(persona_id, token, direction): ts}
+        self.dedupe_cache = TTLStore("notify", NOTIFY_WINDOW, DEDUPE_MAX_ENTRIES, dedupe_redis)
 
         # Coherence Guard (Global Trend State)
-        # Key: "Token" -> Value: { 'direction': 'long', 'ts': datetime, 'conf': 0.8 }
+        # Key: token -> Value: (direction, ts)
 
         # Used to reject conflicting signals (Long -> Short) if they happen too fast (Chop protection)
-        self.token_coherence = {}
+        self.token_coherence = TTLStore("coherence", COHERENCE_WINDOW, DEDUPE_MAX_ENTRIES, dedupe_redis)
         
         # [NEW] Executor for Parallel Execution
         # We limit to 5 workers to prevent DB connection exhaustion if pooling set to 20
         self.max_workers = 5
 
+        # Execution mode: "thread" (default) | "process" (CPU-bound indicator math
+        # across cores; market data is still fetched here, in the parent)
+        self.execution_mode = os.getenv("SCHEDULER_EXECUTION_MODE", "thread").lower()
+        self.process_workers = int(os.getenv("SCHEDULER_PROCESS_WORKERS", "0")) or os.cpu_count() or 2
+        self._process_pool = None
+
+        # Async engine (run_async): task, its loop and the stop signal
+        self._task = None
+        self._loop = None
+        self._stop_event = None
+
     def acquire_lock(self, db: Session) -> bool:
         """Intenta adquirir o renovar el lock de base de datos."""
         from models_db import SchedulerLock
@@ -202,7 +205,78 @@ class StrategyScheduler:
         print(f"🔒 Lock held by other instance ({lock.owner_id}). Retrying...")
         return False
         
-    def _execute_strategy_task(self, persona):
+    def _snapshot_groups(self, personas):
+        """
+        Agrupa lo que piden las personas en batches {(timeframe, lookback): [tokens]}:
+        cada (token, timeframe) distinto una sola vez, con el lookback máximo.
+        """
+        needs = {}  # {(timeframe, token): max lookback}
+        for p in personas:
+            strategy = self.registry.get(p["strategy_id"])
+            lookback = getattr(strategy, "lookback", None)
+            if not lookback:
+                continue
+            for token in p["tokens"]:
+                key = (p["timeframe"], token)
+                needs[key] = max(needs.get(key, 0), lookback)
+
+        groups = {}  # {(timeframe, lookback): [tokens]} -> one batch each
+        for (timeframe, token), lookback in needs.items():
+            groups.setdefault((timeframe, lookback), []).append(token)
+        return needs, groups
+
+    @staticmethod
+    def _min_last_open(timeframe: str, now_ts: float) -> int:
+        # Windows cached before the latest close lack the candle that just
+        # closed: require the current (forming) candle to be present.
+        current_open = last_candle_close(now_ts, timeframe)
+        return int(current_open * 1000) if current_open is not None else 0
+
+    def _build_market_snapshot(self, personas):
+        """
+        Descarga una sola vez por ciclo las velas de cada (token, timeframe)
+        distinto, con el lookback máximo que pide cualquier persona.
+        Retorna {timeframe: {token: CandleArray}}; los tokens que fallan no
+        aparecen y su estrategia cae a su propia descarga.
+        """
+        needs, groups = self._snapshot_groups(personas)
+
+        snapshot = {}
+        now_ts = time.time()
+        for (timeframe, lookback), tokens in groups.items():
+            try:
+                snapshot.setdefault(timeframe, {}).update(
+                    get_ohlcv_batch_sync(
+                        tokens,
+                        timeframe,
+                        limit=lookback,
+                        min_last_open=self._min_last_open(timeframe, now_ts),
+                    )
+                )
+            except Exception as e:
+                print(f"  ⚠️  Snapshot fetch failed for {timeframe} ({len(tokens)} tokens): {e}")
+
+        fetched = sum(len(v) for v in snapshot.values())
+        print(f"  📦 Market snapshot: {fetched}/{len(needs)} (token, timeframe) pairs")
+        return snapshot
+
+    def _strategy_context(self, strategy, persona, snapshot):
+        """
+        Cycle snapshot -> context channel, trimmed to this strategy's lookback
+        (zero-copy views) so indicators see exactly the window they asked for.
+        """
+        lookback = getattr(strategy, "lookback", None)
+        frames = (snapshot or {}).get(persona["timeframe"], {})
+        if not (lookback and frames):
+            return None
+        data = {
+            token: frames[token].tail(lookback)
+            for token in persona["tokens"]
+            if token in frames
+        }
+        return {"data": data}
+
+    def _execute_strategy_task(self, persona, snapshot=None):
         """
         Worker function to execute a single strategy instance.
         Returns generated signals or empty list.
@@ -215,144 +289,609 @@ class StrategyScheduler:
             # print(f"  ⚠️  Strategy class '{strategy_id}' not found!")
             return []
 
+        context = self._strategy_context(strategy, persona, snapshot)
+
         try:
             # print(f"   [Worker] Running {persona['name']}...")
             # Each strategy instance inside generate_signals acts locally
             signals = strategy.generate_signals(
-                tokens=persona["tokens"], timeframe=persona["timeframe"]
+                tokens=persona["tokens"], timeframe=persona["timeframe"], context=context
             )
             return signals
         except Exception as e:
             print(f"  ❌ Error executing {persona['name']} in worker: {e}")
             return []
 
+    # === Scheduling ===
+
+    def _next_due(self, persona, last_run, now: float) -> float:
+        """
+        Próxima ejecución alineada al cierre de vela del timeframe (+ settle):
+        el primer cierre a `interval_seconds` o más del cierre ya procesado.
+        Con interval < timeframe se ejecuta una vez por vela, justo al cerrar;
+        re-ejecutar a mitad de vela no aporta nada (se evalúa la última cerrada).
+        Sin ejecución previa -> ya. Timeframes sin periodo fijo -> intervalo.
+        """
+        if last_run is None:
+            return now
+        interval = max(persona["interval_seconds"], MIN_INTERVAL_SECONDS)
+        last_ts = last_run.replace(tzinfo=timezone.utc).timestamp()
+
+        timeframe = persona["timeframe"]
+        processed_close = last_candle_close(last_ts - CANDLE_SETTLE_SECONDS, timeframe)
+        if processed_close is None:
+            return max(now, last_ts + interval)
+        due_close = next_candle_close(processed_close + interval, timeframe)
+        return max(now, due_close + CANDLE_SETTLE_SECONDS)
+
+    def _sync_schedule(self, personas, now: float):
+        """
+        Alinea la cola con las personas activas: altas se programan a partir
+        de su last_execution persistido, bajas salen de la cola y un cambio de
+        intervalo/timeframe reprograma.
+        """
+        current = {p["id"]: p for p in personas}
+        for p_id in self.personas:
+            if p_id not in current:
+                self.schedule.discard(p_id)
+
+        for p_id, p in current.items():
+            prev = self.personas.get(p_id)
+            changed = prev is None or (
+                prev["interval_seconds"] != p["interval_seconds"]
+                or prev["timeframe"] != p["timeframe"]
+            )
+            if changed or p_id not in self.schedule:
+                last_run = self.last_run.get(p_id) or p.get("last_execution")
+                self.schedule.schedule(p_id, self._next_due(p, last_run, now))
+        self.personas = current
+
+    def _pop_due_personas(self, now: float):
+        # A shard lost since the last refresh drops its personas here
+        return [
+            self.personas[p_id]
+            for p_id in self.schedule.pop_due(now)
+            if p_id in self.personas and self._owns(self.personas[p_id])
+        ]
+
+    def _persist_last_execution(self, personas, ran_at: datetime):
+        """Guarda last_execution de las personas ejecutadas (un solo UPDATE)."""
+        ids = [p["config_id"] for p in personas if p.get("config_id")]
+        if not ids:
+            return
+        db = SessionLocal()
+        try:
+            db.query(StrategyConfig).filter(StrategyConfig.id.in_(ids)).update(
+                {
+                    StrategyConfig.last_execution: ran_at,
+                    # Keep updated_at: a run is not a config change
+                    StrategyConfig.updated_at: StrategyConfig.updated_at,
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"  ⚠️  Failed to persist last_execution: {e}")
+        finally:
+            db.close()
+
+    # === Execution ===
+
+    def _evaluate_personas(self, personas, snapshot):
+        """Ejecuta las estrategias en paralelo -> {persona_id: [signals]}."""
+        if self.execution_mode == "process":
+            return self._evaluate_in_processes(personas, snapshot)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Submit all tasks
+            future_to_persona = {
+                executor.submit(self._execute_strategy_task, p, snapshot): p 
+                for p in personas
+            }
+            return self._collect_signals(future_to_persona)
+
+    def _evaluate_in_processes(self, personas, snapshot):
+        """
+        Modo proceso: el padre arma el contexto de cada persona (las vistas
+        CandleArray se picklan como buffers NumPy) y los workers solo evalúan.
+        """
+        if self._process_pool is None:
+            print(f"  ⚙️  Starting process pool ({self.process_workers} workers)")
+            self._process_pool = create_pool(self.process_workers)
+
+        future_to_persona = {}
+        for p in personas:
+            strategy = self.registry.get(p["strategy_id"])
+            if not strategy:
+                continue
+            context = self._strategy_context(strategy, p, snapshot)
+            future = self._process_pool.submit(
+                run_strategy, p["strategy_id"], p["tokens"], p["timeframe"], context
+            )
+            future_to_persona[future] = p
+        return self._collect_signals(future_to_persona)
+
+    def _collect_signals(self, future_to_persona):
+        all_signals_map = {}
+        for future in concurrent.futures.as_completed(future_to_persona):
+            p = future_to_persona[future]
+            try:
+                signals = future.result()
+                if signals:
+                    all_signals_map[p["id"]] = signals
+            except BrokenProcessPool as exc:
+                print(f"  ❌ {p['name']}: process pool broken ({exc}). Restarting it next cycle.")
+                self._shutdown_process_pool()
+            except Exception as exc:
+                print(f"  ❌ {p['name']} generated an exception: {exc}")
+        return all_signals_map
+
+    def _shutdown_process_pool(self):
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+    @staticmethod
+    def _execution_fingerprint(persona):
+        """Personas con la misma huella calculan exactamente las mismas señales."""
+        return (
+            persona["strategy_id"],
+            tuple(persona["tokens"]),
+            persona["timeframe"],
+            persona.get("config_json") or "",
+        )
+
+    def _group_by_fingerprint(self, personas):
+        """{fingerprint: [personas]}; el primero de cada grupo es quien se ejecuta."""
+        groups = {}
+        for p in personas:
+            groups.setdefault(self._execution_fingerprint(p), []).append(p)
+        if len(groups) < len(personas):
+            print(f"  🧬 {len(groups)} unique configurations for {len(personas)} personas")
+        return groups
+
+    @staticmethod
+    def _fan_out(groups, signals_map):
+        """Reparte las señales de cada configuración a todas sus personas (copias propias)."""
+        all_signals_map = {}
+        for members in groups.values():
+            signals = signals_map.get(members[0]["id"])
+            if not signals:
+                continue
+            all_signals_map[members[0]["id"]] = signals
+            for p in members[1:]:
+                # Each copy gets its persona's source/owner in _prepare_signal
+                all_signals_map[p["id"]] = [sig.model_copy() for sig in signals]
+        return all_signals_map
+
+    def _run_cycle(self, personas, now: datetime):
+        """Ejecuta un lote de personas vencidas: snapshot, estrategias, señales."""
+        # 1. One execution per distinct configuration (seeded clones share one)
+        groups = self._group_by_fingerprint(personas)
+        unique = [members[0] for members in groups.values()]
+
+        # 2. Shared Market Snapshot (one fetch per unique token/timeframe)
+        snapshot = self._build_market_snapshot(unique)
+
+        # 3. Parallel Execution, fanned out to every persona of each configuration
+        all_signals_map = self._fan_out(
+            groups, self._evaluate_personas(unique, snapshot)
+        )  # {persona_id: [signals]}
+
+        self._process_signals(personas, all_signals_map, now)
+        self._finish_cycle(personas, now)
+
+    def _process_signals(self, personas, all_signals_map, now: datetime):
+        """Dedupe + coherencia y log/notificación, en orden (estado compartido)."""
+        # 4. Sequential Processing (Dedupe, Notify, DB Log)
+        # Ensure shared state is updated safely in Main Thread
+        accepted = []  # [(signal, persona)] that passed the in-memory checks
+        for p in personas:
+            p_id = p["id"]
+            signals = all_signals_map.get(p_id, [])
+            
+            # Update heartbeat for stats potentially
+            self.last_run[p_id] = now
+            
+            if not signals:
+                continue
+                
+            for sig in signals:
+                # 1. Deduplication (Optimized)
+                # REMOVED: Inefficient DB query per signal.
+                # We rely on 'log_signal' triggering IntegrityError via UniqueConstraint/IdempotencyKey.
+                # This avoids opening N connections per cycle.
+
+                # 2. In-Memory Deduplication (same candle re-emitted)
+                sig_ts = sig.timestamp.timestamp()
+                if self.processed_signals.get((p_id, sig.token, sig.direction, sig_ts)):
+                    continue
+
+                # 3. Same-Side Spam check
+                last = self.last_signal_direction.get((p_id, sig.token))
+                if last and last[0] == sig.direction and sig_ts - last[1] < SPAM_WINDOW:
+                    continue
+
+                # 4. Global Coherence
+                last_state = self.token_coherence.get(sig.token)
+                now_ts = time.time()
+
+                if last_state:
+                    last_global_dir, last_global_ts = last_state
+                    if last_global_dir != sig.direction:
+                        if now_ts - last_global_ts < COHERENCE_WINDOW:
+                            continue
+
+                # Updates Shared State
+                self.token_coherence[sig.token] = (sig.direction, now_ts)
+                self.processed_signals[(p_id, sig.token, sig.direction, sig_ts)] = True
+                self.last_signal_direction[(p_id, sig.token)] = (sig.direction, sig_ts)
+                accepted.append((sig, p))
+
+        # 5. One transaction for the whole cycle, notify only fresh inserts
+        self.process_signal_batch(accepted)
+
+
+    def dedupe_stats(self):
+        """Tamaño, memoria aproximada y hit-rate de cada store de dedupe."""
+        return {
+            store.name: store.stats()
+            for store in (
+                self.processed_signals,
+                self.last_signal_direction,
+                self.token_coherence,
+                self.dedupe_cache,
+            )
+            if isinstance(store, TTLStore)
+        }
+
+    def _finish_cycle(self, personas, now: datetime):
+        """Next run + persisted last_execution (survives restarts)."""
+        now_ts = time.time()
+        for p in personas:
+            self.schedule.schedule(p["id"], self._next_due(p, now, now_ts))
+        self._persist_last_execution(personas, now)
+
+    def _check_lock(self) -> float:
+        """Gestión de lock: 0 si lo tenemos, si no segundos a esperar."""
+        if self.shard_leases is not None:
+            return self._check_shard_leases()
+        db = SessionLocal()
+        try:
+            if not self.acquire_lock(db):
+                print("⏳ Waiting for lock...")
+                return 10
+            return 0
+        except Exception as e:
+            print(f"⚠️ Lock Error: {e}")
+            return 5
+        finally:
+            db.close()
+
+    def _check_shard_leases(self) -> float:
+        """Modo shards: renueva/reclama leases; espera si no tenemos ninguno."""
+        before = self.shard_leases.owned
+        try:
+            owned = self.shard_leases.heartbeat()
+        except Exception as e:
+            print(f"⚠️ Lock Error: {e}")
+            return 5
+        if owned != before:
+            self._force_refresh = True
+        if not owned:
+            print("⏳ Waiting for a shard...")
+            return 10
+        return 0
+
+    def _owns(self, persona) -> bool:
+        return self.shard_leases is None or self.shard_leases.owns(persona["id"])
+
+    def _release_leases(self):
+        if self.shard_leases is not None:
+            self.shard_leases.release_all()
+
+    def _refresh_personas(self, now_ts: float):
+        self._force_refresh = False
+        personas = [p for p in get_active_strategies_from_db() if self._owns(p)]
+        self._sync_schedule(personas, now_ts)
+
+    def _evaluate_pnl(self):
+        # Sharded: a single instance (owner of shard 0) evaluates PnL
+        if self.shard_leases is not None and 0 not in self.shard_leases.owned:
+            return
+        try:
+            eval_db = SessionLocal()
+            try:
+                new_evals = evaluate_pending_signals(eval_db)
+                if new_evals > 0:
+                    print(f"  ✅ Evaluated {new_evals} signals")
+            finally:
+                eval_db.close()
+        except Exception as e:
+            print(f"  ❌ Eval Error: {e}")
+
+    def _log_iteration(self, iteration: int, due, now: datetime):
+        ba_time = now - timedelta(hours=3)
+        print(
+            f"\n[{ba_time.strftime('%H:%M:%S')}] Iteration #{iteration}"
+            f" - {len(due)}/{len(self.personas)} personas due"
+        )
+
     def run(self):
-        """Loop principal."""
-        import concurrent.futures
-        
+        """
+        Loop principal.
+
+        Duerme hasta el próximo vencimiento de la cola (o hasta el refresco
+        de personas cada `loop_interval`) y ejecuta solo las personas vencidas.
+        """
         iteration = 0
+        next_refresh = 0.0
+        next_eval = 0.0
         try:
             while True:
                 # 0. Gestion de Lock
-                db = SessionLocal()
-                try:
-                    if not self.acquire_lock(db):
-                        print("⏳ Waiting for lock...")
-                        time.sleep(10)
-                        continue
-                except Exception as e:
-                    print(f"⚠️ Lock Error: {e}")
-                    time.sleep(5)
+                wait = self._check_lock()
+                if wait:
+                    time.sleep(wait)
                     continue
-                finally:
-                    db.close()
-
-                iteration += 1
-                now = datetime.utcnow()
-                ba_time = now - timedelta(hours=3)
-                print(f"\n[{ba_time.strftime('%H:%M:%S')}] Iteration #{iteration}")
-
-                # 1. Obtener Personas Activas (DB)
-                personas = get_active_strategies_from_db()
-                print(f"  ℹ️  Active Personas: {len(personas)}")
-                
-                # 2. Parallel Execution
-                all_signals_map = {} # {persona_id: [signals]}
-                
-                with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                    # Submit all tasks
-                    future_to_persona = {
-                        executor.submit(self._execute_strategy_task, p): p 
-                        for p in personas
-                    }
-                    
-                    for future in concurrent.futures.as_completed(future_to_persona):
-                        p = future_to_persona[future]
-                        try:
-                            signals = future.result()
-                            if signals:
-                                all_signals_map[p["id"]] = signals
-                        except Exception as exc:
-                            print(f"  ❌ {p['name']} generated an exception: {exc}")
-
-                # 3. Sequential Processing (Dedupe, Notify, DB Log)
-                # Ensure shared state is updated safely in Main Thread
-                for p in personas:
-                    p_id = p["id"]
-                    signals = all_signals_map.get(p_id, [])
-                    
-                    # Update heartbeat for stats potentially
-                    self.last_run[p_id] = now
-                    
-                    if not signals:
-                        continue
-                        
-                    for sig in signals:
-                        # 1. Deduplication (Optimized)
-                        # REMOVED: Inefficient DB query per signal.
-                        # We rely on 'log_signal' triggering IntegrityError via UniqueConstraint/IdempotencyKey.
-                        # This avoids opening N connections per cycle.
-
-                        # 2. In-Memory Deduplication
-                        ts_key = f"{p_id}_{sig.token}_{sig.direction}_{sig.timestamp}"
-                        last_ts = self.processed_signals.get(ts_key)
-                        if last_ts and sig.timestamp <= last_ts:
-                            continue
 
-                        # 3. Same-Side Spam check
-                        direction_key = f"{p_id}_{sig.token}"
-                        last_dir = self.last_signal_direction.get(direction_key)
-                        if last_dir == sig.direction:
-                            if last_ts and (sig.timestamp - last_ts).total_seconds() < 60:
-                                continue
-
-                        # 4. Global Coherence
-                        coherence_key = sig.token
-                        last_state = self.token_coherence.get(coherence_key)
-                        now_utc = datetime.utcnow()
-
-                        if last_state:
-                            last_global_dir = last_state["direction"]
-                            last_global_ts = last_state["ts"]
-                            if last_global_dir != sig.direction:
-                                if (now_utc - last_global_ts) < timedelta(minutes=30):
-                                    continue
-
-                        # Updates Shared State
-                        self.token_coherence[coherence_key] = {"direction": sig.direction, "ts": now_utc}
-                        # Process Signal
-                        self.process_single_signal(sig, p)
-
-                # 4. Evaluador PnL
-                try:
-                    eval_db = SessionLocal()
+                # 1. Obtener Personas Activas (DB), refrescadas cada loop_interval
+                now_ts = time.time()
+                if now_ts >= next_refresh or self._force_refresh or persona_catalog.dirty:
+                    self._refresh_personas(now_ts)
+                    next_refresh = now_ts + self.loop_interval
+
+                due = self._pop_due_personas(now_ts)
+                if due:
+                    iteration += 1
+                    now = datetime.utcnow()
+                    self._log_iteration(iteration, due, now)
                     try:
-                        new_evals = evaluate_pending_signals(eval_db)
-                        if new_evals > 0:
-                            print(f"  ✅ Evaluated {new_evals} signals")
-                    finally:
-                        eval_db.close()
-                except Exception as e:
-                    print(f"  ❌ Eval Error: {e}")
-
-                print(f"  😴 Sleeping {self.loop_interval}s...")
-                time.sleep(self.loop_interval)
+                        self._run_cycle(due, now)
+                    except Exception as e:
+                        # Keep the loop alive; the batch is retried on the next wake
+                        print(f"  ❌ Cycle Error: {e}")
+                        for p in due:
+                            self.schedule.schedule(p["id"], time.time() + self.loop_interval)
+
+                # 5. Evaluador PnL
+                if time.time() >= next_eval:
+                    next_eval = time.time() + self.loop_interval
+                    self._evaluate_pnl()
+
+                wake_at = min(next_refresh, next_eval, self.schedule.next_due() or next_refresh)
+                sleep_s = max(0.05, wake_at - time.time())
+                if due:
+                    print(f"  😴 Sleeping {sleep_s:.0f}s...")
+                time.sleep(sleep_s)
 
         except KeyboardInterrupt:
             print("\n🛑 Stopped.")
+        finally:
+            self._shutdown_process_pool()
+            close_batch_loop()
+            self._release_leases()
+
+    # === Async Engine ===
+    # Mismo loop sobre asyncio: velas con ccxt async (un cliente por exchange,
+    # semáforos por venue), estrategias y DB en hilos acotados por semáforo y
+    # esperas cancelables. Corre en el event loop de FastAPI (`start_async`) o
+    # en uno propio (`asyncio.run(scheduler_instance.run_async())`).
+
+    async def _build_market_snapshot_async(self, personas):
+        """`_build_market_snapshot` con los batches descargándose en paralelo."""
+        needs, groups = self._snapshot_groups(personas)
+        now_ts = time.time()
+        batches = list(groups.items())
+        results = await asyncio.gather(
+            *(
+                get_ohlcv_batch(
+                    tokens,
+                    timeframe,
+                    limit=lookback,
+                    min_last_open=self._min_last_open(timeframe, now_ts),
+                )
+                for (timeframe, lookback), tokens in batches
+            ),
+            return_exceptions=True,
+        )
 
-    def process_single_signal(self, sig, p):
+        snapshot = {}
+        for ((timeframe, _), tokens), result in zip(batches, results):
+            if isinstance(result, BaseException):
+                if isinstance(result, asyncio.CancelledError):
+                    raise result
+                print(f"  ⚠️  Snapshot fetch failed for {timeframe} ({len(tokens)} tokens): {result}")
+                continue
+            snapshot.setdefault(timeframe, {}).update(result)
+
+        fetched = sum(len(v) for v in snapshot.values())
+        print(f"  📦 Market snapshot: {fetched}/{len(needs)} (token, timeframe) pairs")
+        return snapshot
+
+    async def _evaluate_personas_async(self, personas, snapshot):
         """
-        Public method for testing.
-        Handles Canonical Dedupe log -> If inserted -> Notify.
+        Estrategias fuera del event loop: en hilos (como máximo `max_workers`
+        a la vez) o en el pool de procesos en modo "process".
         """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        if self.execution_mode == "process" and self._process_pool is None:
+            print(f"  ⚙️  Starting process pool ({self.process_workers} workers)")
+            self._process_pool = create_pool(self.process_workers)
+
+        async def evaluate(p):
+            async with semaphore:
+                if self.execution_mode != "process":
+                    return await asyncio.to_thread(self._execute_strategy_task, p, snapshot)
+                strategy = self.registry.get(p["strategy_id"])
+                if not strategy:
+                    return []
+                context = self._strategy_context(strategy, p, snapshot)
+                return await loop.run_in_executor(
+                    self._process_pool,
+                    run_strategy, p["strategy_id"], p["tokens"], p["timeframe"], context,
+                )
+
+        results = await asyncio.gather(*(evaluate(p) for p in personas), return_exceptions=True)
+
+        all_signals_map = {}
+        for p, result in zip(personas, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, BrokenProcessPool):
+                print(f"  ❌ {p['name']}: process pool broken ({result}). Restarting it next cycle.")
+                self._shutdown_process_pool()
+            elif isinstance(result, BaseException):
+                print(f"  ❌ {p['name']} generated an exception: {result}")
+            elif result:
+                all_signals_map[p["id"]] = result
+        return all_signals_map
+
+    async def _run_cycle_async(self, personas, now: datetime):
+        """`_run_cycle` sin bloquear el event loop."""
+        groups = self._group_by_fingerprint(personas)
+        unique = [members[0] for members in groups.values()]
+        snapshot = await self._build_market_snapshot_async(unique)
+        all_signals_map = self._fan_out(
+            groups, await self._evaluate_personas_async(unique, snapshot)
+        )
+        # Dedupe state is only touched by this task; DB/Telegram run off-loop
+        await asyncio.to_thread(self._process_signals, personas, all_signals_map, now)
+        await asyncio.to_thread(self._finish_cycle, personas, now)
+
+    async def _wait_stop(self, timeout: float) -> bool:
+        """Espera no bloqueante; True si se pidió parar."""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._stop_event.is_set()
+
+    async def run_async(self, stop_event: "asyncio.Event" = None):
+        """
+        Equivalente async de `run()`. Termina al pedir `stop_async()` /
+        `request_stop()` (tras el ciclo en curso) o al cancelar la tarea.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = stop_event or asyncio.Event()
+        iteration = 0
+        next_refresh = 0.0
+        next_eval = 0.0
+        try:
+            while not self._stop_event.is_set():
+                wait = await asyncio.to_thread(self._check_lock)
+                if wait:
+                    await self._wait_stop(wait)
+                    continue
+
+                now_ts = time.time()
+                if now_ts >= next_refresh or self._force_refresh or persona_catalog.dirty:
+                    await asyncio.to_thread(self._refresh_personas, now_ts)
+                    next_refresh = now_ts + self.loop_interval
+
+                due = self._pop_due_personas(now_ts)
+                if due:
+                    iteration += 1
+                    now = datetime.utcnow()
+                    self._log_iteration(iteration, due, now)
+                    try:
+                        await self._run_cycle_async(due, now)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        # Keep the loop alive; the batch is retried on the next wake
+                        print(f"  ❌ Cycle Error: {e}")
+                        for p in due:
+                            self.schedule.schedule(p["id"], time.time() + self.loop_interval)
+
+                if time.time() >= next_eval:
+                    next_eval = time.time() + self.loop_interval
+                    await asyncio.to_thread(self._evaluate_pnl)
+
+                wake_at = min(next_refresh, next_eval, self.schedule.next_due() or next_refresh)
+                sleep_s = max(0.05, wake_at - time.time())
+                if due:
+                    print(f"  😴 Sleeping {sleep_s:.0f}s...")
+                await self._wait_stop(sleep_s)
+        except asyncio.CancelledError:
+            print("🛑 [SCHEDULER] Async engine cancelled.")
+            raise
+        finally:
+            self._shutdown_process_pool()
+            await asyncio.to_thread(self._release_leases)
+            await async_exchange_pool.close_loop()
+            print("🛑 [SCHEDULER] Async engine stopped.")
+
+    def start_async(self) -> "asyncio.Task":
+        """Lanza `run_async` como tarea del event loop actual (startup de FastAPI)."""
+        if self._task is None or self._task.done():
+            # Created here so a stop requested before the task first runs is seen
+            self._stop_event = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(
+                self.run_async(self._stop_event), name="strategy-scheduler"
+            )
+        return self._task
+
+    async def stop_async(self, timeout: float = 30.0):
+        """
+        Parada ordenada: deja terminar el ciclo en curso hasta `timeout`
+        segundos y luego cancela la tarea.
+        """
+        task, self._task = self._task, None
+        if task is None or task.done():
+            return
+        if self._stop_event is not None:
+            self._stop_event.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def request_stop(self):
+        """Pide parar el motor async desde cualquier hilo."""
+        if self._loop is not None and self._stop_event is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+    def _prepare_signal(self, sig, p):
         # Metadata
         sig.source = f"Marketplace:{p['id']}"
         sig.strategy_id = p['id']
         sig.is_saved = 1
         sig.user_id = p.get("user_id")
 
-        now = datetime.utcnow()
+    def process_signal_batch(self, items):
+        """
+        Persiste las señales aceptadas de un ciclo en un solo INSERT
+        (ON CONFLICT DO NOTHING) y notifica solo las recién insertadas.
+        """
+        if not items:
+            return
+        for sig, p in items:
+            self._prepare_signal(sig, p)
+        try:
+            saved_ids = log_signals([sig for sig, _ in items])
+        except Exception as e:
+            print(f"    ❌ Failed to log signals: {e}")
+            return
+
+        for (sig, p), saved_id in zip(items, saved_ids):
+            if saved_id:
+                print(f"  ✅ Logged Signal: {sig.token} {sig.direction} ({p['name']})")
+                self._notify_signal(sig, p)
+
+    def process_single_signal(self, sig, p):
+        """
+        Public method for testing.
+        Handles Canonical Dedupe log -> If inserted -> Notify.
+        """
+        self._prepare_signal(sig, p)
 
         # Log DB (Canonical Dedupe)
         try:
@@ -366,13 +905,18 @@ class StrategyScheduler:
             print(f"    ❌ Failed to log signal: {e}")
             return
 
+        self._notify_signal(sig, p)
+
+    def _notify_signal(self, sig, p):
+        """Telegram de una señal recién insertada (dedupe de notificaciones)."""
         # Notification (Only if inserted)
-        dedupe_key = f"{p['id']}_{sig.token}_{sig.direction}"
+        dedupe_key = (p["id"], sig.token, sig.direction)
+        now_ts = time.time()
         last_notif = self.dedupe_cache.get(dedupe_key)
-        if last_notif and (now - last_notif < timedelta(minutes=45)):
+        if last_notif and now_ts - last_notif < NOTIFY_WINDOW:
             return
 
-        self.dedupe_cache[dedupe_key] = now
+        self.dedupe_cache[dedupe_key] = now_ts
 
         try:
             icon = "🟢" if sig.direction == "long" else "🔴"
@@ -385,7 +929,8 @@ class StrategyScheduler:
             )
             chat_id = p.get("telegram_chat_id")
             if chat_id:
-                send_telegram(msg, chat_id=chat_id)
+                # Queued: the cycle never waits on Telegram
+                notification_dispatcher.submit("telegram", send_telegram, msg, chat_id=chat_id)
         except Exception as notif_err:
             print(f"    ⚠️ Notification failed: {notif_err}")
 
@@ -394,5 +939,11 @@ class StrategyScheduler:
 scheduler_instance = StrategyScheduler(loop_interval=60)
 
 if __name__ == "__main__":
-    scheduler_instance.run()
+    if SCHEDULER_ENGINE == "thread":
+        scheduler_instance.run()
+    else:
+        try:
+            asyncio.run(scheduler_instance.run_async())
+        except KeyboardInterrupt:
+            print("\n🛑 Stopped.")
 
@@ -193,6 +193,7 @@ def generate_signals(db: Session):
                 exit_price=round(exit_price, 4),
             )
             db.add(eval_obj)
+            sig.status = "CLOSED"
         else:
             # Open signal!
             # Ensure Dashboard sees it as "Active"
@@ -3,6 +3,7 @@ import pandas_ta as ta
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from .base import Strategy, StrategyMetadata
+from core.candles import candles_to_frame
 from core.schemas import Signal
 from indicators.market import get_market_data
 
@@ -28,6 +29,9 @@ class DonchianBreakoutV2(Strategy):
         self.atr_ma_period = self.config.get("atr_ma_period", 20)
         self.ema_trend_period = self.config.get("ema_trend_period", 200)
 
+        # Need enough for EMA200 + buffer
+        self.lookback = self.ema_trend_period + 50
+
     def metadata(self) -> StrategyMetadata:
         return StrategyMetadata(
             id="donchian_v2",
@@ -58,11 +62,13 @@ class DonchianBreakoutV2(Strategy):
 
         for token in tokens:
             try:
-                # 1. Get Data (need enough for EMA200 + buffer)
-                required_candles = self.ema_trend_period + 50
-                df, market = get_market_data(
-                    token.lower(), timeframe, limit=required_candles
-                )
+                # 1. Get Data (cycle snapshot from the scheduler, else API)
+                if context and "data" in context and token in context["data"]:
+                    df = candles_to_frame(context["data"][token])
+                else:
+                    df, market = get_market_data(
+                        token.lower(), timeframe, limit=self.lookback
+                    )
 
                 # [FIX] Ensure Timestamp Index
                 if df is not None and not df.empty and "timestamp" in df.columns:
@@ -9,7 +9,8 @@ import pandas as pd
 
 from .base import Strategy, StrategyMetadata
 from core.schemas import Signal
-from core.market_data_api import get_ohlcv_data
+from core.market_data_api import get_ohlcv_arrays
+from core.candles import CandleArray
 
 
 class HyperScalpStrategy(Strategy):
@@ -25,6 +26,8 @@ class HyperScalpStrategy(Strategy):
     - Exit: Mean Reversion (Mid Band) or Fixed TP 0.8%
     """
 
+    lookback = 100
+
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         self.config = config or {}
         # Hyperparameters (Tuned for Activity)
@@ -186,18 +189,18 @@ class HyperScalpStrategy(Strategy):
             try:
                 if context and "data" in context and token in context["data"]:
                     raw = context["data"][token]
-                    df = pd.DataFrame(
-                        raw,
-                        columns=["timestamp", "open", "high", "low", "close", "volume"],
-                    )
+                    if isinstance(raw, CandleArray):
+                        df = raw.to_dataframe()
+                    else:
+                        df = pd.DataFrame(
+                            raw,
+                            columns=["timestamp", "open", "high", "low", "close", "volume"],
+                        )
                 else:
-                    raw = get_ohlcv_data(token, timeframe, limit=100)
+                    raw = get_ohlcv_arrays(token, timeframe, limit=self.lookback)
                     if not raw:
                         continue
-                    df = pd.DataFrame(
-                        raw,
-                        columns=["timestamp", "open", "high", "low", "close", "volume"],
-                    )
+                    df = raw.to_dataframe()
 
                 if "timestamp" in df.columns:
                     df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
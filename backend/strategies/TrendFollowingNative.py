@@ -10,7 +10,8 @@ import pandas as pd
 
 from .base import Strategy, StrategyMetadata
 from core.schemas import Signal
-from core.market_data_api import get_ohlcv_data
+from core.market_data_api import get_ohlcv_arrays
+from core.candles import CandleArray
 
 
 class TrendFollowingNative(Strategy):
@@ -22,6 +23,8 @@ class TrendFollowingNative(Strategy):
     - Exit: ATR-based dynamic SL/TP
     """
 
+    lookback = 300
+
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         self.config = config or {}
         # Hyperparameters (Defaults matching original)
@@ -184,18 +187,18 @@ class TrendFollowingNative(Strategy):
             try:
                 if context and "data" in context and token in context["data"]:
                     raw = context["data"][token]
-                    df = pd.DataFrame(
-                        raw,
-                        columns=["timestamp", "open", "high", "low", "close", "volume"],
-                    )
+                    if isinstance(raw, CandleArray):
+                        df = raw.to_dataframe()
+                    else:
+                        df = pd.DataFrame(
+                            raw,
+                            columns=["timestamp", "open", "high", "low", "close", "volume"],
+                        )
                 else:
-                    raw = get_ohlcv_data(token, timeframe, limit=300)
+                    raw = get_ohlcv_arrays(token, timeframe, limit=self.lookback)
                     if not raw:
                         continue
-                    df = pd.DataFrame(
-                        raw,
-                        columns=["timestamp", "open", "high", "low", "close", "volume"],
-                    )
+                    df = raw.to_dataframe()
 
                 if "timestamp" in df.columns:
                     df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
@@ -164,6 +164,11 @@ class Strategy(ABC):
         ```
     """
 
+    # Velas OHLCV que la estrategia necesita por token. El scheduler descarga
+    # una sola vez por ciclo el máximo por (token, timeframe) y se lo pasa en
+    # context={"data": {token: CandleArray}}. None = no consume velas.
+    lookback: Optional[int] = None
+
     @abstractmethod
     def metadata(self) -> StrategyMetadata:
         """
@@ -6,7 +6,8 @@ import numpy as np
 
 from .base import Strategy, StrategyMetadata
 from core.schemas import Signal
-from core.market_data_api import get_ohlcv_data
+from core.market_data_api import get_ohlcv_arrays
+from core.candles import candles_to_frame
 
 
 class MACrossStrategy(Strategy):
@@ -18,6 +19,8 @@ class MACrossStrategy(Strategy):
     - Death Cross (Rápida cruza hacia abajo Lenta) -> SHORT
     """
 
+    lookback = 200
+
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         self.config = config or {}
         self.fast_period = self.config.get("fast_period", 10)
@@ -159,18 +162,14 @@ class MACrossStrategy(Strategy):
                 # 1. Obtener datos
                 # Intentar sacar del context si existe (para backtesting inyectado)
                 if context and "data" in context and token in context["data"]:
-                    raw_data = context["data"][token]
-                    # Asumimos que raw_data es lista de dicts o DataFrame
-                    if isinstance(raw_data, list):
-                        df = pd.DataFrame(raw_data)
-                    else:
-                        df = raw_data
+                    # CandleArray, lista de dicts o DataFrame
+                    df = candles_to_frame(context["data"][token])
                 else:
-                    # Fetch de API
-                    ohlcv = get_ohlcv_data(token, timeframe, limit=200)
+                    # Fetch de API (columnar, sin dicts intermedios)
+                    ohlcv = get_ohlcv_arrays(token, timeframe, limit=self.lookback)
                     if not ohlcv:
                         continue
-                    df = pd.DataFrame(ohlcv)
+                    df = ohlcv.to_dataframe()
 
                 # Normalizar columnas
                 if "timestamp" in df.columns:
@@ -16,7 +16,8 @@ import numpy as np
 
 from .base import Strategy, StrategyMetadata
 from core.schemas import Signal
-from core.market_data_api import get_ohlcv_data
+from core.market_data_api import get_ohlcv_arrays
+from core.candles import candles_to_frame
 
 
 class SuperTrendFlowStrategy(Strategy):
@@ -27,6 +28,8 @@ class SuperTrendFlowStrategy(Strategy):
     la dirección de la tendencia. Es excelente para capturar grandes movimientos.
     """
 
+    lookback = 1000
+
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         self.config = config or {}
         self.atr_period = self.config.get("atr_period", 10)
@@ -234,17 +237,12 @@ class SuperTrendFlowStrategy(Strategy):
         for token in valid_tokens:
             try:
                 if context and "data" in context and token in context["data"]:
-                    raw_data = context["data"][token]
-                    df = (
-                        pd.DataFrame(raw_data)
-                        if isinstance(raw_data, list)
-                        else raw_data
-                    )
+                    df = candles_to_frame(context["data"][token])
                 else:
-                    ohlcv = get_ohlcv_data(token, timeframe, limit=1000)
+                    ohlcv = get_ohlcv_arrays(token, timeframe, limit=self.lookback)
                     if not ohlcv:
                         continue
-                    df = pd.DataFrame(ohlcv)
+                    df = ohlcv.to_dataframe()
 
                 if "timestamp" in df.columns:
                     df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
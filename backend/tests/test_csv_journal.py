@@ -0,0 +1,84 @@
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Ensure backend modules are importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.csv_journal import CSVJournal  # noqa: E402
+
+
+def test_csv_journal_batches_rows_and_rotates_by_size(tmp_path):
+    journal = CSVJournal(max_bytes=200)
+    headers = ["token", "price"]
+    path = tmp_path / "LITE" / "btc.csv"
+    for i in range(10):
+        assert journal.append(path, {"token": "BTC", "price": 100 + i}, headers)
+    assert journal.flush(timeout=5)
+
+    # One batch: written with a single header, under the size limit
+    assert path.read_text().splitlines() == ["token,price"] + [
+        f"BTC,{100 + i}" for i in range(10)
+    ]
+    assert journal.rotations == 0
+
+    path.write_text(path.read_text() + "x" * 200)  # Grow past max_bytes
+    journal.append(path, {"token": "BTC", "price": 1}, headers)
+    journal.close()
+
+    archived = list((tmp_path / "LITE" / "archive").glob("btc.*.csv"))
+    assert len(archived) == 1 and journal.rotations == 1
+    assert path.read_text().splitlines() == ["token,price", "BTC,1"]
+    assert journal.stats()["open_files"] == 0
+
+
+
+def test_flush_honours_its_timeout_when_the_queue_is_full():
+    journal = CSVJournal(max_queue=1)
+    release = threading.Event()
+    journal._thread = threading.Thread(target=release.wait)  # A stuck writer
+    journal._thread.start()
+    journal._queue.put(("stuck.csv", {}, []))
+    try:
+        assert journal.flush(timeout=0.1) is False
+    finally:
+        release.set()
+
+
+def test_rotated_open_signals_are_still_evaluated(tmp_path):
+    import evaluated_logger
+    from core.signal_logger import CSV_HEADERS
+
+    lite_dir = tmp_path / "LITE"
+    path = lite_dir / "btc.csv"
+    journal = CSVJournal(max_bytes=300)
+    old_ts = (datetime.utcnow() - timedelta(hours=3)).replace(microsecond=0).isoformat() + "Z"
+    new_ts = (datetime.utcnow() - timedelta(hours=1)).replace(microsecond=0).isoformat() + "Z"
+
+    def row(ts):
+        return {"timestamp": ts, "token": "BTC", "timeframe": "1h", "direction": "long",
+                "entry": 100, "tp": 105, "sl": 95, "confidence": 70,
+                "rationale": "r" * 400, "source": "LITE"}
+
+    journal.append(path, row(old_ts), CSV_HEADERS)
+    journal.flush(timeout=5)
+    journal.append(path, row(new_ts), CSV_HEADERS)  # Over max_bytes: rotates first
+    journal.close()
+    assert journal.rotations == 1
+    assert old_ts not in path.read_text()
+
+    def evaluate(row):
+        return {"signal_ts": row["timestamp"], "result": "hit-tp"}
+
+    with patch.object(evaluated_logger, "LITE_DIR", lite_dir), patch.object(
+        evaluated_logger, "EVAL_DIR", tmp_path / "EVALUATED"
+    ), patch.object(evaluated_logger, "_evaluate_signal_row", side_effect=evaluate), patch.object(
+        evaluated_logger, "_append_evaluations", return_value=2
+    ) as append, patch("builtins.print"):
+        assert evaluated_logger.evaluate_all_tokens() == (1, 2)
+
+    token, rows = append.call_args.args
+    assert token == "btc"
+    assert sorted(r["signal_ts"] for r in rows) == [old_ts, new_ts]
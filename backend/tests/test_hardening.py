@@ -7,7 +7,8 @@ from unittest.mock import patch
 # Ensure backend modules are importable
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from core.signal_logger import log_signal, LOGS_DIR, _snap_to_grid
+from core.signal_logger import csv_journal, log_signal, LOGS_DIR, _snap_to_grid
+from core.notification_dispatcher import notification_dispatcher
 from core.schemas import Signal
 from models_db import Signal as SignalDB, Base
 # from database import engine as real_engine
@@ -134,6 +135,7 @@ def test_signal_dedupe_db_first_and_no_csv_sideeffects(db_session, clean_logs):
         # 1. First Insert
         assert log_signal(sig) is True
         
+        csv_journal.flush(timeout=5)
         csv_path = LOGS_DIR / "TEST" / "test_token.csv"
         assert csv_path.exists()
         with open(csv_path) as f:
@@ -145,6 +147,7 @@ def test_signal_dedupe_db_first_and_no_csv_sideeffects(db_session, clean_logs):
         assert log_signal(sig) is False
         
         # Verify CSV unchanged
+        csv_journal.flush(timeout=5)
         with open(csv_path) as f:
             assert len(f.readlines()) == 2
         mock_push.assert_not_called()
@@ -202,12 +205,14 @@ def test_scheduler_process_signal_no_notify(db_session):
         
         # 1. First Call -> True -> Notify
         scheduler.process_single_signal(sig, persona)
+        notification_dispatcher.flush(timeout=5)
         mock_telegram.assert_called_once()
         print("\n   [Test] First call triggered notification (Correct)")
         
         # 2. Second Call (Duplicate) -> False -> No Notify
         mock_telegram.reset_mock()
         scheduler.process_single_signal(sig, persona)
+        notification_dispatcher.flush(timeout=5)
         mock_telegram.assert_not_called()
         print("   [Test] Second call ignored (Correct)")
 
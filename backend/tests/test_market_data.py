@@ -0,0 +1,679 @@
+import sys
+import os
+import time
+import pytest
+from unittest.mock import patch
+
+# Ensure backend modules are importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import market_data_api
+from core.candle_store import CandleStore
+from core.cache import approx_size, cache
+
+HOUR_MS = 3600 * 1000
+
+
+def _candles(start_ts: int, count: int, tf_ms: int = HOUR_MS, base: float = 100.0):
+    return [
+        [start_ts + i * tf_ms, base + i, base + i + 1, base + i - 1, base + i + 0.5, 10.0]
+        for i in range(count)
+    ]
+
+
+# === FIXTURES ===
+
+@pytest.fixture(scope="function")
+def store(tmp_path):
+    """Isolated candle store wired into market_data_api."""
+    s = CandleStore(path=tmp_path / "candles.db")
+    with patch.object(market_data_api, "candle_store", s):
+        yield s
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    cache._memory_storage.clear()
+    market_data_api._window_hints.clear()
+    market_data_api._hot_keys.clear()
+    market_data_api._hot_hits.clear()
+    yield
+    cache._memory_storage.clear()
+    market_data_api._window_hints.clear()
+    market_data_api._hot_keys.clear()
+    market_data_api._hot_hits.clear()
+
+
+def _wait_for_refreshes(timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while market_data_api._refreshing and time.time() < deadline:
+        time.sleep(0.01)
+
+
+# === TESTS ===
+
+def test_candle_store_roundtrip_and_retention(tmp_path):
+    s = CandleStore(path=tmp_path / "candles.db", max_rows=50)
+    s.upsert("BTC", "1h", _candles(0, 80))
+
+    rows = s.load("BTC", "1h", 100)
+    assert len(rows) == 50  # Retention keeps only the newest rows
+    assert rows[-1][0] == 79 * HOUR_MS
+    assert rows == sorted(rows, key=lambda r: r[0])
+
+
+def test_incremental_fetch_only_requests_new_candles(store):
+    now_ms = int(time.time() * 1000)
+    last_open = now_ms - (now_ms % HOUR_MS)
+    history = _candles(last_open - 199 * HOUR_MS, 200)
+
+    calls = []
+
+    def fake_fetch(base_symbol, timeframe, limit, since=None):
+        calls.append({"limit": limit, "since": since})
+        if since is None:
+            return history, "binance"
+        return [c for c in history if c[0] >= since], "binance"
+
+    with patch.object(market_data_api, "_fetch_from_exchanges", side_effect=fake_fetch):
+        first = market_data_api.get_ohlcv_data("BTC", "1h", limit=200)
+        cache._memory_storage.clear()
+        second = market_data_api.get_ohlcv_data("BTC", "1h", limit=200)
+
+    assert len(first) == 200 and len(second) == 200
+    assert calls[0] == {"limit": 200, "since": None}
+    # Steady state: only the forming candle (+1 buffer) is requested
+    assert calls[1]["since"] == history[-1][0]
+    assert calls[1]["limit"] <= 3
+    assert second[-1]["timestamp"] == history[-1][0]
+
+
+def test_stale_store_triggers_full_refetch(store):
+    old = _candles(0, 100)
+    store.upsert("ETH", "1h", old)
+
+    now_ms = int(time.time() * 1000)
+    fresh = _candles(now_ms - 99 * HOUR_MS, 100)
+
+    with patch.object(
+        market_data_api, "_fetch_from_exchanges", return_value=(fresh, "kraken")
+    ) as mock_fetch:
+        data = market_data_api.get_ohlcv_data("ETH", "1h", limit=100)
+
+    mock_fetch.assert_called_once_with("ETH", "1h", 100)
+    assert [c["timestamp"] for c in data] == [c[0] for c in fresh]
+    # Old series replaced: no gap between history and new candles
+    assert store.load("ETH", "1h", 500)[0][0] == fresh[0][0]
+
+
+def test_exchange_pool_reuses_clients_and_shares_markets():
+    from core.exchange_pool import ExchangePool
+
+    class FakeExchange:
+        load_count = 0
+
+        def __init__(self):
+            self.markets = None
+            self.currencies = None
+            self.timeout = None
+
+        def load_markets(self, reload=False):
+            FakeExchange.load_count += 1
+            self.markets = {"BTC/USDT": {}}
+            self.currencies = {"BTC": {}}
+
+        def set_markets(self, markets, currencies):
+            self.markets = markets
+            self.currencies = currencies
+
+    pool = ExchangePool(max_clients=2)
+    with patch.object(pool, "_new_client", side_effect=lambda ex_id: FakeExchange()):
+        with pool.client("binance", timeout=4000) as first:
+            # A concurrent checkout gets a different instance (exclusive lease)
+            with pool.client("binance") as second:
+                assert second is not first
+                assert second.markets is first.markets
+        with pool.client("binance") as again:
+            assert again in (first, second)
+
+    assert FakeExchange.load_count == 1
+    assert pool.stats()["binance"]["clients"] == 2
+
+
+
+def test_async_clients_publish_markets_to_the_shared_pool():
+    import asyncio
+    from core import exchange_pool as pool_module
+    from core.exchange_pool import AsyncExchangePool, ExchangePool
+
+    loads = []
+
+    class FakeAsyncExchange:
+        def __init__(self, config):
+            self.id = "binance"
+            self.markets = None
+            self.currencies = None
+
+        async def load_markets(self):
+            loads.append(1)
+            self.markets, self.currencies = {"BTC/USDT": {}}, {"BTC": {}}
+
+        def set_markets(self, markets, currencies):
+            self.markets, self.currencies = markets, currencies
+
+        async def close(self):
+            pass
+
+    sync_pool = ExchangePool()
+    async_pool = AsyncExchangePool(sync_pool)
+
+    async def one_loop():
+        try:
+            return (await async_pool.client("binance")).markets
+        finally:
+            await async_pool.close_loop()
+
+    with patch.object(pool_module.ccxt_async, "binance", FakeAsyncExchange, create=True):
+        first = asyncio.run(one_loop())
+        second = asyncio.run(one_loop())  # Cold loop, warm pool
+
+    assert len(loads) == 1 and second is first
+    assert sync_pool.get_markets("binance") == (first, {"BTC": {}})
+
+
+def test_single_flight_coalesces_concurrent_ohlcv_misses(store):
+    import threading
+    import concurrent.futures
+
+    now_ms = int(time.time() * 1000)
+    candles = _candles(now_ms - 49 * HOUR_MS, 50)
+    release = threading.Event()
+    fetches = []
+
+    def slow_fetch(base_symbol, timeframe, limit, since=None):
+        fetches.append(base_symbol)
+        release.wait(timeout=5)
+        return candles, "binance"
+
+    before = market_data_api._inflight.stats()
+    with patch.object(market_data_api, "_fetch_from_exchanges", side_effect=slow_fetch):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [
+                executor.submit(market_data_api.get_ohlcv_data, "SOL", "1h", 50)
+                for _ in range(5)
+            ]
+            while market_data_api._inflight.stats()["coalesced"] - before["coalesced"] < 4:
+                time.sleep(0.01)
+            release.set()
+            results = [f.result() for f in futures]
+
+    assert len(fetches) == 1
+    assert all(len(r) == 50 for r in results)
+
+
+def test_single_flight_async_shares_one_task():
+    import asyncio
+    from core.single_flight import SingleFlight
+
+    flight = SingleFlight()
+    runs = []
+
+    async def fetch():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "candles"
+
+    async def main():
+        return await asyncio.gather(*[flight.do_async("k", fetch) for _ in range(4)])
+
+    assert asyncio.run(main()) == ["candles"] * 4
+    assert len(runs) == 1
+    assert flight.stats()["coalesced"] == 3
+
+
+def test_smaller_windows_and_current_price_served_from_largest_cached_window(store):
+    now_ms = int(time.time() * 1000)
+    history = _candles(now_ms - 999 * HOUR_MS, 1000)
+
+    with patch.object(
+        market_data_api, "_fetch_from_exchanges", return_value=(history, "binance")
+    ) as mock_fetch:
+        big = market_data_api.get_ohlcv_data("AVAX", "1h", limit=1000)
+        small, source = market_data_api.get_ohlcv_data("AVAX", "1h", limit=200, return_source=True)
+        price = market_data_api.get_current_price("AVAX")
+
+    assert mock_fetch.call_count == 1
+    assert len(big) == 1000 and len(small) == 200 and source == "cache"
+    assert small == big[-200:]
+    assert price == history[-1][4]
+
+
+def test_window_hints_expire_when_the_large_consumer_goes_away():
+    key = ("DOT", "1h")
+    assert market_data_api._fetch_limit_for("DOT", "1h", 1000) == 1000
+    assert market_data_api._fetch_limit_for("DOT", "1h", 100) == 1000  # Same cache entry
+
+    # Smaller requests don't renew the hint: once it ages out fetches shrink back
+    window, seen_at = market_data_api._window_hints[key]
+    market_data_api._window_hints[key] = (window, seen_at - market_data_api.WINDOW_HINT_TTL - 1)
+    assert market_data_api._fetch_limit_for("DOT", "1h", 100) == 100
+    assert market_data_api._window_hints[key][0] == 100
+
+
+def test_candle_array_zero_copy_views_match_legacy_records(store):
+    import numpy as np
+    from core.candles import CandleArray
+    from strategies.ma_cross import MACrossStrategy
+
+    now_ms = int(time.time() * 1000)
+    history = _candles(now_ms - 299 * HOUR_MS, 300)
+
+    with patch.object(
+        market_data_api, "_fetch_from_exchanges", return_value=(history, "binance")
+    ):
+        arrays = market_data_api.get_ohlcv_arrays("LINK", "1h", limit=300)
+        records = market_data_api.get_ohlcv_data("LINK", "1h", limit=300)
+
+    assert isinstance(arrays, CandleArray) and len(arrays) == 300
+    assert records == CandleArray.from_rows(history).to_records()
+
+    df = arrays.to_dataframe()
+    assert np.shares_memory(df["close"].to_numpy(), arrays.close)
+    with pytest.raises(ValueError):
+        arrays.close[0] = 0.0  # Shared cache buffers are read-only
+
+    # Strategies accept CandleArray through the context channel
+    with patch("builtins.print"):
+        strat = MACrossStrategy()
+        from_arrays = strat.generate_signals(["LINK"], "1h", context={"data": {"LINK": arrays}})
+        from_records = strat.generate_signals(["LINK"], "1h", context={"data": {"LINK": records}})
+    assert [s.timestamp for s in from_arrays] == [s.timestamp for s in from_records]
+
+
+
+def test_legacy_records_do_not_grow_the_cached_window(store):
+    now_ms = int(time.time() * 1000)
+    history = _candles(now_ms - 999 * HOUR_MS, 1000)
+
+    with patch.object(
+        market_data_api, "_fetch_from_exchanges", return_value=(history, "binance")
+    ):
+        market_data_api.get_ohlcv_arrays("ADA", "1h", limit=1000)
+        entry = cache._memory_storage._data["ohlcv:ADA:1h"]
+        charged = entry.size
+        records = market_data_api.get_ohlcv_data("ADA", "1h", limit=50)
+
+    window = entry.value["candles"]
+    assert len(records) == 50 and records[-1]["timestamp"] == history[-1][0]
+    # Nothing derived is attached to the cached buffers: the L1 charge stays accurate
+    assert not hasattr(window, "_records")
+    assert charged == approx_size(entry.value) and charged < 2 * window.nbytes
+
+
+def test_async_batch_fetches_symbols_concurrently(store):
+    import asyncio
+
+    now_ms = int(time.time() * 1000)
+    history = _candles(now_ms - 99 * HOUR_MS, 100)
+    active = []
+    peak = []
+
+    async def fake_fetch(base_symbol, timeframe, limit, since=None):
+        active.append(base_symbol)
+        peak.append(len(active))
+        await asyncio.sleep(0.05)
+        active.remove(base_symbol)
+        return history, "binance"
+
+    symbols = ["BTC", "ETH", "SOL", "ADA", "BTC"]
+    with patch.object(market_data_api, "_fetch_from_exchanges_async", side_effect=fake_fetch):
+        batch = market_data_api.get_ohlcv_batch_sync(symbols, "1h", limit=100)
+
+    assert list(sorted(batch)) == ["ADA", "BTC", "ETH", "SOL"]
+    assert max(peak) == 4  # All distinct symbols in flight at once
+    assert all(len(w) == 100 for w in batch.values())
+
+    # Results land in the shared cache: sync consumers don't hit the network
+    with patch.object(market_data_api, "_fetch_from_exchanges") as mock_fetch:
+        records = market_data_api.get_ohlcv_data("ETH", "1h", limit=50)
+    mock_fetch.assert_not_called()
+    assert len(records) == 50
+
+
+def test_sync_batches_reuse_one_background_loop(store):
+    import asyncio
+
+    now_ms = int(time.time() * 1000)
+    history = _candles(now_ms - 99 * HOUR_MS, 100)
+    loops = []
+
+    async def fake_fetch(base_symbol, timeframe, limit, since=None):
+        loops.append(asyncio.get_running_loop())
+        return history, "binance"
+
+    with patch.object(market_data_api, "_fetch_from_exchanges_async", side_effect=fake_fetch), \
+            patch.object(market_data_api.async_exchange_pool, "close_loop") as mock_close:
+        market_data_api.get_ohlcv_batch_sync(["BTC"], "1h", limit=100)
+        market_data_api.get_ohlcv_batch_sync(["ETH"], "1h", limit=100)
+        # Clients survive between cycles: nothing is torn down per call
+        mock_close.assert_not_called()
+        assert len(loops) == 2 and loops[0] is loops[1]
+        assert loops[0].is_running()
+
+        market_data_api.close_batch_loop()
+    mock_close.assert_called_once()
+    deadline = time.time() + 2
+    while loops[0].is_running() and time.time() < deadline:
+        time.sleep(0.01)
+    assert not loops[0].is_running()
+
+
+def test_exchange_health_reorders_chain_and_trips_breakers():
+    import ccxt
+    from core.exchange_health import ExchangeHealth
+
+    health = ExchangeHealth(failure_threshold=2, cooldown=60)
+    chain = ["binance", "kraken", "kucoin"]
+    assert health.ordered(chain) == chain  # No data yet: base order
+
+    health.record_success("kraken", 0.1)
+    health.record_success("binance", 0.8)
+    assert health.ordered(chain)[0] == "kraken"
+
+    # A 429 opens the circuit at once; the venue drops out of the chain
+    with patch.object(market_data_api, "exchange_health", health):
+        market_data_api._record_venue_error("kraken", ccxt.RateLimitExceeded("429"))
+        market_data_api._record_venue_error("kucoin", ccxt.BadSymbol("not listed"))
+    assert "kraken" not in health.ordered(chain)
+    assert health.stats()["kucoin"]["errors"] == 0
+    assert health.acquire("kraken") is False
+
+
+def test_unlisted_symbol_and_pool_exhaustion_do_not_count_against_a_venue():
+    import queue
+
+    import ccxt
+    from core.exchange_health import ExchangeHealth
+
+    health = ExchangeHealth(failure_threshold=1, cooldown=0)
+    health.record_failure("kraken")
+    assert health.acquire("kraken")  # Cooldown over: the half-open probe goes out
+    assert health.stats()["kraken"]["state"] == "half_open"
+
+    with patch.object(market_data_api, "exchange_health", health):
+        # The probe hit an unlisted pair: the venue answered, so the circuit closes
+        market_data_api._record_venue_error("kraken", ccxt.BadSymbol("not listed"))
+        # No free client in our own pool says nothing about binance
+        market_data_api._record_venue_error("binance", queue.Empty())
+
+    stats = health.stats()
+    assert stats["kraken"]["state"] == "closed" and stats["kraken"]["errors"] == 1
+    assert "binance" not in stats  # Nothing recorded at all
+
+
+def test_failing_exchange_falls_through_without_sleeping():
+    import ccxt
+    from contextlib import contextmanager
+    from core.exchange_health import ExchangeHealth
+
+    now_ms = int(time.time() * 1000)
+    candles = _candles(now_ms - 9 * HOUR_MS, 10)
+
+    class FakeExchange:
+        def __init__(self, ex_id):
+            self.ex_id = ex_id
+
+        def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+            if self.ex_id == "binance":
+                raise ccxt.NetworkError("timeout")
+            return candles
+
+    @contextmanager
+    def fake_client(ex_id, timeout=None, wait=10.0):
+        yield FakeExchange(ex_id)
+
+    health = ExchangeHealth(failure_threshold=2, cooldown=60)
+    with patch.object(market_data_api, "exchange_health", health), patch.object(
+        market_data_api.exchange_pool, "client", side_effect=fake_client
+    ), patch("time.sleep") as mock_sleep, patch("builtins.print"):
+        results = [market_data_api._fetch_from_exchanges("BTC", "1h", 10) for _ in range(3)]
+
+    mock_sleep.assert_not_called()
+    assert [ex for _, ex in results] == ["kraken"] * 3
+    # After one failure binance is ranked behind kraken instead of retried
+    assert health.stats()["binance"]["errors"] == 1
+    assert health.ordered(["binance", "kraken"]) == ["kraken", "binance"]
+
+
+def test_stale_window_served_immediately_while_refreshing(store):
+    from core.candles import CandleArray
+
+    now_ms = int(time.time() * 1000)
+    old = _candles(now_ms - 100 * HOUR_MS, 100)
+    fresh = _candles(now_ms - 99 * HOUR_MS, 100)
+
+    # Expired 1s ago, still inside the stale window
+    entry = {"limit": 100, "candles": CandleArray.from_rows(old)}
+    cache._memory_storage.put("ohlcv:DOT:1h", entry, time.time() - 1, time.time() + 60)
+
+    with patch.object(
+        market_data_api, "_fetch_from_exchanges", return_value=(fresh, "binance")
+    ) as mock_fetch:
+        data, source = market_data_api.get_ohlcv_data("DOT", "1h", limit=100, return_source=True)
+        assert source == "cache" and data[-1]["timestamp"] == old[-1][0]
+        _wait_for_refreshes()
+
+    assert mock_fetch.call_count == 1
+    assert market_data_api.get_ohlcv_data("DOT", "1h", limit=100)[-1]["timestamp"] == fresh[-1][0]
+
+
+def test_stale_hits_count_only_stale_values_actually_served(store):
+    from core.candles import CandleArray
+
+    now_ms = int(time.time() * 1000)
+    old = CandleArray.from_rows(_candles(now_ms - 100 * HOUR_MS, 100))
+    fresh = _candles(now_ms - 99 * HOUR_MS, 100)
+
+    def expire():
+        cache._memory_storage.put(
+            "ohlcv:XRP:1h", {"limit": 100, "candles": old}, time.time() - 1, time.time() + 60
+        )
+
+    def counters():
+        ohlcv = cache.stats()["namespaces"].get("ohlcv", {})
+        return ohlcv.get("stale_hits", 0), ohlcv.get("misses", 0)
+
+    async def fake_fetch(base_symbol, timeframe, limit, since=None):
+        return fresh, "binance"
+
+    # Batch path refetches synchronously: the stale entry is a miss, not a stale hit
+    expire()
+    before = counters()
+    with patch.object(market_data_api, "_fetch_from_exchanges_async", side_effect=fake_fetch):
+        market_data_api.get_ohlcv_batch_sync(["XRP"], "1h", limit=100)
+    assert counters()[0] == before[0] and counters()[1] > before[1]
+
+    # SWR path serves it while revalidating: exactly one stale hit
+    expire()
+    before = counters()
+    with patch.object(market_data_api, "_fetch_from_exchanges", return_value=(fresh, "binance")):
+        market_data_api.get_ohlcv_data("XRP", "1h", limit=100)
+        _wait_for_refreshes()
+    assert counters()[0] == before[0] + 1
+
+
+def test_hot_summary_key_refreshed_before_expiry():
+    tickers = {
+        "BTC/USDT": {"last": 100.0, "percentage": 1.0},
+        "ETH/USDT": {"last": 10.0, "percentage": 1.0},
+    }
+
+    class FakeExchange:
+        calls = 0
+
+        def fetch_tickers(self, pairs):
+            FakeExchange.calls += 1
+            return tickers
+
+    from contextlib import contextmanager
+
+    @contextmanager
+    def fake_client(ex_id, timeout=None, wait=10.0):
+        yield FakeExchange()
+
+    with patch.object(market_data_api, "_hot_refresher", object()), patch.object(
+        market_data_api.exchange_pool, "client", side_effect=fake_client
+    ):
+        first = market_data_api.get_market_summary(["BTC"])
+        market_data_api.get_market_summary(["ETH"])  # One-off request: never turns hot
+        for _ in range(market_data_api.HOT_KEY_MIN_HITS - 1):
+            assert not market_data_api._hot_keys
+            market_data_api.get_market_summary(["BTC"])
+        assert FakeExchange.calls == 2 and len(market_data_api._hot_keys) == 1
+
+        # Entry about to expire: the refresher renews it ahead of time
+        key = next(iter(market_data_api._hot_keys))
+        value, _ = cache.peek(key)
+        cache._memory_storage.put(key, value, time.time() + 1, time.time() + 60)
+        market_data_api._refresh_hot_keys()
+        _wait_for_refreshes()
+
+    assert FakeExchange.calls == 3
+    assert first[0]["price"] == 100.0
+    assert cache.peek(key)[1] > time.time() + 10
+
+
+def test_memory_tier_lru_byte_budget_and_namespace_stats():
+    from core.cache import MemoryTier, approx_size
+    from core.candles import CandleArray
+
+    window = CandleArray.from_rows(_candles(0, 1000))  # ~48 KB
+    entry_size = approx_size({"limit": 1000, "candles": window})
+    assert window.nbytes < entry_size < window.nbytes + 1024
+    tier = MemoryTier(max_bytes=int(3.5 * entry_size))
+    far = time.time() + 60
+
+    for symbol in ["BTC", "ETH", "SOL"]:
+        tier.put(f"ohlcv:{symbol}:1h", {"limit": 1000, "candles": window}, far, far)
+    assert tier.get("ohlcv:BTC:1h") is not None  # BTC becomes most recently used
+    tier.put("ohlcv:ADA:1h", {"limit": 1000, "candles": window}, far, far)
+
+    assert "ohlcv:ETH:1h" not in tier  # LRU evicted
+    assert "ohlcv:BTC:1h" in tier and "ohlcv:ADA:1h" in tier
+    assert tier.total_bytes <= tier.max_bytes
+
+    # Expired entries leave through the heap on the next write
+    tier.put("market:summary:1", [{"price": 1.0}], time.time() - 2, time.time() - 1)
+    tier.put("market:summary:2", [{"price": 2.0}], far, far)
+    assert "market:summary:1" not in tier
+    assert tier.get("market:summary:404") is None
+
+    stats = tier.stats()["namespaces"]
+    assert stats["ohlcv"]["hits"] == 1 and stats["ohlcv"]["evictions"] == 1
+    assert stats["market:summary"]["expired"] == 1 and stats["market:summary"]["misses"] == 1
+
+
+class _FakeRedis:
+    """Minimal in-process stand-in for the redis client (get/setex/ttl/publish)."""
+
+    def __init__(self):
+        self.store = {}
+        self.published = []
+
+    def pipeline(self, transaction=False):
+        return _FakePipeline(self)
+
+    def get(self, key):
+        value = self.store.get(key)
+        return value[0] if value and value[1] > time.time() else None
+
+    def ttl(self, key):
+        return int(self.store[key][1] - time.time()) if key in self.store else -2
+
+    def setex(self, key, ttl, value):
+        self.store[key] = (value, time.time() + ttl)
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.ops = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.ops.append((name, args))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args) for name, args in self.ops]
+
+
+def test_cache_codec_roundtrip_is_compact():
+    import json
+    from core import cache_codec
+    from core.candles import CandleArray
+
+    window = CandleArray.from_rows(_candles(0, 1000))
+    payload = cache_codec.dumps({"limit": 1000, "candles": window}, 123.0)
+    value, expires_at = cache_codec.loads(payload)
+
+    assert expires_at == 123.0 and value["limit"] == 1000
+    assert value["candles"].to_rows() == window.to_rows()
+    assert len(payload) * 2 < len(json.dumps(window.to_records()))
+
+    summary = [{"symbol": "BTC", "price": 1.5, "change_24h": 0.0}]
+    assert cache_codec.loads(cache_codec.dumps(summary, 1.0))[0] == summary
+
+
+def test_two_tier_cache_reads_through_l2_and_invalidates_peers():
+    from core.cache import CacheService, MemoryTier
+    from core.candles import CandleArray
+
+    redis = _FakeRedis()
+    writer, reader = object.__new__(CacheService), object.__new__(CacheService)
+    for node, node_id in ((writer, "w"), (reader, "r")):
+        node._memory_storage = MemoryTier()
+        node._node_id = node_id
+        node._l2_stats = {k: 0 for k in ("hits", "misses", "errors", "bytes_in", "bytes_out", "invalidations")}
+        node._pubsub_active = True
+        node.redis_client = redis
+
+    window = CandleArray.from_rows(_candles(0, 100))
+    writer.set("ohlcv:BTC:1h", {"limit": 100, "candles": window}, ttl=20)
+
+    # Writer serves its own write from L1; reader fills L1 from L2 once
+    assert writer.get("ohlcv:BTC:1h")["candles"] is window
+    first = reader.get("ohlcv:BTC:1h")
+    assert first["candles"].to_rows() == window.to_rows()
+    assert reader.get("ohlcv:BTC:1h") is first
+    assert reader.stats()["l2"]["hits"] == 1
+
+    # A peer's write invalidates the local L1 copy
+    channel, message = redis.published[-1]
+    reader._on_invalidation(message.encode())
+    assert "ohlcv:BTC:1h" not in reader._memory_storage
+
+
+def test_batch_refetches_windows_cached_before_the_latest_close(store):
+    from core.candles import CandleArray
+
+    now_ms = int(time.time() * 1000)
+    current_open = now_ms - now_ms % HOUR_MS
+    before_close = _candles(current_open - 100 * HOUR_MS, 100)  # Last candle: previous hour
+    after_close = _candles(current_open - 99 * HOUR_MS, 100)
+
+    cache.set("ohlcv:XRP:1h", {"limit": 100, "candles": CandleArray.from_rows(before_close)}, ttl=20)
+
+    async def fake_fetch(base_symbol, timeframe, limit, since=None):
+        return after_close, "binance"
+
+    with patch.object(market_data_api, "_fetch_from_exchanges_async", side_effect=fake_fetch) as mock_fetch:
+        cached = market_data_api.get_ohlcv_batch_sync(["XRP"], "1h", limit=100)
+        fresh = market_data_api.get_ohlcv_batch_sync(
+            ["XRP"], "1h", limit=100, min_last_open=current_open
+        )
+
+    assert cached["XRP"].timestamp[-1] == before_close[-1][0]  # Plain call: cache hit
+    assert mock_fetch.call_count == 1
+    assert fresh["XRP"].timestamp[-1] == current_open
@@ -0,0 +1,48 @@
+import os
+import sys
+from unittest.mock import patch
+
+# Ensure backend modules are importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def test_notification_dispatcher_retries_and_removes_gone_subscriptions(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from models_db import Base, PushSubscription
+    from core.notification_dispatcher import NotificationDispatcher
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'push.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add_all([PushSubscription(endpoint=f"https://push/{i}", p256dh="k", auth="a") for i in range(5)])
+    db.commit()
+    db.close()
+
+    dispatcher = NotificationDispatcher(base_delay=0, session_factory=Session)
+    flaky = iter([{"ok": False, "status": 429, "retryable": True}, {"ok": True}])
+    assert dispatcher.submit("telegram", lambda: next(flaky))
+
+    def fake_webpush(info, payload, private_key, claims):
+        gone = info["endpoint"].endswith(("/1", "/3"))
+        return {"ok": False, "status": 410, "gone": True} if gone else {"ok": True}
+
+    monkeypatch.setenv("VAPID_PRIVATE_KEY", "test-key")
+    with patch("notify.send_webpush", side_effect=fake_webpush):
+        assert dispatcher.push("title", "body")  # Returns before any delivery
+        assert dispatcher.flush(timeout=5)
+    dispatcher.close()
+
+    stats = dispatcher.stats()
+    assert stats["pending"] == 0
+    assert stats["channels"]["telegram"] == dict(
+        submitted=1, delivered=1, failed=0, retries=1, dropped=0, removed=0
+    )
+    assert stats["channels"]["push"]["delivered"] == 3
+    assert stats["channels"]["push"]["removed"] == 2
+    db = Session()
+    assert sorted(s.endpoint for s in db.query(PushSubscription)) == [
+        "https://push/0", "https://push/2", "https://push/4"
+    ]
+    db.close()
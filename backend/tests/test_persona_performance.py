@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+from unittest.mock import patch
+
+# Ensure backend modules are importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.candles import CandleArray  # noqa: E402
+
+
+def test_persona_aggregates_accumulate_across_evaluation_runs(tmp_path):
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from models_db import Base, PersonaPerformance, Signal as SignalDB, StrategyConfig
+    from core.signal_evaluator import _epoch_ms, evaluate_pending_signals
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'perf.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    opened = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(hours=2)
+    edited = datetime(2024, 1, 1)
+    db = Session()
+    db.add(StrategyConfig(persona_id="p1", name="P1", updated_at=edited))
+    db.add(SignalDB(id=1, timestamp=opened, token="BTC", timeframe="1h", direction="long",
+                    entry=100.0, tp=105.0, sl=95.0, strategy_id="p1"))
+    db.commit()
+
+    step = 5 * 60 * 1000
+    start_ms = _epoch_ms(opened)
+    # Wick to 106 then dump to 94: TP first for longs, SL first for shorts (tp 90 / sl 105)
+    candles = CandleArray.from_rows(
+        [[start_ms + i * step, 100, 106 if i == 15 else 101, 94 if i == 17 else 99, 100, 1]
+         for i in range(24)]
+    )
+    with patch("core.signal_evaluator.get_ohlcv_arrays", return_value=candles), patch(
+        "core.signal_evaluator.get_current_price", return_value=100.0
+    ):
+        assert evaluate_pending_signals(db) == 1
+        db.add(SignalDB(id=2, timestamp=opened, token="BTC", timeframe="1h", direction="short",
+                        entry=100.0, tp=90.0, sl=105.0, strategy_id="p1"))
+        db.commit()
+        assert evaluate_pending_signals(db) == 1
+
+    perf = db.get(PersonaPerformance, "p1")
+    assert (perf.total, perf.wins, perf.losses) == (2, 1, 1)
+    assert perf.sum_pnl_r == pytest.approx(0.0)  # +1R then -1R
+    assert perf.win_rate == 50.0
+    config = db.query(StrategyConfig).filter_by(persona_id="p1").one()
+    assert (config.win_rate, config.total_signals) == (50.0, 2)
+    assert config.updated_at == edited  # Stats don't look like a config edit
+    db.close()
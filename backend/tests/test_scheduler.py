@@ -0,0 +1,797 @@
+import sys
+import os
+import time
+import pytest
+from unittest.mock import patch
+
+# Ensure backend modules are importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.candles import CandleArray
+from core.notification_dispatcher import notification_dispatcher
+
+HOUR_MS = 3600 * 1000
+
+
+def _window(count: int) -> CandleArray:
+    start = int(time.time() * 1000) - count * HOUR_MS
+    return CandleArray.from_rows(
+        [[start + i * HOUR_MS, 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 10.0] for i in range(count)]
+    )
+
+
+# === FIXTURES ===
+
+@pytest.fixture(scope="function")
+def scheduler():
+    from scheduler import StrategyScheduler
+
+    with patch("builtins.print"):
+        yield StrategyScheduler(loop_interval=1)
+
+
+def _persona(pid, strategy_id, tokens, timeframe="1h"):
+    return {
+        "id": pid, "strategy_id": strategy_id, "tokens": tokens, "timeframe": timeframe,
+        "name": pid, "telegram_chat_id": None, "user_id": 1,
+    }
+
+
+# === TESTS ===
+
+def test_cycle_snapshot_fetches_each_token_timeframe_once(scheduler):
+    personas = [
+        _persona("p1", "ma_cross_v1", ["BTC", "ETH"]),  # lookback 200
+        _persona("p2", "donchian_v2", ["BTC"]),  # lookback 250
+        _persona("p3", "donchian_v2", ["BTC", "SOL"]),
+        _persona("p4", "ma_cross_v1", ["BTC"], timeframe="4h"),
+    ]
+    calls = []
+
+    def fake_batch(tokens, timeframe, limit, min_last_open=0):
+        calls.append((timeframe, limit, sorted(tokens)))
+        return {t: _window(limit) for t in tokens}
+
+    with patch("scheduler.get_ohlcv_batch_sync", side_effect=fake_batch), patch("builtins.print"):
+        snapshot = scheduler._build_market_snapshot(personas)
+
+    assert sorted(calls) == [
+        ("1h", 200, ["ETH"]),
+        ("1h", 250, ["BTC", "SOL"]),
+        ("4h", 200, ["BTC"]),
+    ]
+    assert len(snapshot["1h"]["BTC"]) == 250
+
+
+def test_strategies_receive_snapshot_trimmed_to_their_lookback(scheduler):
+    snapshot = {"1h": {"BTC": _window(250)}}
+    seen = {}
+
+    def fake_generate(self, tokens, timeframe, context=None):
+        seen[type(self).__name__] = context
+        return []
+
+    from strategies.ma_cross import MACrossStrategy
+    from strategies.DonchianBreakoutV2 import DonchianBreakoutV2
+
+    with patch.object(MACrossStrategy, "generate_signals", fake_generate), patch.object(
+        DonchianBreakoutV2, "generate_signals", fake_generate
+    ):
+        scheduler._execute_strategy_task(_persona("p1", "ma_cross_v1", ["BTC", "XRP"]), snapshot)
+        scheduler._execute_strategy_task(_persona("p2", "donchian_v2", ["BTC"]), snapshot)
+
+    ma_data = seen["MACrossStrategy"]["data"]
+    assert list(ma_data) == ["BTC"]  # XRP missing -> strategy fetches it itself
+    assert len(ma_data["BTC"]) == 200
+    assert ma_data["BTC"].timestamp[-1] == snapshot["1h"]["BTC"].timestamp[-1]
+    assert len(seen["DonchianBreakoutV2"]["data"]["BTC"]) == 250
+
+
+def test_donchian_v2_uses_context_data_instead_of_fetching():
+    from strategies.DonchianBreakoutV2 import DonchianBreakoutV2
+
+    with patch("strategies.DonchianBreakoutV2.get_market_data") as mock_fetch, patch(
+        "builtins.print"
+    ):
+        DonchianBreakoutV2().generate_signals(["BTC"], "1h", context={"data": {"BTC": _window(250)}})
+
+    mock_fetch.assert_not_called()
+
+
+def test_due_queue_orders_and_reschedules():
+    from core.schedule_queue import DueQueue
+
+    q = DueQueue()
+    q.schedule("a", 10.0)
+    q.schedule("b", 5.0)
+    q.schedule("c", 20.0)
+    q.schedule("a", 30.0)  # Reschedule: the stale entry is ignored
+    q.discard("c")
+
+    assert q.next_due() == 5.0
+    assert q.pop_due(25.0) == ["b"]
+    assert q.pop_due(30.0) == ["a"]
+    assert len(q) == 0 and q.next_due() is None
+
+
+def test_scheduler_runs_only_due_personas_and_persists_last_execution(scheduler, tmp_path):
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from models_db import Base, StrategyConfig
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'sched.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    from core.schedule_queue import last_candle_close
+
+    now = time.time()
+    ran_recently = datetime.utcnow() - timedelta(minutes=10)
+    # Slow persona already processed the current 4h candle
+    slow_ran = datetime.utcfromtimestamp(last_candle_close(now - 10, "4h") + 3)
+    db = Session()
+    db.add_all([
+        StrategyConfig(id=1, persona_id="fast", strategy_id="ma_cross_v1", name="fast",
+                       interval_seconds=60, last_execution=ran_recently),
+        StrategyConfig(id=2, persona_id="slow", strategy_id="ma_cross_v1", name="slow",
+                       interval_seconds=14400, last_execution=slow_ran),
+    ])
+    db.commit()
+    updated_before = db.get(StrategyConfig, 1).updated_at
+    db.close()
+
+    personas = [
+        dict(_persona("fast", "ma_cross_v1", ["BTC"], timeframe="1m"), config_id=1,
+             interval_seconds=60, last_execution=ran_recently),
+        dict(_persona("slow", "ma_cross_v1", ["BTC"], timeframe="4h"), config_id=2,
+             interval_seconds=14400, last_execution=slow_ran),
+    ]
+    scheduler._sync_schedule(personas, now)
+    due = scheduler._pop_due_personas(now)
+    assert [p["id"] for p in due] == ["fast"]
+
+    with patch("scheduler.SessionLocal", Session), patch.object(
+        scheduler, "_build_market_snapshot", return_value={}
+    ), patch.object(scheduler, "_execute_strategy_task", return_value=[]), patch("builtins.print"):
+        scheduler._run_cycle(due, datetime.utcnow())
+
+    # Next runs land on the next candle close (+ settle delay)
+    assert now < scheduler.schedule.due_at("fast") <= now + 63
+    assert scheduler.schedule.due_at("slow") > now
+    db = Session()
+    fast = db.get(StrategyConfig, 1)
+    assert fast.last_execution > ran_recently
+    assert fast.updated_at == updated_before  # A run is not a config change
+    assert db.get(StrategyConfig, 2).last_execution == slow_ran
+    db.close()
+
+
+def test_next_due_aligns_to_candle_close_plus_settle(scheduler):
+    from datetime import datetime, timezone
+    from scheduler import CANDLE_SETTLE_SECONDS
+
+    def epoch(dt):
+        return dt.replace(tzinfo=timezone.utc).timestamp()
+
+    ran = datetime(2025, 1, 1, 10, 0, 2)  # Processed the 10:00 close
+    before = epoch(datetime(2025, 1, 1, 10, 30))
+    hourly = _persona("p", "ma_cross_v1", ["BTC"], timeframe="1h")
+
+    # interval < timeframe: once per candle, right after it closes
+    due = scheduler._next_due(dict(hourly, interval_seconds=300), ran, before)
+    assert due == epoch(datetime(2025, 1, 1, 11, 0)) + CANDLE_SETTLE_SECONDS
+    # interval spanning two candles skips one close
+    due = scheduler._next_due(dict(hourly, interval_seconds=7200), ran, before)
+    assert due == epoch(datetime(2025, 1, 1, 12, 0)) + CANDLE_SETTLE_SECONDS
+    # Missed close (e.g. restart): run now
+    late = epoch(datetime(2025, 1, 1, 11, 30))
+    assert scheduler._next_due(dict(hourly, interval_seconds=300), ran, late) == late
+
+
+def test_candle_array_pickles_as_read_only_buffers():
+    import pickle
+
+    window = _window(1000)
+    window.to_records()  # Derived records must not travel with the buffers
+    tail = window.tail(200)
+
+    payload = pickle.dumps(tail)
+    restored = pickle.loads(payload)
+    assert len(payload) < 200 * 48 + 1024
+    assert restored.to_rows() == tail.to_rows()
+    with pytest.raises(ValueError):
+        restored.close[0] = 0.0
+
+
+def test_process_mode_evaluates_strategies_in_worker_processes(scheduler):
+    from strategies.ma_cross import MACrossStrategy
+
+    import math
+
+    start = int(time.time() * 1000) - 300 * HOUR_MS
+    prices = [100 + 10 * math.sin(i / 15) for i in range(300)]  # Several EMA crosses
+    window = CandleArray.from_rows(
+        [[start + i * HOUR_MS, p, p + 1, p - 1, p, 10.0] for i, p in enumerate(prices)]
+    )
+    snapshot = {"1h": {"BTC": window}}
+    personas = [_persona(f"p{i}", "ma_cross_v1", ["BTC"]) for i in range(3)]
+
+    with patch("builtins.print"):
+        expected = MACrossStrategy().generate_signals(
+            ["BTC"], "1h", context={"data": {"BTC": window.tail(200)}}
+        )
+
+    scheduler.execution_mode = "process"
+    scheduler.process_workers = 2
+    try:
+        with patch("builtins.print"):
+            results = scheduler._evaluate_personas(personas, snapshot)
+    finally:
+        scheduler._shutdown_process_pool()
+
+    assert expected and sorted(results) == ["p0", "p1", "p2"]
+    for p in personas:
+        got = results[p["id"]]
+        assert [(s.timestamp, s.direction) for s in got] == [
+            (s.timestamp, s.direction) for s in expected
+        ]
+
+
+def test_async_engine_runs_due_personas_and_stops_gracefully(scheduler):
+    import asyncio
+
+    personas = [
+        dict(_persona("p1", "ma_cross_v1", ["BTC", "ETH"]), interval_seconds=3600, last_execution=None),
+        dict(_persona("p2", "ma_cross_v1", ["BTC"], timeframe="4h"), interval_seconds=3600,
+             last_execution=None),
+    ]
+    fetched, evaluated = [], []
+
+    async def fake_batch(tokens, timeframe, limit, min_last_open=0):
+        fetched.append((timeframe, sorted(tokens)))
+        await asyncio.sleep(0)
+        return {t: _window(limit) for t in tokens}
+
+    def fake_execute(persona, snapshot=None):
+        evaluated.append((persona["id"], sorted(snapshot[persona["timeframe"]])))
+        return []
+
+    async def main():
+        scheduler.start_async()
+        for _ in range(100):
+            if len(evaluated) == 2:
+                break
+            await asyncio.sleep(0.02)
+        # Sleeping until the next candle close: stop must not wait for it
+        started = time.monotonic()
+        await scheduler.stop_async(timeout=5)
+        return time.monotonic() - started
+
+    with patch.object(scheduler, "_check_lock", return_value=0), patch(
+        "scheduler.get_active_strategies_from_db", return_value=personas
+    ), patch("scheduler.get_ohlcv_batch", side_effect=fake_batch), patch.object(
+        scheduler, "_execute_strategy_task", side_effect=fake_execute
+    ), patch.object(scheduler, "_persist_last_execution") as persist, patch.object(
+        scheduler, "_evaluate_pnl"
+    ), patch("builtins.print"):
+        stop_elapsed = asyncio.run(main())
+
+    assert sorted(fetched) == [("1h", ["BTC", "ETH"]), ("4h", ["BTC"])]
+    assert sorted(evaluated) == [("p1", ["BTC", "ETH"]), ("p2", ["BTC"])]
+    assert persist.call_count == 1
+    assert stop_elapsed < 1
+    assert scheduler._task is None
+    assert scheduler.schedule.due_at("p1") > time.time()
+
+
+def test_async_engine_stop_cancels_a_hung_cycle(scheduler):
+    import asyncio
+
+    personas = [dict(_persona("p1", "ma_cross_v1", ["BTC"]), interval_seconds=3600, last_execution=None)]
+    cancelled = []
+
+    async def hung_batch(tokens, timeframe, limit, min_last_open=0):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(tokens)
+            raise
+
+    async def main():
+        task = scheduler.start_async()
+        await asyncio.sleep(0.1)
+        await scheduler.stop_async(timeout=0.1)
+        return task
+
+    with patch.object(scheduler, "_check_lock", return_value=0), patch(
+        "scheduler.get_active_strategies_from_db", return_value=personas
+    ), patch("scheduler.get_ohlcv_batch", side_effect=hung_batch), patch("builtins.print"):
+        task = asyncio.run(main())
+
+    assert task.cancelled()
+    assert cancelled == [["BTC"]]
+
+
+def test_thread_engine_survives_a_failing_cycle(scheduler):
+    personas = [dict(_persona("p1", "ma_cross_v1", ["BTC"]), interval_seconds=3600, last_execution=None)]
+    # First cycle blows up; the persona is retried on the next wake (KeyboardInterrupt stops the loop)
+    cycle = patch.object(
+        scheduler, "_run_cycle", side_effect=[RuntimeError("exchange down"), KeyboardInterrupt]
+    )
+
+    with patch.object(scheduler, "_check_lock", return_value=0), patch(
+        "scheduler.get_active_strategies_from_db", return_value=personas
+    ), patch.object(scheduler, "_evaluate_pnl"), cycle as run_cycle, patch("builtins.print"):
+        scheduler.run()
+
+    assert [[p["id"] for p in c.args[0]] for c in run_cycle.call_args_list] == [["p1"], ["p1"]]
+
+
+def test_shard_leases_split_rebalance_and_fail_over(tmp_path):
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from models_db import Base, SchedulerLock
+    from core.shard_lease import ShardLeaseManager
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'shards.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    a = ShardLeaseManager(Session, "node-a", num_shards=8, lease_ttl=60)
+    b = ShardLeaseManager(Session, "node-b", num_shards=8, lease_ttl=60)
+    c = ShardLeaseManager(Session, "node-c", num_shards=8, lease_ttl=60)
+
+    with patch("builtins.print"):
+        assert len(a.heartbeat()) == 8  # Alone: owns everything
+        assert b.heartbeat() == set()  # Nothing free until A hands back its surplus
+        assert len(a.heartbeat()) == 4
+        assert len(b.heartbeat()) == 4
+        assert a.owned.isdisjoint(b.owned)
+
+        # Each persona is run by exactly one node
+        personas = [f"persona_{i}" for i in range(50)]
+        assert all(a.owns(p) != b.owns(p) for p in personas)
+
+        # Third node joins: quota ceil(8/3) = 3
+        c.heartbeat()
+        a.heartbeat()
+        b.heartbeat()
+        c.heartbeat()
+        assert sorted(len(m.owned) for m in (a, b, c)) == [2, 3, 3]
+        assert len(a.owned | b.owned | c.owned) == 8
+
+        # C dies: its leases and heartbeat expire, A and B pick up its shards
+        db = Session()
+        db.query(SchedulerLock).filter(SchedulerLock.owner_id == "node-c").update(
+            {SchedulerLock.expires_at: datetime.utcnow() - timedelta(seconds=1)},
+            synchronize_session=False,
+        )
+        db.commit()
+        db.close()
+        a.heartbeat()
+        b.heartbeat()
+        assert len(a.owned) == 4 and len(b.owned) == 4
+        assert a.owned | b.owned == set(range(8))
+
+        # Graceful stop hands everything over immediately
+        a.release_all()
+        assert len(b.heartbeat()) == 8
+
+
+def test_scheduler_only_runs_personas_of_its_shards(scheduler):
+    from core.shard_lease import ShardLeaseManager, shard_for
+
+    scheduler.shard_leases = ShardLeaseManager(None, scheduler.lock_id, num_shards=4)
+    scheduler.shard_leases.owned = {0, 1}
+    personas = [
+        dict(_persona(f"p{i}", "ma_cross_v1", ["BTC"]), interval_seconds=300, last_execution=None)
+        for i in range(20)
+    ]
+
+    with patch("scheduler.get_active_strategies_from_db", return_value=personas):
+        scheduler._refresh_personas(time.time())
+    due = scheduler._pop_due_personas(time.time())
+
+    assert {p["id"] for p in due} == {
+        p["id"] for p in personas if shard_for(p["id"], 4) in {0, 1}
+    }
+    assert 0 < len(due) < len(personas)
+
+
+def test_ttl_store_expires_bounds_and_reports_metrics():
+    from core.dedupe_store import TTLStore
+    from test_market_data import _FakeRedis
+
+    clock = [1000.0]
+    with patch("core.dedupe_store.time.time", side_effect=lambda: clock[0]):
+        store = TTLStore("t", ttl=60, max_entries=3)
+        store[("p1", "BTC", "long")] = 1.0
+        clock[0] += 30
+        store[("p1", "ETH", "long")] = 2.0
+        assert store.get(("p1", "BTC", "long")) == 1.0
+        assert store.get(("p2", "BTC", "long")) is None
+
+        clock[0] += 31  # First entry past its TTL
+        assert ("p1", "BTC", "long") not in store
+        assert len(store) == 1
+
+        for i in range(5):
+            store[("p", i)] = i
+        stats = store.stats()
+        assert stats["entries"] == 3 and stats["evictions"] == 3 and stats["expired"] == 1
+        assert stats["hits"] == 1 and stats["hit_rate"] == 0.333
+        assert stats["approx_bytes"] > 0
+
+    # Shared through Redis: a fresh instance (restart / other node) sees the entry
+    redis = _FakeRedis()
+    TTLStore("t", ttl=60, redis_client=redis)[("p1", "BTC", "long")] = [1, "x"]
+    restarted = TTLStore("t", ttl=60, redis_client=redis)
+    assert restarted.get(("p1", "BTC", "long")) == [1, "x"]
+    assert restarted.stats()["entries"] == 1
+
+
+def test_cycle_dedupe_skips_repeated_and_incoherent_signals(scheduler):
+    from datetime import datetime
+    from core.schemas import Signal
+
+    ts = datetime(2025, 1, 1, 10, 0, 0)
+
+    def sig(token, direction):
+        return Signal(timestamp=ts, token=token, direction=direction, entry=1.0, timeframe="1h",
+                      strategy_id="s", mode="TEST", source="src")
+
+    p1, p2 = _persona("p1", "ma_cross_v1", ["BTC"]), _persona("p2", "ma_cross_v1", ["BTC"])
+    with patch.object(scheduler, "process_signal_batch") as process:
+        scheduler._process_signals([p1], {"p1": [sig("BTC", "long")]}, ts)
+        scheduler._process_signals([p1], {"p1": [sig("BTC", "long")]}, ts)  # Same candle again
+        scheduler._process_signals([p2], {"p2": [sig("BTC", "short")]}, ts)  # Flip within 30m
+
+    assert [len(call.args[0]) for call in process.call_args_list] == [1, 0, 0]
+    stats = scheduler.dedupe_stats()
+    assert stats["processed"]["entries"] == 1 and stats["processed"]["hits"] == 1
+    assert stats["coherence"]["entries"] == 1
+
+
+def test_cycle_signals_are_inserted_in_one_batch_and_only_new_ones_notify(scheduler, tmp_path):
+    from datetime import datetime
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from models_db import Base, Signal as SignalDB
+    from core.schemas import Signal
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'signals.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_inserts(conn, cursor, statement, *args):
+        if statement.startswith("INSERT"):
+            statements.append(statement)
+
+    ts = datetime(2025, 1, 1, 10, 0, 0)
+
+    def sig(token, direction):
+        return Signal(timestamp=ts, token=token, direction=direction, entry=1.0, timeframe="1h",
+                      strategy_id="s", mode="TEST", source="src")
+
+    persona = dict(_persona("p1", "ma_cross_v1", ["BTC", "ETH", "SOL"]), telegram_chat_id=42)
+    with patch("database.SessionLocal", Session), patch(
+        "core.signal_logger._write_to_csv"
+    ), patch("core.signal_logger._send_push_notification"), patch(
+        "scheduler.send_telegram"
+    ) as telegram, patch("builtins.print"):
+        scheduler.process_signal_batch([(sig("BTC", "long"), persona)])
+        notification_dispatcher.flush(timeout=5)
+        statements.clear()
+        telegram.reset_mock()
+        # BTC already stored, ETH twice in the same batch
+        scheduler.process_signal_batch(
+            [(sig("BTC", "long"), persona), (sig("ETH", "short"), persona),
+             (sig("ETH", "short"), persona), (sig("SOL", "long"), persona)]
+        )
+        assert notification_dispatcher.flush(timeout=5)  # Telegram goes out off-thread
+
+    assert len(statements) == 1 and "ON CONFLICT DO NOTHING" in statements[0]
+    assert sorted(c.args[0].split(":")[0] for c in telegram.call_args_list) == [
+        "🔴 SHORT", "🟢 LONG"
+    ]
+    db = Session()
+    assert sorted(row.token for row in db.query(SignalDB)) == ["BTC", "ETH", "SOL"]
+    assert {row.strategy_id for row in db.query(SignalDB)} == {"p1"}
+    db.close()
+
+
+def test_failed_bulk_insert_falls_back_to_per_row_logging(tmp_path):
+    import sqlite3
+    from datetime import datetime
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from models_db import Base, Signal as SignalDB
+    from core.schemas import Signal
+    from core.signal_logger import log_signals
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'signals.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def lock_bulk_insert(conn, cursor, statement, *args):
+        if "ON CONFLICT DO NOTHING" in statement:
+            raise sqlite3.OperationalError("database is locked")
+
+    ts = datetime(2025, 1, 1, 10, 0, 0)
+    signals = [
+        Signal(timestamp=ts, token=token, direction="long", entry=1.0, timeframe="1h",
+               strategy_id="p1", mode="TEST", source="src")
+        for token in ("BTC", "ETH", "BTC")
+    ]
+    with patch("database.SessionLocal", Session), patch(
+        "core.signal_logger._write_to_csv"
+    ) as csv_write, patch("core.signal_logger._send_push_notification") as push, patch(
+        "builtins.print"
+    ):
+        ids = log_signals(signals)
+
+    # The batch failed as a whole; each row still went through the idempotent per-row path
+    assert ids[0] and ids[1] and ids[2] is None
+    assert csv_write.call_count == 2 and push.call_count == 2
+    db = Session()
+    assert sorted(row.token for row in db.query(SignalDB)) == ["BTC", "ETH"]
+    db.close()
+
+
+def test_persona_catalog_reloads_only_changed_rows(tmp_path):
+    import json
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from models_db import Base, StrategyConfig, User
+    from core.persona_catalog import PersonaCatalog
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'catalog.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    long_ago = datetime.utcnow() - timedelta(hours=1)
+
+    db = Session()
+    db.add(User(id=1, email="u@x.io", telegram_chat_id="111"))
+    db.add_all([
+        StrategyConfig(id=i, persona_id=f"p{i}", strategy_id="ma_cross_v1", name=f"p{i}",
+                       tokens=json.dumps(["BTC"]), timeframes=json.dumps(["1h"]), user_id=1,
+                       enabled=1, updated_at=long_ago)
+        for i in range(1, 6)
+    ])
+    db.commit()
+    db.close()
+
+    catalog = PersonaCatalog(Session)
+    assert len(catalog.sync()) == 5 and catalog.rows_loaded == 5
+    assert len(catalog.sync()) == 5 and catalog.rows_loaded == 5  # Nothing changed: no rows
+
+    db = Session()
+    db.get(StrategyConfig, 1).tokens = json.dumps(["ETH"])  # updated_at bumps
+    db.get(StrategyConfig, 2).enabled = 0
+    db.delete(db.get(StrategyConfig, 3))
+    db.add(StrategyConfig(id=6, persona_id="p6", strategy_id="ma_cross_v1", name="p6",
+                          tokens=json.dumps(["SOL"]), user_id=1, enabled=1, updated_at=long_ago))
+    db.commit()
+    db.close()
+
+    personas = {p["id"]: p for p in catalog.sync()}
+    assert sorted(personas) == ["p1", "p4", "p5", "p6"]
+    assert personas["p1"]["tokens"] == ["ETH"] and personas["p6"]["tokens"] == ["SOL"]
+    assert catalog.rows_loaded == 7  # p1 (updated_at) + p6 (new id)
+
+    # User changes don't touch strategy_configs.updated_at: explicit signal
+    db = Session()
+    db.get(User, 1).telegram_chat_id = "222"
+    db.commit()
+    db.close()
+    catalog.invalidate(user_id=1)
+    assert catalog.dirty
+    assert {p["telegram_chat_id"] for p in catalog.sync()} == {"222"}
+    assert not catalog.dirty
+
+
+def test_identical_configurations_run_once_and_fan_out_to_each_persona(scheduler):
+    from datetime import datetime
+    from core.schemas import Signal
+
+    clones = [
+        dict(_persona(f"titan_btc_{uid}", "donchian_v2", ["BTC"], timeframe="1d"), user_id=uid,
+             config_json=None, interval_seconds=300)
+        for uid in (1, 2, 3)
+    ]
+    other = dict(_persona("eth_breaker_1", "donchian_v2", ["ETH"], timeframe="4h"), interval_seconds=300)
+    runs = []
+
+    def fake_execute(persona, snapshot=None):
+        runs.append(persona["id"])
+        return [Signal(timestamp=datetime(2025, 1, 1), token=persona["tokens"][0], direction="long",
+                       entry=1.0, timeframe=persona["timeframe"], strategy_id="donchian_v2",
+                       mode="CUSTOM", source="engine")]
+
+    with patch.object(scheduler, "_build_market_snapshot", return_value={}) as snapshot, patch.object(
+        scheduler, "_execute_strategy_task", side_effect=fake_execute
+    ), patch.object(scheduler, "process_signal_batch") as batch, patch.object(
+        scheduler, "_persist_last_execution"
+    ):
+        scheduler._run_cycle(clones + [other], datetime.utcnow())
+
+    assert sorted(runs) == ["eth_breaker_1", "titan_btc_1"]
+    assert [p["id"] for p in snapshot.call_args.args[0]] == ["titan_btc_1", "eth_breaker_1"]
+    accepted = batch.call_args.args[0]
+    assert sorted((p["id"], sig.token) for sig, p in accepted) == [
+        ("eth_breaker_1", "ETH"), ("titan_btc_1", "BTC"), ("titan_btc_2", "BTC"), ("titan_btc_3", "BTC")
+    ]
+    # Independent copies: per-persona metadata can't leak between owners
+    assert len({id(sig) for sig, _ in accepted}) == 4
+
+
+def test_candle_path_resolves_first_touch_for_all_signals_at_once():
+    import numpy as np
+    from core.signal_evaluator import _resolve_paths, PENDING, TP_HIT, SL_HIT, TIMED_OUT
+
+    step = 5 * 60 * 1000
+    # open, high, low, close per 5m candle
+    path = [(100, 101, 99, 100), (100, 106, 99, 104), (104, 104, 94, 95), (95, 96, 94, 95)]
+    candles = CandleArray.from_rows([[i * step, o, h, lo, c, 1.0] for i, (o, h, lo, c) in enumerate(path)])
+
+    start = np.array([0, 0, 0, 2 * step, 0, 0, 0], dtype=np.int64)
+    is_long = np.array([True, True, True, True, False, True, True])
+    tp = np.array([105, 110, 105, 110, 95, np.nan, 120], dtype=np.float64)
+    sl = np.array([95, 95, 100, 90, 107, 90, 80], dtype=np.float64)
+
+    outcome, exit_price = _resolve_paths(
+        candles, start, is_long, tp, sl, now_ms=4 * step, timeout_ms=100 * step, fallback_close=95.0
+    )
+    assert outcome.tolist()[:5] == [
+        TP_HIT,  # Wick to 106 before the drop to 94
+        SL_HIT,  # TP never reached, SL on candle 2
+        SL_HIT,  # TP and SL both inside candle 1: conservative
+        PENDING,  # Starts after the spike: nothing touched yet
+        TP_HIT,  # Short: low 94 <= 95 on candle 2
+    ]
+    assert exit_price[0] == 105 and exit_price[1] == 95 and exit_price[4] == 95
+    assert outcome[5] == PENDING and outcome[6] == PENDING  # Nothing touched, not timed out
+
+    # Timed out: exit at the close of the last candle inside the window
+    outcome, exit_price = _resolve_paths(
+        candles, start[6:], is_long[6:], tp[6:], sl[6:], now_ms=10 * step, timeout_ms=2 * step,
+        fallback_close=95.0,
+    )
+    assert outcome.tolist() == [TIMED_OUT] and exit_price.tolist() == [104.0]
+
+
+def test_evaluator_catches_a_wick_between_cycles(tmp_path):
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from models_db import Base, Signal as SignalDB, SignalEvaluation
+    from core.signal_evaluator import _epoch_ms, evaluate_pending_signals
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'eval.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    opened = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(hours=2)
+    db = Session()
+    db.add_all([
+        SignalDB(id=1, timestamp=opened, token="BTC", timeframe="1h", direction="long",
+                 entry=100.0, tp=105.0, sl=95.0, strategy_id="p1"),
+        SignalDB(id=2, timestamp=opened, token="ETH", timeframe="1h", direction="short",
+                 entry=100.0, tp=90.0, sl=110.0, strategy_id="p1"),
+    ])
+    db.commit()
+
+    step = 5 * 60 * 1000
+    start_ms = _epoch_ms(opened)
+    btc = CandleArray.from_rows(
+        [[start_ms + i * step, 100, 106 if i == 15 else 101, 99, 100, 1] for i in range(24)]
+    )
+    calls = []
+
+    def fake_arrays(token, timeframe, limit):
+        calls.append((token, timeframe, limit))
+        return btc if token == "BTC" else CandleArray.from_rows(
+            [[start_ms + i * step, 100, 101, 99, 100, 1] for i in range(24)]
+        )
+
+    with patch("core.signal_evaluator.get_ohlcv_arrays", side_effect=fake_arrays), patch(
+        "core.signal_evaluator.get_current_price", return_value=100.0
+    ):
+        assert evaluate_pending_signals(db) == 1
+
+    # From the close of the 1h signal candle: 1h+ of 5m candles
+    assert sorted(calls) == [("BTC", "5m", 14), ("ETH", "5m", 14)]
+    evaluation = db.query(SignalEvaluation).one()
+    assert (evaluation.signal_id, evaluation.result, evaluation.exit_price, evaluation.pnl_r) == (
+        1, "WIN", 105.0, 1.0
+    )
+    # Only the still-open signal is scanned on the next run
+    assert [(sig.id, sig.status) for sig in db.query(SignalDB).order_by(SignalDB.id)] == [
+        (1, "CLOSED"), (2, "OPEN")
+    ]
+    db.close()
+
+
+def test_wicks_inside_the_signal_candle_happen_before_the_entry(tmp_path):
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from models_db import Base, Signal as SignalDB, SignalEvaluation
+    from core.signal_evaluator import _epoch_ms, evaluate_pending_signals
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'eval.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    opened = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(hours=3)
+    db = Session()
+    db.add(SignalDB(id=1, timestamp=opened, token="BTC", timeframe="1h", direction="long",
+                    entry=100.0, tp=110.0, sl=97.0, strategy_id="p1"))
+    db.commit()
+
+    step = 5 * 60 * 1000
+    start_ms = _epoch_ms(opened)
+    # Dip to 95 inside the 1h signal candle; 99-101 after its close (the entry)
+    candles = CandleArray.from_rows(
+        [[start_ms + i * step, 100, 101, 95 if i == 4 else 99, 100, 1] for i in range(36)]
+    )
+    with patch("core.signal_evaluator.get_ohlcv_arrays", return_value=candles), patch(
+        "core.signal_evaluator.get_current_price", return_value=100.0
+    ):
+        assert evaluate_pending_signals(db) == 0
+
+    assert db.query(SignalEvaluation).count() == 0
+    assert db.get(SignalDB, 1).status == "OPEN"
+    db.close()
+
+
+def test_old_signals_do_not_coarsen_the_path_of_recent_ones(tmp_path):
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from models_db import Base, Signal as SignalDB, SignalEvaluation
+    from core.signal_evaluator import _epoch_ms, evaluate_pending_signals
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'eval.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    recent, stale = now - timedelta(hours=2), now - timedelta(days=5)
+    db = Session()
+    db.add_all([
+        SignalDB(id=1, timestamp=recent, token="BTC", timeframe="1h", direction="long",
+                 entry=100.0, tp=105.0, sl=95.0, strategy_id="p1"),
+        SignalDB(id=2, timestamp=stale, token="BTC", timeframe="1h", direction="long",
+                 entry=100.0, tp=120.0, sl=80.0, strategy_id="p1"),
+    ])
+    db.commit()
+
+    def fake_arrays(token, timeframe, limit):
+        calls.append((timeframe, limit))
+        step = 5 * 60 * 1000 if timeframe == "5m" else 15 * 60 * 1000
+        start_ms = _epoch_ms(recent if timeframe == "5m" else stale) + HOUR_MS  # From the entry
+        # The 5m path shows a wick to 106 that a 15m candle would have smeared with the dump
+        return CandleArray.from_rows(
+            [[start_ms + i * step, 100, 106 if timeframe == "5m" and i == 3 else 101, 99, 100, 1]
+             for i in range(limit - 1)]
+        )
+
+    calls = []
+    with patch("core.signal_evaluator.get_ohlcv_arrays", side_effect=fake_arrays), patch(
+        "core.signal_evaluator.get_current_price", return_value=100.0
+    ):
+        assert evaluate_pending_signals(db) == 2
+
+    # One path per age bucket: the 5-day-old signal alone needs 15m candles
+    assert [tf for tf, _ in calls] == ["5m", "15m"]
+    assert calls[0][1] == 14 and calls[1][1] >= 477
+    results = {e.signal_id: e.result for e in db.query(SignalEvaluation)}
+    assert results == {1: "WIN", 2: "BE"}  # Stale one timed out flat
+    db.close()
@@ -0,0 +1,152 @@
+import ast
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+# Ensure backend modules are importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models_db import Base, Signal, SignalEvaluation  # noqa: E402
+
+MIGRATION = (
+    Path(__file__).resolve().parents[1] / "alembic" / "versions" / "b7d2f4a81c3e_add_signal_status.py"
+)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'status.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def _signal(id, status="OPEN", hours=2, token="BTC"):
+    return Signal(id=id, timestamp=datetime.utcnow() - timedelta(hours=hours), token=token,
+                  timeframe="1h", direction="long", entry=100.0, tp=105.0, sl=95.0,
+                  strategy_id="p1", mode="LITE", status=status)
+
+
+def _migration_sql(path: Path, function: str = "upgrade") -> list:
+    """SQL literals passed to `op.execute` in a migration function (alembic not needed)."""
+    tree = ast.parse(path.read_text())
+    fn = next(node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name == function)
+    return [
+        call.args[0].value
+        for call in ast.walk(fn)
+        if isinstance(call, ast.Call)
+        and isinstance(call.func, ast.Attribute)
+        and call.func.attr == "execute"
+        and isinstance(call.args[0], ast.Constant)
+    ]
+
+
+def test_migration_backfill_closes_already_evaluated_signals(session_factory):
+    db = session_factory()
+    db.add_all([_signal(1), _signal(2), _signal(3)])
+    db.add(SignalEvaluation(signal_id=2, evaluated_at=datetime.utcnow(), result="WIN", pnl_r=1.0))
+    db.commit()
+
+    (backfill,) = _migration_sql(MIGRATION)
+    db.execute(text(backfill))
+    db.commit()
+
+    statuses = dict(db.execute(text("SELECT id, status FROM signals ORDER BY id")).all())
+    assert statuses == {1: "OPEN", 2: "CLOSED", 3: "OPEN"}
+    db.close()
+
+
+def test_evaluator_only_scans_open_signals(session_factory):
+    from core.candles import CandleArray
+    from core.signal_evaluator import evaluate_pending_signals
+
+    db = session_factory()
+    # Closed without an evaluation row (e.g. evaluated from the CSV path): never rescanned
+    db.add_all([_signal(1, status="CLOSED", token="ETH"), _signal(2, token="BTC")])
+    db.commit()
+
+    with patch("core.signal_evaluator.get_ohlcv_arrays", return_value=CandleArray.empty()) as arrays, \
+            patch("core.signal_evaluator.get_current_price", return_value=100.0):
+        assert evaluate_pending_signals(db) == 0
+
+    assert [call.args[0] for call in arrays.call_args_list] == ["BTC"]
+    db.close()
+
+
+def test_logs_read_status_and_batch_evaluations_in_one_query(session_factory):
+    from dependencies import PaginationParams
+    from routers.logs import get_logs_by_token, get_recent_logs
+
+    db = session_factory()
+    db.add_all([_signal(1, hours=3), _signal(2, status="CLOSED", hours=2), _signal(3, hours=1)])
+    db.add(SignalEvaluation(signal_id=2, evaluated_at=datetime.utcnow(), result="LOSS",
+                            pnl_r=-1.0, exit_price=95.0))
+    db.commit()
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, sql, *args: statements.append(sql))
+    user = SimpleNamespace(id=7, created_at=None, plan="pro")
+
+    logs = get_recent_logs(PaginationParams(), db=db, current_user=user)
+    by_token = get_logs_by_token("LITE", "all", db=db, current_user=user)
+
+    assert [(log.id, log.status, log.pnl) for log in logs] == [
+        (3, "OPEN", None), (2, "LOSS", -1.0), (1, "OPEN", None)
+    ]
+    assert [(row["status"], row["exit_price"]) for row in by_token] == [
+        ("OPEN", None), ("CLOSED", 95.0), ("OPEN", None)
+    ]
+    # One IN (...) lookup per page, only for the closed ids; no per-row lazy loads
+    eval_queries = [sql for sql in statements if "FROM signal_evaluations" in sql]
+    assert len(eval_queries) == 2 and all(" IN (" in sql for sql in eval_queries)
+    db.close()
+
+
+def test_evaluated_logger_closes_the_signal_and_updates_persona_aggregates(session_factory, tmp_path):
+    import database
+    import evaluated_logger
+    from models_db import PersonaPerformance, StrategyConfig
+
+    opened = datetime.utcnow().replace(microsecond=0) - timedelta(hours=2)
+    db = session_factory()
+    db.add(StrategyConfig(persona_id="p1", name="P1"))
+    db.add_all([
+        Signal(id=1, timestamp=opened, token="BTC", timeframe="1h", direction="long",
+               entry=100.0, tp=105.0, sl=95.0, strategy_id="p1"),
+        Signal(id=2, timestamp=opened + timedelta(minutes=30), token="BTC", timeframe="1h",
+               direction="long", entry=100.0, tp=105.0, sl=95.0, strategy_id="p1"),
+    ])
+    db.commit()
+    db.close()
+
+    def row(ts, result, price):
+        return {"signal_ts": ts.isoformat() + "Z", "result": result, "price_at_eval": price}
+
+    statements = []
+    with patch.object(database, "SessionLocal", session_factory), \
+            patch.object(evaluated_logger, "EVAL_DIR", tmp_path / "EVALUATED"), \
+            patch("builtins.print"):
+        assert evaluated_logger._append_evaluations("btc", [row(opened, "hit-tp", "105.0")]) == 1
+        event.listen(session_factory.kw["bind"], "before_cursor_execute",
+                     lambda conn, cursor, sql, *args: statements.append(sql))
+        rows = [row(opened, "hit-tp", "105.0"),  # Already closed: skipped
+                row(opened + timedelta(minutes=30), "hit-sl", "95.0")]
+        assert evaluated_logger._append_evaluations("btc", rows) == 2
+
+    db = session_factory()
+    assert [(s.status, s.evaluation.result, s.evaluation.pnl_r) for s in db.query(Signal).order_by(Signal.id)] == [
+        ("CLOSED", "WIN", 1.0), ("CLOSED", "LOSS", -1.0)
+    ]
+    perf = db.get(PersonaPerformance, "p1")
+    assert (perf.total, perf.wins, perf.losses) == (2, 1, 1)
+    assert db.query(StrategyConfig).one().total_signals == 2
+    # Incremental upsert: no recount over the evaluation history
+    assert not [sql for sql in statements if "count(" in sql.lower()]
+    db.close()
@@ -87,6 +87,7 @@ def save_backtest_results(db, strategy_id, token, results):
             exit_price=t["exit"],
         )
         db.add(eval_obj)
+        sig.status = "CLOSED"
         count += 1
 
     db.commit()